@@ -1,17 +1,27 @@
 from pydantic import BaseModel
 from typing import Optional,List,Annotated
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import BaseMessage,HumanMessage,SystemMessage,AIMessage
 from langgraph.graph.message import add_messages
 from langgraph.graph import START,END, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
 
 
 from dotenv import load_dotenv
 import os
+import time
+import uuid
 from system_prompt import get_system_prompt
+from memory import ConversationMemory
+from schema_catalog import SchemaCatalog
+from tracing import tracer
+from resilience import LLMCallGuard
+from plan_cache import PlanCache, standalone_question
+from prompt_budget import PromptAssembler
+from routing import ModelRouter
+from config.logging import get_logger
 
 
 
@@ -19,44 +29,161 @@ load_dotenv()
 
 os.getenv("OPENAI_API_KEY")
 
+logger = get_logger('agent')
+
+
+def keep_summary(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """Reducer that ignores empty updates, so a new user input keeps the running summary."""
+    return current if update is None else update
+
 
 # set up the state
 class AgentState(BaseModel):
     messages: Annotated[List[BaseMessage], add_messages]
+    summary: Annotated[Optional[str], keep_summary] = None
+
+def create_chat_model(model: str = "gpt-4", temperature: float = 0.1):
+    """Create the chat model client; ``langchain_openai`` is imported on first use."""
+    from langchain_openai import ChatOpenAI
+
+    # Retries are left to LLMCallGuard so they respect the request deadline and circuit breaker
+    return ChatOpenAI(model=model, temperature=temperature, max_retries=0)
+
 
 # Initiate LLM
 def initiate_llm(
         tools : Optional[List] = None,
         model : str = "gpt-4",
-        temperature : float = 0.1
+        temperature : float = 0.1,
+        chat_model = None
 ):
+    """
+    Bind ``tools`` to a chat model.
+
+    ``chat_model`` reuses a client created ahead of time (see
+    ``create_chat_model``) or substitutes another chat model; by default an
+    OpenAI client for ``model`` is created.
+    """
     tools=tools
-    llm=ChatOpenAI(model=model,temperature=temperature).bind_tools(tools)
+    chat_model = chat_model if chat_model is not None else create_chat_model(model, temperature)
+    # Let the model request independent queries in one step; ToolNode runs them concurrently
+    llm=chat_model.bind_tools(tools, parallel_tool_calls=True)
     return llm
 
 # Build Agent and Graph
 
 def build_agent(
     name: str,    
-    llm : ChatOpenAI,
+    llm,
     tools : Optional[List] = None,
-    system_prompt : str = get_system_prompt()
+    system_prompt : str = get_system_prompt(),
+    memory : Optional[ConversationMemory] = None,
+    checkpointer = None,
+    schema_catalog : Optional[SchemaCatalog] = None,
+    render_graph : bool = False,
+    llm_guard : Optional[LLMCallGuard] = None,
+    plan_cache : Optional[PlanCache] = None,
+    prompt_assembler : Optional[PromptAssembler] = None,
+    model_router : Optional[ModelRouter] = None
 ):
     """
     Build and compile StateGraph for the agent flow
+
+    When ``memory`` is given, each agent step first compacts the thread
+    (sliding window, summary of older turns, compacted tool results) and
+    persists the compaction to the graph state. ``checkpointer`` defaults
+    to an unbounded ``MemorySaver``. ``schema_catalog`` appends the current
+    schema and column statistics to the system prompt. LLM calls are
+    awaited through ``llm_guard`` (timeouts, retries, circuit breaker).
+    With a ``plan_cache``, the first step of a turn may return a cached
+    answer or replay cached SQL instead of calling the LLM, and finished
+    turns are recorded in it. Each call's prompt is built by
+    ``prompt_assembler`` (stable system prompt and schema prefix, then the
+    summary and history trimmed to its token budget), and its prompt and
+    completion token counts are logged. With a ``model_router``, each step goes to
+    its small model, to ``llm`` or, for one-row answers to simple questions,
+    to a templated answer without an LLM call.
+
+    Returns the compiled graph and, when ``render_graph`` is set, a PNG of
+    it (``None`` otherwise). Rendering goes through the mermaid.ink web
+    service, so it is off by default to keep startup offline and fast.
     """
     tools=tools
+    llm_guard = llm_guard or LLMCallGuard()
+    tool_names = {tool.name for tool in tools or []}
+    prompt_assembler = prompt_assembler or PromptAssembler()
 
     # define agent
 
-    def agent_node(state: AgentState) -> AgentState:
-        # Add system message if not already present
+    async def agent_node(state: AgentState, config: RunnableConfig) -> AgentState:
         messages = state.messages
-        if not messages or not isinstance(messages[0], SystemMessage):
-            messages = [SystemMessage(content=system_prompt)] + messages
-        
-        response = llm.invoke(messages)
-        return {"messages": [response]}
+        updates = []
+        summary = state.summary or ""
+        if memory is not None:
+            thread_id = config.get("configurable", {}).get("thread_id")
+            compacted = memory.compact(messages, summary, thread_id=thread_id)
+            messages, updates, summary = compacted.messages, compacted.state_updates, compacted.summary
+
+        question = None
+        if plan_cache is not None:
+            question = standalone_question(state.messages, state.summary or "")
+        if question is not None and isinstance(state.messages[-1], HumanMessage):
+            with tracer.span("plan_cache.lookup") as span:
+                hit = await plan_cache.lookup(question, tool_names)
+                span.set(outcome="miss" if hit is None else "answer" if hit.answer is not None else "plan")
+            if hit is not None and hit.answer is not None:
+                return {"messages": updates + [AIMessage(content=hit.answer)], "summary": summary or None}
+            if hit is not None:
+                # Run the cached queries right away; the LLM then answers from their fresh results
+                replay = AIMessage(content="", tool_calls=[
+                    {"name": tool, "args": {"query": query}, "id": f"call_plan_{uuid.uuid4().hex[:16]}"}
+                    for tool, query in hit.entry.queries
+                ])
+                return {"messages": updates + [replay], "summary": summary or None}
+
+        route = model_router.route(state.messages) if model_router is not None else None
+        if route is not None and route.answer is not None:
+            response = AIMessage(content=route.answer)
+            model_router.record(route, 0.0, response)
+            logger.info(f"Answered from the query result without an LLM call ({route.reason})")
+        else:
+            prompt = system_prompt
+            if schema_catalog is not None:
+                schema_block = schema_catalog.render()
+                if schema_block:
+                    prompt = f"{system_prompt}\n\n{schema_block}"
+
+            # The static prompt goes first and unchanged so provider prompt caching can reuse it
+            history = [message for message in messages if not isinstance(message, SystemMessage)]
+            messages, report = prompt_assembler.assemble(prompt, history, summary)
+            step_llm = model_router.small_llm if route is not None and route.name == "small" else llm
+
+            with tracer.span(
+                    "agent_node", messages=len(messages), prompt_estimate=report.total_tokens,
+                    route=route.name if route is not None else None
+            ) as span:
+                started = time.perf_counter()
+                response = await llm_guard.invoke(step_llm, messages)
+                elapsed = time.perf_counter() - started
+                usage = getattr(response, "usage_metadata", None) or {}
+                cached = (usage.get("input_token_details") or {}).get("cache_read")
+                span.set(
+                    tokens_in=usage.get("input_tokens"), tokens_out=usage.get("output_tokens"), tokens_cached=cached,
+                    tool_calls=len(response.tool_calls) if getattr(response, "tool_calls", None) else 0
+                )
+            if route is not None:
+                model_router.record(route, elapsed, response)
+            logger.info(
+                f"LLM call{f' ({route.name} model, {route.reason})' if route is not None else ''}: "
+                f"prompt {usage.get('input_tokens', '?')} tokens "
+                f"(estimated {report.total_tokens}, prefix {report.prefix_tokens}, cached {cached or 0}), "
+                f"completion {usage.get('output_tokens', '?')} tokens, {elapsed:.2f}s"
+                + (f", dropped {report.dropped_messages} messages" if report.dropped_messages else "")
+                + (f", condensed {report.condensed_results} results" if report.condensed_results else "")
+            )
+        if question is not None and not getattr(response, "tool_calls", None) and isinstance(response.content, str):
+            plan_cache.record_turn(state.messages + [response], response.content, state.summary or "")
+        return {"messages": updates + [response], "summary": summary or None}
     
     # define router/ routing conditions  
     def router(state: AgentState) -> str:
@@ -80,10 +207,10 @@ def build_agent(
 
 
     # compiling the agent
-    app=builder.compile(checkpointer=MemorySaver())
+    app=builder.compile(checkpointer=checkpointer or MemorySaver())
     graph=app
-   
-    return app, graph.get_graph().draw_mermaid_png()
+
+    return app, graph.get_graph().draw_mermaid_png() if render_graph else None
 
 
 
@@ -0,0 +1,192 @@
+"""
+Batch runner for files of questions.
+
+Runs every question of a JSONL or CSV file through the shared agent
+runtime with bounded concurrency, one isolated conversation per question:
+
+    python batch.py questions.jsonl --output answers.jsonl --concurrency 16
+
+Input lines are either JSON objects (``{"id": "q1", "question": "..."}``)
+or bare JSON strings; CSV files need a ``question`` column and may have an
+``id`` column. Each result is written to the output file as one JSON line
+as soon as it finishes, carrying the answer, the SQL the agent ran, token
+usage and latency. A summary with throughput, p50/p95/p99 latency and the
+error rate is printed at the end.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from config.agent import agent_config
+from config.logging import setup_logging, get_logger
+from main import invoke_graph_result, load_agent_runtime, tool_usage_stats
+from tracing import percentile
+
+logger = get_logger('batch')
+
+
+
+@dataclass
+class Question:
+    id: str
+    question: str
+
+
+@dataclass
+class BatchResult:
+    id: str
+    question: str
+    thread_id: str
+    answer: str = ""
+    sql: List[str] = field(default_factory=list)
+    tokens: Dict[str, int] = field(default_factory=dict)
+    latency: float = 0.0
+    error: Optional[str] = None
+
+
+def read_questions(path: str) -> List[Question]:
+    """
+    Read questions from a JSONL or CSV file.
+
+    Raises:
+        ValueError: If a line or row has no question.
+    """
+    questions = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                text = (row.get("question") or "").strip()
+                if not text:
+                    raise ValueError(f"{path} row {number}: missing 'question'")
+                questions.append(Question(id=(row.get("id") or str(number)).strip(), question=text))
+        else:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                payload = json.loads(line)
+                if isinstance(payload, str):
+                    payload = {"question": payload}
+                text = (payload.get("question") or "").strip() if isinstance(payload, dict) else ""
+                if not text:
+                    raise ValueError(f"{path} line {number}: missing 'question'")
+                questions.append(Question(id=str(payload.get("id") or number), question=text))
+    return questions
+
+
+class BatchRunner:
+    """Runs questions through one compiled graph with bounded concurrency."""
+
+    def __init__(self, graph, concurrency: int = 16, run_id: Optional[str] = None):
+        if concurrency < 1:
+            raise ValueError(f"Invalid batch concurrency: {concurrency}")
+        self.graph = graph
+        self.concurrency = concurrency
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run_one(self, question: Question, index: int = 0) -> BatchResult:
+        """Answer one question in its own conversation thread."""
+        from agent import AgentState
+        from langchain_core.messages import HumanMessage
+
+        # The position keeps threads apart when ids repeat or collide with line numbers
+        thread_id = f"batch-{self.run_id}-{index}-{question.id}"
+        result = BatchResult(id=question.id, question=question.question, thread_id=thread_id)
+        async with self._slots:
+            started = time.perf_counter()
+            outcome = await invoke_graph_result(
+                input=AgentState(messages=[HumanMessage(content=question.question)]),
+                graph=self.graph,
+                config={"configurable": {"thread_id": thread_id}},
+            )
+            result.latency = round(time.perf_counter() - started, 3)
+        result.answer, result.error = outcome.answer, outcome.error
+        result.sql, result.tokens = outcome.queries, outcome.tokens
+        return result
+
+    async def run(self, questions: List[Question], output_path: str) -> dict:
+        """
+        Run ``questions`` and append one JSON line per result to ``output_path``.
+
+        Returns:
+            The summary produced by ``summarize``.
+        """
+        started = time.perf_counter()
+        results: List[BatchResult] = []
+        with open(output_path, "w", encoding="utf-8") as out:
+            runs = [self.run_one(question, index) for index, question in enumerate(questions, start=1)]
+            for done in asyncio.as_completed(runs):
+                result = await done
+                results.append(result)
+                out.write(json.dumps(asdict(result), default=str) + "\n")
+                out.flush()
+                if result.error:
+                    logger.warning(f"[{result.thread_id}] Failed: {result.error}")
+                logger.info(f"Batch progress: {len(results)}/{len(questions)}")
+        return summarize(results, time.perf_counter() - started)
+
+
+def summarize(results: List[BatchResult], elapsed: float) -> dict:
+    """Throughput, latency percentiles, error rate and token totals of a batch."""
+    latencies = [result.latency for result in results]
+    errors = sum(1 for result in results if result.error)
+    return {
+        "questions": len(results),
+        "elapsed_seconds": round(elapsed, 2),
+        "questions_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 0.50), 3),
+        "latency_p95": round(percentile(latencies, 0.95), 3),
+        "latency_p99": round(percentile(latencies, 0.99), 3),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "total_tokens": sum(result.tokens.get("total_tokens", 0) for result in results),
+    }
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: Optional[int] = None) -> Optional[dict]:
+    """Load the agent runtime, run every question of ``input_path`` and return the summary."""
+    questions = read_questions(input_path)
+    app_logger = setup_logging()
+    runtime = await load_agent_runtime(app_logger)
+    if runtime is None:
+        return None
+    try:
+        runner = BatchRunner(runtime.agent, concurrency=concurrency or agent_config.max_concurrency)
+        logger.info(
+            f"Running {len(questions)} questions from {input_path} "
+            f"(concurrency={runner.concurrency}, run_id={runner.run_id})"
+        )
+        summary = await runner.run(questions, output_path)
+        logger.info(f"Batch summary: {summary}")
+        logger.info(f"Tool usage per answer: {tool_usage_stats}")
+        return summary
+    finally:
+        await runtime.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the Crstl agent.")
+    parser.add_argument("input", help="JSONL or CSV file of questions")
+    parser.add_argument("--output", "-o", default="batch_results.jsonl", help="JSONL file for the results")
+    parser.add_argument("--concurrency", "-c", type=int, help="questions answered at once")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary = asyncio.run(run_batch(args.input, args.output, args.concurrency))
+    if summary is None:
+        sys.exit(1)
+    print(
+        f"{summary['questions']} questions in {summary['elapsed_seconds']}s "
+        f"({summary['questions_per_minute']} questions/min)\n"
+        f"latency p50 {summary['latency_p50']}s, p95 {summary['latency_p95']}s, p99 {summary['latency_p99']}s\n"
+        f"errors {summary['errors']} ({summary['error_rate']:.1%}), tokens {summary['total_tokens']}"
+    )
@@ -0,0 +1,116 @@
+"""
+Latency of the local columnar engine versus the MCP/MySQL path.
+
+Runs a set of typical analytical queries against ``LocalSQLEngine`` and,
+with ``--mcp``, against ``execute_sql`` through a warm ``MCPSessionPool``
+using the MySQL settings from ``.env``. Prints median and p95 latency per
+query and the speedup.
+
+    python benchmarks/bench_local_engine.py --runs 50
+    python benchmarks/bench_local_engine.py --runs 20 --mcp
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.agent import agent_config
+from local_engine import load_local_engine
+from sql_tools import is_error_result, result_text
+
+QUERIES = [
+    "SELECT COUNT(*) FROM client_data",
+    "SELECT channel_sales, AVG(churn) AS churn_rate, COUNT(*) AS clients "
+    "FROM client_data GROUP BY channel_sales ORDER BY churn_rate DESC",
+    "SELECT origin_up, has_gas, SUM(cons_12m) AS total FROM client_data "
+    "WHERE num_years_antig > 3 GROUP BY origin_up, has_gas ORDER BY total DESC LIMIT 5",
+    "SELECT id, net_margin FROM client_data WHERE churn = 1 ORDER BY net_margin DESC LIMIT 10",
+    "SELECT nb_prod_act, ROUND(AVG(net_margin), 2) AS avg_margin FROM client_data "
+    "GROUP BY nb_prod_act HAVING COUNT(*) > 10 ORDER BY nb_prod_act",
+    "SELECT YEAR(date_activ) AS year, COUNT(*) AS activations, AVG(churn) AS churn_rate "
+    "FROM client_data GROUP BY YEAR(date_activ) ORDER BY year",
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def time_local(engine, query, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        engine.execute(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def time_mcp(queries, runs):
+    from config.database import db_config
+    from main import create_mcp_client
+    from mcp_pool import MCPSessionPool
+
+    db_config.validate()
+    pool = MCPSessionPool.from_config(create_mcp_client(), db_config)
+    await pool.start()
+    results = {}
+    try:
+        for query in queries:
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                content, _ = await pool.call_tool("execute_sql", {"query": query})
+                samples.append((time.perf_counter() - started) * 1000)
+                if is_error_result(result_text(content)):
+                    raise RuntimeError(result_text(content))
+            results[query] = samples
+    finally:
+        await pool.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=30, help="timed runs per query")
+    parser.add_argument("--mcp", action="store_true", help="also time the MCP/MySQL path")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    engine = load_local_engine(agent_config)
+    if engine is None:
+        print("No local data available; check AGENT_LOCAL_DATA_PATHS")
+        return 1
+    print(f"Engine ready in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    mcp = {}
+    if args.mcp:
+        try:
+            mcp = asyncio.run(time_mcp(QUERIES, args.runs))
+        except Exception as e:
+            print(f"MCP path unavailable, timing the local engine only: {e}")
+
+    header = f"{'local p50':>10} {'local p95':>10}"
+    if mcp:
+        header += f" {'mcp p50':>10} {'mcp p95':>10} {'speedup':>8}"
+    print(f"{header}  query")
+    for query in QUERIES:
+        local = time_local(engine, query, args.runs)
+        line = f"{statistics.median(local):>8.2f}ms {percentile(local, 0.95):>8.2f}ms"
+        if query in mcp:
+            remote = mcp[query]
+            line += (
+                f" {statistics.median(remote):>8.2f}ms {percentile(remote, 0.95):>8.2f}ms"
+                f" {statistics.median(remote) / max(statistics.median(local), 1e-6):>7.1f}x"
+            )
+        print(f"{line}  {query[:70]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
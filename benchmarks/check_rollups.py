@@ -0,0 +1,92 @@
+"""
+Check that rollup answers match the database.
+
+Builds the rollups over the SQLite stand-in (``fake_mcp_server.py``), runs
+each query both through ``PreAggregator.answer`` and directly through
+``execute_sql``, and reports any query whose rows differ. Exits with 1 on
+a mismatch or a query the rollups should have answered but did not.
+
+    python benchmarks/check_rollups.py
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+# Sets up the isolated environment and the fake MCP client
+import run_benchmarks  # noqa: E402
+
+CHECKS = [
+    "SELECT channel_sales, AVG(churn) AS churn_rate, COUNT(*) AS clients "
+    "FROM client_data GROUP BY channel_sales ORDER BY churn_rate DESC",
+    "SELECT has_gas, SUM(net_margin), MIN(net_margin), MAX(cons_12m), COUNT(cons_gas_12m) "
+    "FROM client_data WHERE origin_up <> 'MISSING' GROUP BY has_gas ORDER BY 1",
+    "SELECT num_years_antig, COUNT(*) AS clients FROM client_data "
+    "GROUP BY num_years_antig HAVING COUNT(*) > 100 ORDER BY clients DESC LIMIT 3",
+    "SELECT AVG(net_margin) FROM client_data WHERE has_gas = 't'",
+    # No matching rows: COUNT is 0, not NULL
+    "SELECT COUNT(*) FROM client_data WHERE channel_sales = 'nonexistent'",
+    "SELECT COUNT(cons_gas_12m) AS gas_clients FROM client_data WHERE channel_sales = 'nonexistent'",
+]
+
+
+def _rows(text: str):
+    """Rows with numbers compared to 4 significant digits, ignoring the order of ties."""
+    from sql_tools import parse_result
+
+    _, rows = parse_result(text)
+    normalized = []
+    for row in rows:
+        values = []
+        for value in row:
+            try:
+                values.append(f"{float(value):.4g}")
+            except ValueError:
+                values.append(value)
+        normalized.append(values)
+    return sorted(normalized)
+
+
+async def check() -> int:
+    from config.agent import agent_config
+    from config.logging import get_logger
+    from main import load_agent_runtime
+    from sql_tools import result_text
+
+    rollup_dir = tempfile.mkdtemp(prefix="rollup_check_")
+    agent_config.preagg_enabled, agent_config.preagg_dir = True, rollup_dir
+    runtime = await load_agent_runtime(
+        get_logger("check_rollups"), client=run_benchmarks.create_fake_client(),
+        chat_model=run_benchmarks.ScriptedChatModel(),
+    )
+    if runtime is None:
+        print("Agent runtime failed to start; see logs/ai_agent.log")
+        return 1
+    failures = 0
+    try:
+        for query in CHECKS:
+            routed = runtime.preagg.answer(query)
+            if routed is None:
+                print(f"NOT ROUTED  {query}")
+                failures += 1
+                continue
+            content, _ = await runtime.pool.call_tool("execute_sql", {"query": query})
+            expected = result_text(content)
+            if _rows(routed[0].rsplit("\n", 1)[0]) != _rows(expected):
+                print(f"MISMATCH    {query}\n  rollup: {routed[0]!r}\n  direct: {expected!r}")
+                failures += 1
+            else:
+                print(f"ok          {query}")
+    finally:
+        await runtime.close()
+        shutil.rmtree(rollup_dir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check()))
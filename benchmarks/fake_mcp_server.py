@@ -0,0 +1,146 @@
+"""
+Stand-in for mysql_mcp_server over SQLite, for benchmarks.
+
+Serves the same ``execute_sql`` tool with the same text results over MCP
+stdio, backed by an in-memory SQLite database seeded from CSV files
+(``Data/client_data.csv`` by default, one table per file named after it).
+Enough of MySQL is emulated for the agent's own queries:
+
+- ``information_schema.TABLES`` and ``information_schema.COLUMNS``
+- ``DATABASE()``, ``YEAR()``, ``MONTH()``, ``DAY()`` and ``DATEDIFF()``
+
+    python benchmarks/fake_mcp_server.py --csv Data/client_data.csv
+"""
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+from datetime import date
+
+from mcp.server.fastmcp import FastMCP
+
+DATABASE_NAME = "benchmark"
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _is_number(value: str, kind) -> bool:
+    try:
+        kind(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _column_type(values):
+    """Return the SQLite and MySQL type names for a CSV column."""
+    present = [value for value in values if value != ""]
+    if all(_is_number(value, int) for value in present):
+        return "INTEGER", "int"
+    if all(_is_number(value, float) for value in present):
+        return "REAL", "double"
+    if all(_DATE_RE.match(value) for value in present):
+        return "TEXT", "date"
+    return "TEXT", "varchar"
+
+
+def _convert(value: str, sqlite_type: str):
+    if value == "":
+        return None
+    if sqlite_type == "INTEGER":
+        return int(value)
+    if sqlite_type == "REAL":
+        return float(value)
+    return value
+
+
+def _date_part(index):
+    def part(value):
+        return int(value[:10].split("-")[index]) if value else None
+    return part
+
+
+def _datediff(first, second):
+    if not first or not second:
+        return None
+    return (date.fromisoformat(first[:10]) - date.fromisoformat(second[:10])).days
+
+
+def create_database(csv_paths) -> sqlite3.Connection:
+    """Load ``csv_paths`` into an in-memory SQLite database with MySQL-like metadata."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_function("DATABASE", 0, lambda: DATABASE_NAME)
+    conn.create_function("YEAR", 1, _date_part(0))
+    conn.create_function("MONTH", 1, _date_part(1))
+    conn.create_function("DAY", 1, _date_part(2))
+    conn.create_function("DATEDIFF", 2, _datediff)
+    conn.execute("ATTACH DATABASE ':memory:' AS information_schema")
+    conn.execute(
+        "CREATE TABLE information_schema.TABLES "
+        "(TABLE_SCHEMA TEXT, TABLE_NAME TEXT, UPDATE_TIME TEXT, TABLE_ROWS INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE information_schema.COLUMNS "
+        "(TABLE_SCHEMA TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT, DATA_TYPE TEXT, ORDINAL_POSITION INTEGER)"
+    )
+
+    for path in csv_paths:
+        table = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = list(reader)
+        types = [_column_type([row[i] for row in rows]) for i in range(len(header))]
+        columns = ", ".join(f'"{name}" {sqlite_type}' for name, (sqlite_type, _) in zip(header, types))
+        conn.execute(f'CREATE TABLE "{table}" ({columns})')
+        conn.executemany(
+            f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(header))})',
+            ([_convert(value, sqlite_type) for value, (sqlite_type, _) in zip(row, types)] for row in rows),
+        )
+        conn.execute(
+            "INSERT INTO information_schema.TABLES VALUES (?, ?, ?, ?)",
+            (DATABASE_NAME, table, None, len(rows)),
+        )
+        conn.executemany(
+            "INSERT INTO information_schema.COLUMNS VALUES (?, ?, ?, ?, ?)",
+            [
+                (DATABASE_NAME, table, name, mysql_type, position)
+                for position, (name, (_, mysql_type)) in enumerate(zip(header, types), start=1)
+            ],
+        )
+    conn.commit()
+    return conn
+
+
+def create_server(conn: sqlite3.Connection) -> FastMCP:
+    """Build the MCP server exposing ``execute_sql`` over ``conn``."""
+    app = FastMCP("mysql_mcp_server", log_level="WARNING")
+
+    @app.tool()
+    def execute_sql(query: str) -> str:
+        """Execute an SQL query on the MySQL server"""
+        try:
+            cursor = conn.execute(query)
+            if cursor.description is None:
+                conn.commit()
+                return f"Query executed successfully. Rows affected: {cursor.rowcount}"
+            columns = [description[0] for description in cursor.description]
+            rows = [",".join(map(str, row)) for row in cursor.fetchall()]
+            return "\n".join([",".join(columns)] + rows)
+        except sqlite3.Error as e:
+            return f"Error executing query: {e}"
+
+    return app
+
+
+if __name__ == "__main__":
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="SQLite stand-in for mysql_mcp_server.")
+    parser.add_argument(
+        "--csv", action="append",
+        help="CSV file to load as a table (repeatable; default Data/client_data.csv)",
+    )
+    args = parser.parse_args()
+    create_server(create_database(args.csv or [os.path.join(repo_dir, "Data", "client_data.csv")])).run()
@@ -0,0 +1,296 @@
+"""
+End-to-end agent benchmarks with stored baselines and regression checks.
+
+The full runtime from ``main.load_agent_runtime`` (MCP session pool,
+middleware stack, local engine, schema catalog, memory, checkpointer and
+compiled graph) is exercised with two stand-ins, so runs are reproducible
+and need neither OpenAI nor MySQL:
+
+- ``ScriptedChatModel`` (scripted_llm.py) in place of ``ChatOpenAI``
+- ``fake_mcp_server.py``: ``execute_sql`` over SQLite seeded from
+  ``Data/client_data.csv``, spoken to over MCP stdio like mysql_mcp_server
+
+Measured:
+
+- graph overhead: a turn answered without tools, with an instant model
+- tool calls: ``pool.call_tool`` alone, the agent's wrapped ``execute_sql``
+  tool, and a whole turn with one tool call (SQL cache cleared each time)
+- memory growth per turn of one long conversation (tracemalloc)
+- concurrent throughput of ``batch.BatchRunner`` with a model latency
+
+Results are compared with ``benchmarks/baselines.json``; a metric worse
+than its baseline by more than its threshold is a regression and the
+exit status is 1.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+# Isolate the run from .env and from state written by real sessions
+_STATE_DIR = tempfile.mkdtemp(prefix="agent_bench_")
+for _key, _value in {"MYSQL_USER": "benchmark", "MYSQL_PASSWORD": "benchmark", "MYSQL_DATABASE": "benchmark"}.items():
+    os.environ.setdefault(_key, _value)
+os.environ.update({
+    "AGENT_CHECKPOINTER": "memory",
+    "AGENT_RENDER_GRAPH": "false",
+    "AGENT_SCHEMA_REFRESH_INTERVAL": "0",
+    "AGENT_SCHEMA_CACHE_PATH": os.path.join(_STATE_DIR, "schema.json"),
+    "AGENT_RESULT_SPILL_DIR": os.path.join(_STATE_DIR, "results"),
+    "AGENT_LOCAL_CACHE_DIR": os.path.join(_STATE_DIR, "columnar"),
+    "AGENT_TRACE_PATH": os.path.join(_STATE_DIR, "traces.jsonl"),
+    # Scenarios measure the full LLM and tool path, not cached answers or rollups
+    "AGENT_PLAN_CACHE_ENABLED": "false",
+    "AGENT_PREAGG_ENABLED": "false",
+})
+
+from scripted_llm import ScriptedChatModel  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines.json")
+
+# direction: which way is better; tolerance: allowed relative change;
+# slack: allowed absolute change, for metrics whose baseline is near zero
+DEFAULT_THRESHOLDS = {
+    "graph_overhead_p50_ms": {"direction": "lower", "tolerance": 0.5, "slack": 2.0},
+    "graph_overhead_p95_ms": {"direction": "lower", "tolerance": 1.0, "slack": 5.0},
+    "mcp_call_p50_ms": {"direction": "lower", "tolerance": 0.5, "slack": 2.0},
+    "tool_call_p50_ms": {"direction": "lower", "tolerance": 0.5, "slack": 2.0},
+    "tool_turn_p50_ms": {"direction": "lower", "tolerance": 0.5, "slack": 5.0},
+    "memory_growth_kb_per_turn": {"direction": "lower", "tolerance": 0.5, "slack": 20.0},
+    "throughput_qpm": {"direction": "higher", "tolerance": 0.3, "slack": 0.0},
+    "concurrent_p95_ms": {"direction": "lower", "tolerance": 0.5, "slack": 20.0},
+}
+
+QUERY = (
+    "SELECT channel_sales, AVG(churn) AS churn_rate, COUNT(*) AS clients "
+    "FROM client_data GROUP BY channel_sales ORDER BY churn_rate DESC"
+)
+DIRECT_ANSWER = [{"content": "Churn is about 9.7% overall."}]
+ONE_TOOL_CALL = [
+    {"tool_calls": [{"name": "execute_sql", "args": {"query": QUERY}}]},
+    {"content": "The MISSING channel has the highest churn rate."},
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def create_fake_client():
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+
+    return MultiServerMCPClient({
+        "mysql": {
+            "command": sys.executable,
+            "args": [os.path.join(BENCH_DIR, "fake_mcp_server.py")],
+            "transport": "stdio",
+        }
+    })
+
+
+async def ask(runtime, question: str, thread_id: str) -> float:
+    """Run one turn and return its latency in milliseconds."""
+    from agent import AgentState
+    from langchain_core.messages import HumanMessage
+    from main import invoke_graph_response
+
+    started = time.perf_counter()
+    answer = await invoke_graph_response(
+        input=AgentState(messages=[HumanMessage(content=question)]),
+        graph=runtime.agent,
+        config={"configurable": {"thread_id": thread_id}},
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if answer.startswith("Error during graph execution"):
+        raise RuntimeError(answer)
+    return elapsed
+
+
+async def bench_graph_overhead(runtime, model, turns):
+    model.steps, model.latency = DIRECT_ANSWER, 0.0
+    await ask(runtime, "warm up", "overhead-warmup")
+    samples = [await ask(runtime, "What is the churn rate?", f"overhead-{i}") for i in range(turns)]
+    return {
+        "graph_overhead_p50_ms": statistics.median(samples),
+        "graph_overhead_p95_ms": percentile(samples, 0.95),
+    }
+
+
+async def bench_tool_calls(runtime, model, turns):
+    from sql_tools import SQL_TOOL_NAME
+
+    def clear_cache():
+        if runtime.sql_cache is not None:
+            runtime.sql_cache.clear()
+
+    mcp, wrapped, turn = [], [], []
+    sql_tool = next(tool for tool in runtime.tools if tool.name == SQL_TOOL_NAME)
+    await runtime.pool.call_tool(SQL_TOOL_NAME, {"query": QUERY})
+    for i in range(turns):
+        started = time.perf_counter()
+        await runtime.pool.call_tool(SQL_TOOL_NAME, {"query": QUERY})
+        mcp.append((time.perf_counter() - started) * 1000)
+
+        clear_cache()
+        started = time.perf_counter()
+        await sql_tool.ainvoke(
+            {"type": "tool_call", "name": SQL_TOOL_NAME, "args": {"query": QUERY}, "id": f"bench-{i}"}
+        )
+        wrapped.append((time.perf_counter() - started) * 1000)
+
+    model.steps, model.latency = ONE_TOOL_CALL, 0.0
+    for i in range(turns):
+        clear_cache()
+        turn.append(await ask(runtime, "Which channel churns most?", f"tool-turn-{i}"))
+    return {
+        "mcp_call_p50_ms": statistics.median(mcp),
+        "tool_call_p50_ms": statistics.median(wrapped),
+        "tool_turn_p50_ms": statistics.median(turn),
+    }
+
+
+async def bench_memory_growth(runtime, model, turns):
+    model.steps, model.latency = ONE_TOOL_CALL, 0.0
+    warmup = max(turns // 3, 1)
+    sizes = []
+    tracemalloc.start()
+    try:
+        for i in range(turns):
+            await ask(runtime, f"Question {i}: which channel churns most?", "memory-growth")
+            if i >= warmup:
+                gc.collect()
+                sizes.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    growth = (sizes[-1] - sizes[0]) / max(len(sizes) - 1, 1) if len(sizes) > 1 else 0.0
+    return {"memory_growth_kb_per_turn": max(growth, 0.0) / 1024}
+
+
+async def bench_throughput(runtime, model, questions, concurrency, llm_latency):
+    from batch import BatchRunner, Question
+
+    model.steps, model.latency = ONE_TOOL_CALL, llm_latency
+    runner = BatchRunner(runtime.agent, concurrency=concurrency)
+    batch = [Question(id=str(i), question=f"Which channel churns most? ({i})") for i in range(questions)]
+    summary = await runner.run(batch, os.path.join(_STATE_DIR, "batch_results.jsonl"))
+    if summary["errors"]:
+        raise RuntimeError(f"{summary['errors']} batch questions failed")
+    return {
+        "throughput_qpm": summary["questions_per_minute"],
+        "concurrent_p95_ms": summary["latency_p95"] * 1000,
+    }
+
+
+async def run_benchmarks(args) -> dict:
+    from config.logging import get_logger
+    from main import load_agent_runtime
+
+    model = ScriptedChatModel()
+    runtime = await load_agent_runtime(get_logger("benchmark"), client=create_fake_client(), chat_model=model)
+    if runtime is None:
+        raise RuntimeError("Agent runtime failed to start; see logs/ai_agent.log")
+    try:
+        results = {}
+        results.update(await bench_graph_overhead(runtime, model, args.turns))
+        results.update(await bench_tool_calls(runtime, model, args.turns))
+        results.update(await bench_throughput(runtime, model, args.questions, args.concurrency, args.llm_latency))
+        results.update(await bench_memory_growth(runtime, model, args.turns))
+        return {name: round(value, 3) for name, value in results.items()}
+    finally:
+        await runtime.close()
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"metrics": {}, "thresholds": DEFAULT_THRESHOLDS}
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline["thresholds"] = {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})}
+    return baseline
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Return ``(metric, value, baseline value, change, regressed)`` rows."""
+    rows = []
+    for name, value in results.items():
+        expected = baseline["metrics"].get(name)
+        if expected is None:
+            rows.append((name, value, None, None, False))
+            continue
+        threshold = baseline["thresholds"].get(name, {"direction": "lower", "tolerance": 0.5, "slack": 0.0})
+        allowed = abs(expected) * threshold["tolerance"] + threshold.get("slack", 0.0)
+        if threshold["direction"] == "higher":
+            regressed = value < expected - allowed
+        else:
+            regressed = value > expected + allowed
+        change = (value - expected) / expected if expected else None
+        rows.append((name, value, expected, change, regressed))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=30, help="timed turns per latency benchmark")
+    parser.add_argument("--questions", type=int, default=64, help="questions in the throughput benchmark")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrency of the throughput benchmark")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.05,
+        help="simulated model latency in seconds for the throughput benchmark",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmarks(args))
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline)
+
+    print(f"{'metric':<28} {'value':>10} {'baseline':>10} {'change':>8}")
+    for name, value, expected, change, regressed in rows:
+        expected_text = f"{expected:>10.2f}" if expected is not None else f"{'-':>10}"
+        change_text = f"{change:>+8.0%}" if change is not None else f"{'-':>8}"
+        print(f"{name:<28} {value:>10.2f} {expected_text} {change_text}{'  REGRESSION' if regressed else ''}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "metrics": results,
+                "thresholds": baseline["thresholds"],
+                "environment": {"python": platform.python_version(), "platform": platform.platform()},
+                "settings": {
+                    "turns": args.turns, "questions": args.questions,
+                    "concurrency": args.concurrency, "llm_latency": args.llm_latency,
+                },
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
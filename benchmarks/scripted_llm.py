@@ -0,0 +1,95 @@
+"""
+Deterministic chat model for benchmarks.
+
+``ScriptedChatModel`` replaces the OpenAI client (pass it as
+``chat_model`` to ``initiate_llm`` or ``load_agent_runtime``). Each turn
+replays the same script of steps: the n-th model call after a user message
+returns step n (the last step repeats). A step is either a final answer
+``{"content": "..."}`` or a request for tools
+``{"tool_calls": [{"name": "execute_sql", "args": {"query": "..."}}]}``.
+Because the step is derived from the conversation, concurrent threads
+replay their scripts independently. ``latency`` adds a fixed delay per
+call to stand in for the API round trip, and token usage is estimated from
+the prompt size so token accounting has something to count.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replaying a fixed script of answers and tool calls."""
+
+    steps: List[Dict[str, Any]] = [{"content": "Done."}]
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        position = 0
+        for message in reversed(messages):
+            if message.type == "human":
+                break
+            if message.type == "ai":
+                position += 1
+        step = self.steps[min(position, len(self.steps) - 1)]
+        self.calls += 1
+
+        tool_calls = [
+            {"name": call["name"], "args": call["args"], "id": f"call_{position}_{index}", "type": "tool_call"}
+            for index, call in enumerate(step.get("tool_calls", []))
+        ]
+        content = step.get("content", "")
+        input_tokens = sum(_estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = _estimate_tokens(content + json.dumps([call["args"] for call in tool_calls]))
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages)
+        chunk = ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        ))
+        if run_manager and message.content:
+            run_manager.on_llm_new_token(message.content, chunk=chunk)
+        yield chunk
@@ -0,0 +1,239 @@
+"""
+Checkpointers for long-running deployments.
+
+``MemorySaver`` keeps every checkpoint of every thread in process memory and
+loses them on restart. This module adds two drop-in replacements, selected
+with ``AGENT_CHECKPOINTER``:
+
+- ``memory``: ``BoundedMemorySaver`` keeps only the latest checkpoints per
+  thread and evicts idle (TTL) or least recently used threads
+- ``sqlite``: ``CompactingSqliteSaver`` persists checkpoints to a SQLite file
+  so conversations survive restarts, with the same compaction and eviction
+  and a capped SQLite page cache
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from config.logging import get_logger
+
+logger = get_logger('checkpointer')
+
+
+class BoundedMemorySaver(MemorySaver):
+    """In-memory checkpointer with per-thread compaction and TTL/LRU thread eviction."""
+
+    def __init__(self, keep_checkpoints: int = 3, thread_ttl: float = 86400.0, max_threads: int = 1000):
+        super().__init__()
+        self.keep_checkpoints = keep_checkpoints
+        self.thread_ttl = thread_ttl
+        self.max_threads = max_threads
+        self.stats = {"evicted_threads": 0, "compacted_checkpoints": 0}
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_seen[thread_id] = time.monotonic()
+        self._last_seen.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"].get("thread_id")
+        if thread_id in self._last_seen:
+            self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._touch(thread_id)
+        self._compact(thread_id, config["configurable"]["checkpoint_ns"])
+        self.evict()
+        return result
+
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the newest checkpoints of a thread, with their writes and unused blobs."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_checkpoints:
+            return
+        # Checkpoint ids are time-ordered UUIDs, so sorting puts the newest last
+        ordered = sorted(checkpoints)
+        for checkpoint_id in ordered[:-self.keep_checkpoints]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self.stats["compacted_checkpoints"] += 1
+
+        referenced = set()
+        for saved, _, _ in checkpoints.values():
+            for channel, version in self.serde.loads_typed(saved).get("channel_versions", {}).items():
+                referenced.add((channel, version))
+        for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+            if (key[2], key[3]) not in referenced:
+                del self.blobs[key]
+
+    def evict(self) -> int:
+        """Delete threads idle for longer than the TTL or beyond ``max_threads``. Returns the count."""
+        evicted = 0
+        cutoff = time.monotonic() - self.thread_ttl
+        while self._last_seen:
+            thread_id, last_seen = next(iter(self._last_seen.items()))
+            if last_seen >= cutoff and len(self._last_seen) <= self.max_threads:
+                break
+            self._last_seen.popitem(last=False)
+            self.delete_thread(thread_id)
+            evicted += 1
+        if evicted:
+            self.stats["evicted_threads"] += evicted
+            logger.info(f"Evicted {evicted} idle conversation threads from memory")
+        return evicted
+
+
+def _sqlite_saver_class():
+    # Imported lazily so the sqlite extra is only needed when it is selected
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class CompactingSqliteSaver(AsyncSqliteSaver):
+        """SQLite checkpointer with per-thread compaction and TTL/LRU thread eviction."""
+
+        def __init__(
+                self,
+                conn,
+                keep_checkpoints: int = 3,
+                thread_ttl: float = 604800.0,
+                max_threads: int = 10000,
+                eviction_interval: float = 60.0,
+                cache_kb: int = 8192
+        ):
+            super().__init__(conn)
+            self.keep_checkpoints = keep_checkpoints
+            self.thread_ttl = thread_ttl
+            self.max_threads = max_threads
+            self.eviction_interval = eviction_interval
+            self.cache_kb = cache_kb
+            self.stats = {"evicted_threads": 0, "compacted_checkpoints": 0}
+            self._last_eviction = time.monotonic()
+
+        async def setup(self) -> None:
+            if self.is_setup:
+                return
+            await super().setup()
+            async with self.lock:
+                await self.conn.executescript(
+                    f"""
+                    PRAGMA cache_size=-{int(self.cache_kb)};
+                    CREATE TABLE IF NOT EXISTS thread_activity (
+                        thread_id TEXT PRIMARY KEY,
+                        last_seen REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS thread_activity_last_seen
+                        ON thread_activity (last_seen);
+                    """
+                )
+                await self.conn.commit()
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            result = await super().aput(config, checkpoint, metadata, new_versions)
+            thread_id = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            async with self.lock:
+                await self.conn.execute(
+                    "INSERT OR REPLACE INTO thread_activity (thread_id, last_seen) VALUES (?, ?)",
+                    (thread_id, time.time()),
+                )
+                cursor = await self.conn.execute(
+                    """
+                    DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                        ORDER BY checkpoint_id DESC LIMIT ?
+                    )
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_checkpoints),
+                )
+                self.stats["compacted_checkpoints"] += max(cursor.rowcount, 0)
+                await self.conn.execute(
+                    """
+                    DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    )
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+                await self.conn.commit()
+            if time.monotonic() - self._last_eviction >= self.eviction_interval:
+                await self.evict()
+            return result
+
+        async def evict(self) -> int:
+            """Delete threads idle for longer than the TTL or beyond ``max_threads``. Returns the count."""
+            await self.setup()
+            self._last_eviction = time.monotonic()
+            async with self.lock:
+                cursor = await self.conn.execute(
+                    """
+                    SELECT thread_id FROM thread_activity WHERE last_seen < ?
+                    UNION
+                    SELECT thread_id FROM (
+                        SELECT thread_id FROM thread_activity ORDER BY last_seen DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (time.time() - self.thread_ttl, self.max_threads),
+                )
+                stale = [row[0] for row in await cursor.fetchall()]
+            for thread_id in stale:
+                await self.adelete_thread(thread_id)
+            if stale:
+                async with self.lock:
+                    await self.conn.executemany(
+                        "DELETE FROM thread_activity WHERE thread_id = ?", [(t,) for t in stale]
+                    )
+                    await self.conn.commit()
+                self.stats["evicted_threads"] += len(stale)
+                logger.info(f"Evicted {len(stale)} idle conversation threads from {self.__class__.__name__}")
+            return len(stale)
+
+        async def aclose(self) -> None:
+            """Close the SQLite connection."""
+            await self.conn.close()
+
+    return CompactingSqliteSaver
+
+
+async def create_checkpointer(config, path: Optional[str] = None):
+    """
+    Create the checkpointer selected by an ``AgentConfig`` instance.
+
+    Args:
+        config: The agent configuration.
+        path: Overrides ``config.checkpoint_path`` for the sqlite backend.
+
+    Returns:
+        A LangGraph checkpointer.
+    """
+    if config.checkpointer == "sqlite":
+        import aiosqlite
+
+        path = path or config.checkpoint_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = await aiosqlite.connect(path)
+        saver = _sqlite_saver_class()(
+            conn,
+            keep_checkpoints=config.checkpoint_keep,
+            thread_ttl=config.thread_ttl,
+            max_threads=config.max_threads,
+            cache_kb=config.checkpoint_cache_kb,
+        )
+        await saver.setup()
+        await saver.evict()
+        logger.info(f"Using SQLite checkpointer at {path}")
+        return saver
+
+    logger.info("Using bounded in-memory checkpointer")
+    return BoundedMemorySaver(
+        keep_checkpoints=config.checkpoint_keep,
+        thread_ttl=config.thread_ttl,
+        max_threads=config.max_threads,
+    )
@@ -0,0 +1,180 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class AgentConfig:
+    """Agent runtime configuration class that handles caching and execution settings."""
+
+    def __init__(self):
+        repo_dir = os.path.dirname(os.path.dirname(__file__))
+
+        # Chat model and startup
+        self.llm_model = os.getenv('AGENT_LLM_MODEL', 'gpt-4')
+
+        # Routing of simple questions to a small model, or to a templated answer
+        self.routing_enabled = os.getenv('AGENT_ROUTING_ENABLED', 'True').lower() == 'true'
+        self.small_llm_model = os.getenv('AGENT_SMALL_LLM_MODEL', 'gpt-4o-mini')
+        self.routing_templates = os.getenv('AGENT_ROUTING_TEMPLATES', 'True').lower() == 'true'
+        self.routing_max_simple_words = int(os.getenv('AGENT_ROUTING_MAX_SIMPLE_WORDS', '12'))
+        # Rendering the graph PNG calls the mermaid.ink web service, so it is opt-in
+        self.render_graph = os.getenv('AGENT_RENDER_GRAPH', 'False').lower() == 'true'
+        self.graph_path = os.getenv('AGENT_GRAPH_PATH', os.path.join(repo_dir, 'state', 'agent_graph.png'))
+
+        # SQL result cache
+        self.cache_enabled = os.getenv('AGENT_CACHE_ENABLED', 'True').lower() == 'true'
+        self.cache_max_entries = int(os.getenv('AGENT_CACHE_MAX_ENTRIES', '256'))
+        self.cache_ttl = float(os.getenv('AGENT_CACHE_TTL', '900'))
+        self.cache_version_check_interval = float(os.getenv('AGENT_CACHE_VERSION_CHECK_INTERVAL', '60'))
+
+        # Question-level cache of SQL plans and answers
+        self.plan_cache_enabled = os.getenv('AGENT_PLAN_CACHE_ENABLED', 'True').lower() == 'true'
+        self.plan_cache_path = os.getenv('AGENT_PLAN_CACHE_PATH', os.path.join(repo_dir, 'state', 'plan_cache.json'))
+        self.plan_cache_max_entries = int(os.getenv('AGENT_PLAN_CACHE_MAX_ENTRIES', '500'))
+        self.plan_cache_similarity = float(os.getenv('AGENT_PLAN_CACHE_SIMILARITY', '0.7'))
+        self.plan_cache_version_check_interval = float(os.getenv('AGENT_PLAN_CACHE_VERSION_CHECK_INTERVAL', '60'))
+
+        # Conversation memory
+        self.memory_enabled = os.getenv('AGENT_MEMORY_ENABLED', 'True').lower() == 'true'
+        self.memory_window_turns = int(os.getenv('AGENT_MEMORY_WINDOW_TURNS', '6'))
+        self.memory_tool_result_chars = int(os.getenv('AGENT_MEMORY_TOOL_RESULT_CHARS', '2000'))
+        self.memory_token_budget = int(os.getenv('AGENT_MEMORY_TOKEN_BUDGET', '6000'))
+        self.memory_summary_chars = int(os.getenv('AGENT_MEMORY_SUMMARY_CHARS', '3000'))
+
+        # Prompt tokens per LLM call, tool definitions included (0 disables trimming);
+        # gpt-4 has an 8,192-token context, the rest is left for the completion
+        self.prompt_token_budget = int(os.getenv('AGENT_PROMPT_TOKEN_BUDGET', '7000'))
+
+        # Checkpointer: 'memory' (bounded, in-process) or 'sqlite' (persistent)
+        self.checkpointer = os.getenv('AGENT_CHECKPOINTER', 'memory').lower()
+        self.checkpoint_path = os.getenv(
+            'AGENT_CHECKPOINT_PATH', os.path.join(repo_dir, 'state', 'checkpoints.sqlite')
+        )
+        self.checkpoint_keep = int(os.getenv('AGENT_CHECKPOINT_KEEP', '3'))
+        self.checkpoint_cache_kb = int(os.getenv('AGENT_CHECKPOINT_CACHE_KB', '8192'))
+        self.thread_ttl = float(os.getenv('AGENT_THREAD_TTL', '604800'))
+        self.max_threads = int(os.getenv('AGENT_MAX_THREADS', '1000'))
+
+        # Per-request deadline (seconds, 0 disables) shared by LLM and tool calls
+        self.request_timeout = float(os.getenv('AGENT_REQUEST_TIMEOUT', '120'))
+
+        # LLM calls: per-attempt timeout, jittered retries and circuit breaker
+        self.llm_timeout = float(os.getenv('AGENT_LLM_TIMEOUT', '60'))
+        self.llm_max_attempts = int(os.getenv('AGENT_LLM_MAX_ATTEMPTS', '4'))
+        self.llm_retry_base_delay = float(os.getenv('AGENT_LLM_RETRY_BASE_DELAY', '0.5'))
+        self.llm_retry_max_delay = float(os.getenv('AGENT_LLM_RETRY_MAX_DELAY', '8'))
+        self.llm_breaker_threshold = int(os.getenv('AGENT_LLM_BREAKER_THRESHOLD', '5'))
+        self.llm_breaker_reset = float(os.getenv('AGENT_LLM_BREAKER_RESET', '30'))
+
+        # Concurrent SQL tool calls and per-query timeout (seconds, 0 disables)
+        self.tool_parallelism = int(os.getenv('AGENT_TOOL_PARALLELISM', os.getenv('MYSQL_POOL_SIZE', '4')))
+        self.tool_timeout = float(os.getenv('AGENT_TOOL_TIMEOUT', '30'))
+
+        # Result-set governance: row cap, rows shown to the model, spilled results
+        self.result_max_rows = int(os.getenv('AGENT_RESULT_MAX_ROWS', '10000'))
+        self.result_page_rows = int(os.getenv('AGENT_RESULT_PAGE_ROWS', '50'))
+        self.result_spill_dir = os.getenv('AGENT_RESULT_SPILL_DIR', os.path.join(repo_dir, 'state', 'results'))
+        self.result_spill_max = int(os.getenv('AGENT_RESULT_SPILL_MAX', '100'))
+
+        # Typed columnar frames of tool results, returned by invoke_graph_result
+        self.frames_enabled = os.getenv('AGENT_FRAMES_ENABLED', 'True').lower() == 'true'
+        self.frame_max = int(os.getenv('AGENT_FRAME_MAX', '64'))
+
+        # Local columnar engine over the shipped CSV data (query_local_data tool)
+        self.local_engine_enabled = os.getenv('AGENT_LOCAL_ENGINE_ENABLED', 'True').lower() == 'true'
+        self.local_data_paths = [
+            path.strip() for path in os.getenv(
+                'AGENT_LOCAL_DATA_PATHS', os.path.join(repo_dir, 'Data', 'client_data.csv')
+            ).split(',') if path.strip()
+        ]
+        self.local_cache_dir = os.getenv('AGENT_LOCAL_CACHE_DIR', os.path.join(repo_dir, 'state', 'columnar'))
+        self.local_version_check_interval = float(os.getenv('AGENT_LOCAL_VERSION_CHECK_INTERVAL', '60'))
+
+        # Rollups of client_data / price_data answering matching aggregate queries locally
+        self.preagg_enabled = os.getenv('AGENT_PREAGG_ENABLED', 'True').lower() == 'true'
+        self.preagg_dir = os.getenv('AGENT_PREAGG_DIR', os.path.join(repo_dir, 'state', 'rollups'))
+        self.preagg_refresh_interval = float(os.getenv('AGENT_PREAGG_REFRESH_INTERVAL', '300'))
+
+        # Schema and column statistics rendered into the system prompt
+        self.schema_enabled = os.getenv('AGENT_SCHEMA_ENABLED', 'True').lower() == 'true'
+        self.schema_cache_path = os.getenv('AGENT_SCHEMA_CACHE_PATH', os.path.join(repo_dir, 'state', 'schema.json'))
+        self.schema_refresh_interval = float(os.getenv('AGENT_SCHEMA_REFRESH_INTERVAL', '300'))
+        self.schema_top_values = int(os.getenv('AGENT_SCHEMA_TOP_VALUES', '5'))
+        self.schema_max_distinct_for_top = int(os.getenv('AGENT_SCHEMA_MAX_DISTINCT_FOR_TOP', '50'))
+        self.schema_prompt_chars = int(os.getenv('AGENT_SCHEMA_PROMPT_CHARS', '4000'))
+
+        # Span tracing of requests, LLM calls, tool calls and MCP sessions (JSON lines)
+        self.trace_enabled = os.getenv('AGENT_TRACE_ENABLED', 'True').lower() == 'true'
+        self.trace_path = os.getenv('AGENT_TRACE_PATH', os.path.join(repo_dir, 'state', 'traces.jsonl'))
+        self.trace_max_bytes = int(os.getenv('AGENT_TRACE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+        # Stream tokens and tool progress to the CLI and server clients
+        self.stream_output = os.getenv('AGENT_STREAM_OUTPUT', 'True').lower() == 'true'
+
+        # Multi-session server
+        self.server_host = os.getenv('AGENT_SERVER_HOST', '127.0.0.1')
+        self.server_port = int(os.getenv('AGENT_SERVER_PORT', '8765'))
+        self.max_concurrency = int(os.getenv('AGENT_MAX_CONCURRENCY', '16'))
+        self.max_pending = int(os.getenv('AGENT_MAX_PENDING', '64'))
+
+    def validate(self) -> bool:
+        """Validate configuration parameters."""
+        try:
+            assert self.llm_model, "LLM model name must not be empty"
+            assert self.small_llm_model, "Small LLM model name must not be empty"
+            assert self.routing_max_simple_words > 0, \
+                f"Invalid routing question length: {self.routing_max_simple_words}"
+            assert self.cache_max_entries > 0, f"Invalid cache size: {self.cache_max_entries}"
+            assert self.cache_ttl > 0, f"Invalid cache TTL: {self.cache_ttl}"
+            assert self.cache_version_check_interval >= 0, \
+                f"Invalid cache version check interval: {self.cache_version_check_interval}"
+            assert self.plan_cache_max_entries > 0, f"Invalid plan cache size: {self.plan_cache_max_entries}"
+            assert 0 < self.plan_cache_similarity <= 1, \
+                f"Invalid plan cache similarity: {self.plan_cache_similarity}"
+            assert self.plan_cache_version_check_interval >= 0, \
+                f"Invalid plan cache version check interval: {self.plan_cache_version_check_interval}"
+            assert self.local_version_check_interval >= 0, \
+                f"Invalid local engine version check interval: {self.local_version_check_interval}"
+            assert self.memory_window_turns > 0, f"Invalid memory window: {self.memory_window_turns}"
+            assert self.memory_tool_result_chars > 0, \
+                f"Invalid memory tool result size: {self.memory_tool_result_chars}"
+            assert self.memory_token_budget > 0, f"Invalid memory token budget: {self.memory_token_budget}"
+            assert self.memory_summary_chars > 0, f"Invalid memory summary size: {self.memory_summary_chars}"
+            assert self.prompt_token_budget >= 0, f"Invalid prompt token budget: {self.prompt_token_budget}"
+            assert self.checkpointer in ('memory', 'sqlite'), f"Invalid checkpointer: {self.checkpointer}"
+            assert self.checkpoint_keep > 0, f"Invalid checkpoint keep count: {self.checkpoint_keep}"
+            assert self.checkpoint_cache_kb > 0, f"Invalid checkpoint cache size: {self.checkpoint_cache_kb}"
+            assert self.thread_ttl > 0, f"Invalid thread TTL: {self.thread_ttl}"
+            assert self.max_threads > 0, f"Invalid max threads: {self.max_threads}"
+            assert self.request_timeout >= 0, f"Invalid request timeout: {self.request_timeout}"
+            assert self.llm_timeout >= 0, f"Invalid LLM timeout: {self.llm_timeout}"
+            assert self.llm_max_attempts > 0, f"Invalid LLM attempts: {self.llm_max_attempts}"
+            assert 0 <= self.llm_retry_base_delay <= self.llm_retry_max_delay, \
+                f"Invalid LLM retry delays: {self.llm_retry_base_delay}..{self.llm_retry_max_delay}"
+            assert self.llm_breaker_threshold > 0, f"Invalid LLM breaker threshold: {self.llm_breaker_threshold}"
+            assert self.llm_breaker_reset > 0, f"Invalid LLM breaker reset: {self.llm_breaker_reset}"
+            assert self.tool_parallelism > 0, f"Invalid tool parallelism: {self.tool_parallelism}"
+            assert self.tool_timeout >= 0, f"Invalid tool timeout: {self.tool_timeout}"
+            assert self.result_max_rows > 0, f"Invalid result row cap: {self.result_max_rows}"
+            assert 0 < self.result_page_rows <= self.result_max_rows, \
+                f"Invalid result page size: {self.result_page_rows}"
+            assert self.result_spill_max > 0, f"Invalid spilled result count: {self.result_spill_max}"
+            assert self.frame_max > 0, f"Invalid frame count: {self.frame_max}"
+            assert self.preagg_refresh_interval >= 0, \
+                f"Invalid rollup refresh interval: {self.preagg_refresh_interval}"
+            assert self.schema_refresh_interval >= 0, \
+                f"Invalid schema refresh interval: {self.schema_refresh_interval}"
+            assert self.schema_top_values >= 0, f"Invalid schema top values: {self.schema_top_values}"
+            assert self.schema_max_distinct_for_top >= 0, \
+                f"Invalid schema top values cardinality: {self.schema_max_distinct_for_top}"
+            assert self.schema_prompt_chars > 0, f"Invalid schema prompt size: {self.schema_prompt_chars}"
+            assert self.trace_max_bytes > 0, f"Invalid trace file size: {self.trace_max_bytes}"
+            assert 1 <= self.server_port <= 65535, f"Invalid server port: {self.server_port}"
+            assert self.max_concurrency > 0, f"Invalid max concurrency: {self.max_concurrency}"
+            assert self.max_pending >= 0, f"Invalid max pending: {self.max_pending}"
+            return True
+        except AssertionError as e:
+            raise ValueError(f"Agent configuration validation failed: {e}")
+
+# Create global agent configuration instance
+agent_config = AgentConfig()
@@ -21,6 +21,12 @@ class DatabaseConfig:
         self.connect_timeout = int(os.getenv('MYSQL_CONNECT_TIMEOUT', '30'))
         self.autocommit = os.getenv('MYSQL_AUTOCOMMIT', 'True').lower() == 'true'
         self.use_ssl = os.getenv('MYSQL_USE_SSL', 'False').lower() == 'true'
+
+        # MCP session pool settings (client side, not passed to the MCP server)
+        self.pool_size = int(os.getenv('MYSQL_POOL_SIZE', '4'))
+        self.pool_idle_timeout = float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', '300'))
+        self.pool_max_lifetime = float(os.getenv('MYSQL_POOL_MAX_LIFETIME', '3600'))
+        self.pool_health_check_interval = float(os.getenv('MYSQL_POOL_HEALTH_CHECK_INTERVAL', '60'))
     
     def _get_required_env(self, key: str) -> str:
         """Get required environment variable or raise ValueError if not set."""
@@ -58,6 +64,11 @@ class DatabaseConfig:
             assert self.user, "User cannot be empty"
             assert self.database, "Database name cannot be empty"
             assert self.connect_timeout > 0, f"Invalid connect timeout: {self.connect_timeout}"
+            assert self.pool_size > 0, f"Invalid pool size: {self.pool_size}"
+            assert self.pool_idle_timeout > 0, f"Invalid pool idle timeout: {self.pool_idle_timeout}"
+            assert self.pool_max_lifetime > 0, f"Invalid pool max lifetime: {self.pool_max_lifetime}"
+            assert self.pool_health_check_interval >= 0, \
+                f"Invalid pool health check interval: {self.pool_health_check_interval}"
             return True
         except AssertionError as e:
             raise ValueError(f"Database configuration validation failed: {e}")
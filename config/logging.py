@@ -1,44 +1,179 @@
+import atexit
+import json
 import logging
 import logging.config
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Optional
 
-def setup_logging(log_level=logging.INFO, log_file=None):
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+DETAILED_FORMAT = '[%(asctime)s] %(levelname)-8s %(name)s - %(message)s'
+
+
+class LoggingConfig:
+    """Logging pipeline configuration: background writer, rotation, format and payload limits."""
+
+    def __init__(self):
+        # Hand records to a background writer thread instead of writing on the caller's thread
+        self.async_logging = os.getenv('LOG_ASYNC', 'True').lower() == 'true'
+        self.queue_size = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+        # Rotation: 'size', 'time' or 'none'
+        self.rotation = os.getenv('LOG_ROTATION', 'size').lower()
+        self.max_bytes = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+        self.rotate_when = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+        self.backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+
+        # 'text' or 'json' (one object per line) for the log file
+        self.format = os.getenv('LOG_FORMAT', 'text').lower()
+
+        # Messages longer than this are truncated; of those, only a sample is kept below WARNING
+        self.max_message_chars = int(os.getenv('LOG_MAX_MESSAGE_CHARS', '4000'))
+        self.oversize_sample_rate = float(os.getenv('LOG_OVERSIZE_SAMPLE_RATE', '1.0'))
+
+    def validate(self) -> bool:
+        """Validate configuration parameters."""
+        try:
+            assert self.queue_size >= 0, f"Invalid log queue size: {self.queue_size}"
+            assert self.rotation in ('size', 'time', 'none'), f"Invalid log rotation: {self.rotation}"
+            assert self.max_bytes > 0, f"Invalid log file size: {self.max_bytes}"
+            assert self.backup_count >= 0, f"Invalid log backup count: {self.backup_count}"
+            assert self.format in ('text', 'json'), f"Invalid log format: {self.format}"
+            assert self.max_message_chars > 0, f"Invalid log message size: {self.max_message_chars}"
+            assert 0 <= self.oversize_sample_rate <= 1, \
+                f"Invalid oversize sample rate: {self.oversize_sample_rate}"
+            return True
+        except AssertionError as e:
+            raise ValueError(f"Logging configuration validation failed: {e}")
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class PayloadLimitFilter(logging.Filter):
+    """
+    Truncate oversized messages and keep only a sample of them.
+
+    Agent responses and tool results can be whole tables; truncating them
+    where they are logged keeps formatting, queueing and disk writes small.
+    Warnings and errors are always kept.
+    """
+
+    def __init__(self, max_chars: int = 4000, sample_rate: float = 1.0):
+        super().__init__()
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+        self.stats = {'truncated': 0, 'dropped': 0}
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        if len(message) <= self.max_chars:
+            return True
+        if record.levelno < logging.WARNING:
+            with self._lock:
+                self._credit += self.sample_rate
+                if self._credit < 1:
+                    self.stats['dropped'] += 1
+                    return False
+                self._credit -= 1
+        self.stats['truncated'] += 1
+        record.msg = f"{message[:self.max_chars]}... [truncated {len(message) - self.max_chars} chars]"
+        record.args = None
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking or erroring when the queue is full."""
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer thread, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _file_handler(log_file: str, config: LoggingConfig) -> logging.Handler:
+    if config.rotation == 'size':
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=config.max_bytes, backupCount=config.backup_count, encoding='utf-8'
+        )
+    if config.rotation == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=config.rotate_when, backupCount=config.backup_count, encoding='utf-8'
+        )
+    return logging.FileHandler(log_file, mode='a', encoding='utf-8')
+
+
+def setup_logging(log_level=logging.INFO, log_file=None, config: Optional[LoggingConfig] = None):
     """
     Set up logging configuration for the AI Agent application.
-    
+
+    With ``LOG_ASYNC`` (the default) loggers only put records on a queue; a
+    ``QueueListener`` thread formats them and writes the file, so disk
+    writes never block the event loop.
+
     Args:
         log_level: Logging level (default: INFO)
         log_file: Log file path (default: logs/ai_agent.log)
+        config: Pipeline settings (default: ``logging_config``, from the environment)
     """
+    global _listener
+    config = config or logging_config
+    config.validate()
+
     if log_file is None:
         # Create logs directory if it doesn't exist
         log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
         os.makedirs(log_dir, exist_ok=True)
         log_file = os.path.join(log_dir, 'ai_agent.log')
-    
-    # Logging configuration
-    logging_config = {
+
+    # Formatters and the console handler; file output is attached below
+    dict_config = {
         'version': 1,
         'disable_existing_loggers': False,
         'formatters': {
-            'detailed': {
-                'format': '[%(asctime)s] %(levelname)-8s %(name)s - %(message)s',
-                'datefmt': '%Y-%m-%d %H:%M:%S'
-            },
             'simple': {
                 'format': '%(levelname)s - %(message)s'
             }
         },
         'handlers': {
-            'file': {
-                'class': 'logging.FileHandler',
-                'level': log_level,
-                'formatter': 'detailed',
-                'filename': log_file,
-                'mode': 'a',
-                'encoding': 'utf-8'
-            },
             'console': {
                 'class': 'logging.StreamHandler',
                 'level': logging.WARNING,  # Only show warnings and errors on console
@@ -47,22 +182,52 @@ def setup_logging(log_level=logging.INFO, log_file=None):
         },
         'loggers': {
             'ai_agent': {
-                'handlers': ['file', 'console'],
+                'handlers': ['console'],
                 'level': log_level,
                 'propagate': False
             }
         },
         'root': {
-            'handlers': ['file'],
+            'handlers': [],
             'level': log_level
         }
     }
-    
-    logging.config.dictConfig(logging_config)
-    return logging.getLogger('ai_agent')
+
+    stop_logging()
+    logging.config.dictConfig(dict_config)
+
+    file_handler = _file_handler(log_file, config)
+    file_handler.setLevel(log_level)
+    if config.format == 'json':
+        file_handler.setFormatter(JSONFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(DETAILED_FORMAT, datefmt='%Y-%m-%d %H:%M:%S'))
+
+    if config.async_logging:
+        records = queue.Queue(config.queue_size)
+        _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        _listener.start()
+        file_output = NonBlockingQueueHandler(records)
+    else:
+        file_output = file_handler
+    payload_filter = PayloadLimitFilter(config.max_message_chars, config.oversize_sample_rate)
+    file_output.addFilter(payload_filter)
+
+    app_logger = logging.getLogger('ai_agent')
+    app_logger.addHandler(file_output)
+    logging.getLogger().addHandler(file_output)
+    return app_logger
+
 
 def get_logger(name=None):
     """Get a logger instance for the AI Agent application."""
     if name:
         return logging.getLogger(f'ai_agent.{name}')
-    return logging.getLogger('ai_agent')
\ No newline at end of file
+    return logging.getLogger('ai_agent')
+
+
+# Create global logging configuration instance
+logging_config = LoggingConfig()
+
+# Flush records still queued when the process exits
+atexit.register(stop_logging)
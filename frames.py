@@ -0,0 +1,267 @@
+"""
+Typed columnar frames of SQL tool results.
+
+Tool results arrive as mysql_mcp_server text tables, and any statistics
+over them used to be recomputed by the LLM from the text. ``ResultFrame``
+parses a result once into typed NumPy columns (``local_engine.infer_array``)
+and computes its statistics vectorized in-process: count, nulls, mean,
+standard deviation and quartiles of numeric columns, distinct values and
+the most frequent values of text columns, and group shares of aggregated
+results.
+
+``FrameStore`` keeps the most recent frames in memory. As tool middleware
+it attaches a ``frame_id`` to every result's artifact; results too large
+for the model are framed by ``ResultGovernor`` from all their rows, while
+the model only gets its summary. ``main.invoke_graph_result`` hands the
+frames of a turn to the caller, so full tables never have to round-trip
+through the model.
+"""
+
+import re
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from local_engine import infer_array
+from sql_tools import CallNext, ToolResult, is_error_result, parse_result, result_text
+
+# Notes such as the rollup refresh line that follow the rows of a result
+_NOTE_RE = re.compile(r"^\[.*\]$")
+
+
+def _label(value: Any, max_chars: int = 40) -> str:
+    text = str(value)
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+@dataclass
+class ResultFrame:
+    """One SQL result as typed columns: ``int``, ``float``, ``date`` or ``str`` arrays."""
+    columns: Dict[str, np.ndarray]
+    kinds: Dict[str, str]
+    query: Optional[str] = None
+    frame_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    @classmethod
+    def from_rows(cls, header: List[str], rows: List[List[str]], query: Optional[str] = None) -> "ResultFrame":
+        """Build a frame from a parsed header and text rows; ``None`` values become nulls."""
+        names: List[str] = []
+        for name in header:
+            unique, suffix = name, 2
+            while unique in names:
+                unique, suffix = f"{name}_{suffix}", suffix + 1
+            names.append(unique)
+        width = len(names)
+        padded = (row if len(row) == width else (row + [""] * width)[:width] for row in rows)
+        values = list(zip(*padded)) if rows else [() for _ in names]
+        columns, kinds = {}, {}
+        for name, column in zip(names, values):
+            columns[name], kinds[name] = infer_array(["" if value == "None" else value for value in column])
+        return cls(columns=columns, kinds=kinds, query=query)
+
+    @classmethod
+    def from_text(cls, text: str, query: Optional[str] = None) -> Optional["ResultFrame"]:
+        """Parse a tool result into a frame, or None for errors and statements without rows."""
+        if is_error_result(text):
+            return None
+        lines = text.splitlines()
+        while lines and _NOTE_RE.match(lines[-1]):
+            lines.pop()
+        header, rows = parse_result("\n".join(lines))
+        if not header:
+            return None
+        return cls.from_rows(header, rows, query=query)
+
+    @property
+    def num_rows(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def _present(self, name: str) -> np.ndarray:
+        values, kind = self.columns[name], self.kinds[name]
+        if kind == "float":
+            return values[~np.isnan(values)]
+        if kind == "date":
+            return values[~np.isnat(values)]
+        if kind == "str":
+            return values[values != ""]
+        return values
+
+    def column_stats(self, name: str, top: int = 3) -> Dict[str, Any]:
+        """Summary statistics of one column."""
+        kind = self.kinds[name]
+        present = self._present(name)
+        stats: Dict[str, Any] = {"kind": kind, "count": int(present.size), "nulls": self.num_rows - int(present.size)}
+        if not present.size:
+            return stats
+        if kind in ("int", "float"):
+            quartiles = np.percentile(present, [0, 25, 50, 75, 100])
+            stats.update(
+                mean=float(present.mean()),
+                std=float(present.std(ddof=1)) if present.size > 1 else 0.0,
+                min=float(quartiles[0]), p25=float(quartiles[1]), median=float(quartiles[2]),
+                p75=float(quartiles[3]), max=float(quartiles[4]),
+            )
+        elif kind == "date":
+            stats.update(min=str(present.min()), max=str(present.max()))
+        else:
+            values, counts = np.unique(present, return_counts=True)
+            order = np.argsort(-counts, kind="stable")[:top]
+            stats.update(
+                distinct=int(values.size),
+                top=[(str(values[i]), int(counts[i]), float(counts[i] / present.size)) for i in order],
+            )
+        return stats
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """Summary statistics of every column."""
+        return {name: self.column_stats(name) for name in self.columns}
+
+    def group_shares(self, key: str, measure: Optional[str] = None) -> List[Tuple[str, float, float]]:
+        """
+        Total and share of ``measure`` (or of rows) per value of ``key``.
+
+        Returns:
+            ``(value, total, share)`` tuples, largest share first.
+        """
+        groups, inverse = np.unique(self.columns[key], return_inverse=True)
+        weights = None
+        if measure is not None:
+            weights = self.columns[measure].astype(np.float64)
+            weights = np.where(np.isnan(weights), 0.0, weights)
+        totals = np.bincount(inverse.reshape(-1), weights=weights, minlength=groups.size)
+        overall = totals.sum()
+        shares = totals / overall if overall else np.zeros_like(totals, dtype=np.float64)
+        order = np.argsort(-totals, kind="stable")
+        return [(str(groups[i]), float(totals[i]), float(shares[i])) for i in order]
+
+    def _share_columns(self) -> Optional[Tuple[str, List[str]]]:
+        # An aggregated result: a text key that is unique per row and additive (non-negative integer) measures
+        keys = [name for name, kind in self.kinds.items() if kind == "str"]
+        if len(keys) != 1 or self.num_rows < 2:
+            return None
+        key = keys[0]
+        if np.unique(self.columns[key]).size != self.num_rows:
+            return None
+        measures = [
+            name for name, kind in self.kinds.items()
+            if kind == "int" and self.columns[name].size and self.columns[name].min() >= 0
+        ]
+        return (key, measures) if measures else None
+
+    def summary_lines(self, top: int = 3, top_groups: int = 5) -> List[str]:
+        """Describe the frame's columns (and group shares of aggregated results) in compact text."""
+        lines = []
+        for name in self.columns:
+            stats = self.column_stats(name, top=top)
+            kind = stats["kind"]
+            if not stats["count"]:
+                line = f"- {name}: {kind}, all null"
+            elif kind in ("int", "float"):
+                line = (
+                    f"- {name}: numeric, mean {stats['mean']:.4g}, std {stats['std']:.4g}, "
+                    f"min {stats['min']:g}, p25 {stats['p25']:.4g}, median {stats['median']:.4g}, "
+                    f"p75 {stats['p75']:.4g}, max {stats['max']:g}"
+                )
+            elif kind == "date":
+                line = f"- {name}: date, {stats['min']} to {stats['max']}"
+            elif stats["distinct"] == stats["count"]:
+                line = f"- {name}: text, all {stats['distinct']} values distinct"
+            else:
+                shares = ", ".join(f"{_label(value)} ({share:.1%})" for value, _, share in stats["top"])
+                line = f"- {name}: text, {stats['distinct']} distinct, most frequent {shares}"
+            if stats["nulls"]:
+                line += f", {stats['nulls']} nulls"
+            lines.append(line)
+        share_columns = self._share_columns()
+        if share_columns is not None:
+            key, measures = share_columns
+            for measure in measures:
+                shares = self.group_shares(key, measure)[:top_groups]
+                listed = ", ".join(f"{_label(value)} {share:.1%}" for value, _, share in shares)
+                lines.append(f"- share of {measure} by {key}: {listed}")
+        return lines
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Rows as dicts of Python values (nulls as None)."""
+        return [dict(zip(self.columns, row)) for row in zip(*self.to_dict()["data"].values())]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable columnar form: column kinds and one value list per column."""
+        data = {}
+        for name, values in self.columns.items():
+            kind = self.kinds[name]
+            if kind == "float":
+                data[name] = [None if np.isnan(value) else float(value) for value in values]
+            elif kind == "date":
+                data[name] = [None if np.isnat(value) else str(value) for value in values]
+            elif kind == "str":
+                data[name] = [value or None for value in values.tolist()]
+            else:
+                data[name] = values.tolist()
+        return {"frame_id": self.frame_id, "query": self.query, "rows": self.num_rows, "kinds": self.kinds, "data": data}
+
+    def to_pandas(self):
+        """Convert to a ``pandas.DataFrame`` (pandas is imported on first use)."""
+        import pandas as pd
+
+        return pd.DataFrame({name: values for name, values in self.columns.items()})
+
+
+class FrameStore:
+    """Bounded in-memory store of recent result frames, usable as SQL tool middleware."""
+
+    def __init__(self, max_frames: int = 64):
+        self.max_frames = max_frames
+        self.stats = {"frames": 0, "rows": 0, "evictions": 0}
+        self._frames: "OrderedDict[str, ResultFrame]" = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config) -> "FrameStore":
+        """Create a frame store from an ``AgentConfig`` instance."""
+        return cls(max_frames=config.frame_max)
+
+    def add(self, frame: ResultFrame) -> str:
+        """Keep ``frame``, evicting the least recently used ones beyond ``max_frames``."""
+        self._frames[frame.frame_id] = frame
+        self.stats["frames"] += 1
+        self.stats["rows"] += frame.num_rows
+        while len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+            self.stats["evictions"] += 1
+        return frame.frame_id
+
+    def get(self, frame_id: str) -> Optional[ResultFrame]:
+        frame = self._frames.get(frame_id)
+        if frame is not None:
+            self._frames.move_to_end(frame_id)
+        return frame
+
+    def frames_for(self, messages: Optional[List]) -> List[ResultFrame]:
+        """Frames of the tool results in the latest turn of ``messages``, in call order."""
+        frames = []
+        for message in reversed(messages or []):
+            if message.type == "human":
+                break
+            artifact = getattr(message, "artifact", None)
+            if message.type == "tool" and isinstance(artifact, dict) and "frame_id" in artifact:
+                frame = self.get(artifact["frame_id"])
+                if frame is not None:
+                    frames.append(frame)
+        frames.reverse()
+        return frames
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``: frame results not framed yet."""
+        content, artifact = await call_next(**arguments)
+        if isinstance(artifact, dict) and "frame_id" in artifact:
+            return content, artifact
+        if artifact is not None and not isinstance(artifact, dict):
+            return content, artifact
+        frame = ResultFrame.from_text(result_text(content), query=arguments.get("query"))
+        if frame is None:
+            return content, artifact
+        self.add(frame)
+        return content, {**(artifact or {}), "frame_id": frame.frame_id, "rows": frame.num_rows}
@@ -0,0 +1,1289 @@
+"""
+In-process columnar analytics engine over the shipped client data.
+
+``Data/client_data.csv`` holds the same ``client_data`` table the agent
+queries in MySQL. ``ColumnarStore`` loads it once into typed NumPy arrays,
+snapshots them as ``.npy`` files and memory-maps the snapshot on later
+starts. ``LocalSQLEngine`` answers the single-table SELECT subset the agent
+mostly issues (filters, GROUP BY, aggregates, CASE, ORDER BY, LIMIT) with
+vectorized NumPy operations in milliseconds.
+
+Anything outside that subset raises ``UnsupportedQuery``; the
+``query_local_data`` tool built by ``create_local_sql_tool`` then falls
+back to the MCP ``execute_sql`` tool, so callers always get an answer.
+Tables whose MySQL copy changed go the same way for the rest of the
+process: writes through ``execute_sql`` are seen as they happen, other
+changes by the ``information_schema`` version probe of ``sql_cache``.
+The probe only sees changes made after startup, so the CSV must match
+the database when the agent starts.
+"""
+
+import csv
+import json
+import os
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.logging import get_logger
+from sql_cache import VERSION_PROBE_QUERY
+from sql_tools import (
+    CallNext, ToolResult, first_keyword, is_error_result, is_read_query, is_write_query, parse_result,
+    referenced_tables, result_text,
+)
+
+logger = get_logger('local_engine')
+
+LOCAL_TOOL_NAME = "query_local_data"
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class UnsupportedQuery(Exception):
+    """Raised when a query is outside the subset the local engine can answer."""
+
+
+# ---------------------------------------------------------------------------
+# Columnar storage
+# ---------------------------------------------------------------------------
+
+def infer_array(values: List[str]) -> Tuple[np.ndarray, str]:
+    """
+    Convert a column of text values into the narrowest typed array.
+
+    Returns:
+        The array and its kind: ``int``, ``float``, ``date`` or ``str``.
+        Empty strings become NaN in float columns.
+    """
+    non_empty = [v for v in values if v != ""]
+    if non_empty and len(non_empty) == len(values):
+        try:
+            return np.array([int(v) for v in values], dtype=np.int64), "int"
+        except ValueError:
+            pass
+    try:
+        return np.array([float(v) if v != "" else np.nan for v in values], dtype=np.float64), "float"
+    except ValueError:
+        pass
+    if non_empty and all(_DATE_RE.match(v) for v in non_empty):
+        return np.array([v if v != "" else "NaT" for v in values], dtype="datetime64[D]"), "date"
+    return np.array(values, dtype=str), "str"
+
+
+@dataclass
+class ColumnarTable:
+    name: str
+    columns: Dict[str, np.ndarray]
+    kinds: Dict[str, str]
+    # Text columns are also dictionary encoded: codes index into the sorted distinct values
+    codes: Dict[str, np.ndarray] = field(default_factory=dict)
+    dictionaries: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def num_rows(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def has_column(self, name: str) -> bool:
+        return any(column.lower() == name.lower() for column in self.columns)
+
+
+class ColumnarStore:
+    """Typed, memory-mappable column store keyed by table name."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.tables: Dict[str, ColumnarTable] = {}
+
+    def _snapshot_dir(self, name: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    def load_csv(self, path: str, name: Optional[str] = None) -> ColumnarTable:
+        """
+        Load a CSV file as a table, reusing a memory-mapped snapshot when it
+        was built from the same file (same size and modification time).
+        """
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        stat = os.stat(path)
+        source = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+        snapshot = self.load_snapshot(name)
+        if snapshot is not None and snapshot[1] == source:
+            table = snapshot[0]
+            self.tables[name.lower()] = table
+            logger.info(f"Memory-mapped columnar snapshot of {name} ({table.num_rows} rows)")
+            return table
+
+        started = time.perf_counter()
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            raw = list(zip(*reader)) if header else []
+        table = self.add_table(name, header, [list(values) for values in raw] if raw else [[] for _ in header], source)
+        logger.info(f"Loaded {name} from CSV in {time.perf_counter() - started:.2f}s ({table.num_rows} rows)")
+        return table
+
+    def load_snapshot(self, name: str) -> Optional[Tuple[ColumnarTable, Any]]:
+        """
+        Memory-map the snapshot of a table without registering it.
+
+        Returns:
+            The table and the ``source`` it was built from, or None without a snapshot.
+        """
+        snapshot = self._snapshot_dir(name)
+        if not snapshot or not os.path.exists(os.path.join(snapshot, "meta.json")):
+            return None
+        try:
+            with open(os.path.join(snapshot, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            table = ColumnarTable(name=name, columns={}, kinds=meta["kinds"])
+            for index, column in enumerate(meta["columns"]):
+                base = os.path.join(snapshot, str(index))
+                table.columns[column] = np.load(f"{base}.npy", mmap_mode="r")
+                if table.kinds[column] == "str":
+                    table.codes[column] = np.load(f"{base}.codes.npy", mmap_mode="r")
+                    table.dictionaries[column] = np.load(f"{base}.dict.npy")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable columnar snapshot of {name}: {e}")
+            return None
+        return table, meta.get("source")
+
+    def add_table(self, name: str, header: List[str], values: List[List[str]], source: Any = None) -> ColumnarTable:
+        """
+        Register a table built from text values, one list per column, and
+        snapshot it (with ``source`` recorded) when the store has a cache directory.
+        """
+        columns, kinds = {}, {}
+        for index, column in enumerate(header):
+            columns[column], kinds[column] = infer_array(values[index])
+        table = ColumnarTable(name=name, columns=columns, kinds=kinds)
+        for column, kind in kinds.items():
+            if kind == "str":
+                dictionary, codes = np.unique(columns[column], return_inverse=True)
+                table.dictionaries[column] = dictionary
+                table.codes[column] = codes.reshape(-1).astype(np.int32)
+        self.tables[name.lower()] = table
+
+        snapshot = self._snapshot_dir(name)
+        if snapshot:
+            self._write_snapshot(table, snapshot, source)
+        return table
+
+    def _write_snapshot(self, table: ColumnarTable, snapshot: str, source: dict) -> None:
+        try:
+            os.makedirs(snapshot, exist_ok=True)
+            names = list(table.columns)
+            for index, column in enumerate(names):
+                base = os.path.join(snapshot, str(index))
+                np.save(f"{base}.npy", table.columns[column])
+                if column in table.codes:
+                    np.save(f"{base}.codes.npy", table.codes[column])
+                    np.save(f"{base}.dict.npy", table.dictionaries[column])
+            with open(os.path.join(snapshot, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"source": source, "columns": names, "kinds": table.kinds}, f)
+        except OSError as e:
+            logger.warning(f"Could not write columnar snapshot for {table.name}: {e}")
+
+    def get(self, name: str) -> ColumnarTable:
+        table = self.tables.get(name.lower())
+        if table is None:
+            raise UnsupportedQuery(f"Table {name} is not available locally")
+        return table
+
+
+# ---------------------------------------------------------------------------
+# SQL subset parser
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<num>\d+\.\d*|\.\d+|\d+)|(?P<str>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\")"
+    r"|(?P<ident>`[^`]+`|[A-Za-z_][A-Za-z_0-9$]*)|(?P<op><=|>=|<>|!=|[=<>+\-*/%(),.;]))"
+)
+
+AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "STD", "STDDEV", "STDDEV_POP", "VARIANCE", "VAR_POP"}
+KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT", "OFFSET", "AS",
+    "AND", "OR", "NOT", "IN", "IS", "NULL", "BETWEEN", "LIKE", "ASC", "DESC", "DISTINCT",
+    "CASE", "WHEN", "THEN", "ELSE", "END", "TRUE", "FALSE",
+}
+
+
+@dataclass
+class Token:
+    kind: str
+    value: Any
+    start: int
+    end: int
+
+
+@dataclass
+class Query:
+    select: List[Tuple[Any, str]]
+    table: str
+    where: Any = None
+    group_by: List[Any] = field(default_factory=list)
+    having: Any = None
+    order_by: List[Tuple[Any, bool]] = field(default_factory=list)
+    limit: Optional[int] = None
+    offset: int = 0
+    distinct: bool = False
+
+
+def tokenize(sql: str) -> List[Token]:
+    tokens, position = [], 0
+    sql = sql.strip()
+    while position < len(sql):
+        match = _TOKEN_RE.match(sql, position)
+        if not match or match.end() == position:
+            raise UnsupportedQuery(f"Cannot tokenize near: {sql[position:position + 20]}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        start = match.start(kind)
+        if kind == "num":
+            tokens.append(Token("num", float(text) if "." in text else int(text), start, match.end()))
+        elif kind == "str":
+            body = text[1:-1].replace("''", "'").replace("\\'", "'").replace('\\"', '"')
+            tokens.append(Token("str", body, start, match.end()))
+        elif kind == "ident":
+            if text.startswith("`"):
+                tokens.append(Token("ident", text[1:-1], start, match.end()))
+            elif text.upper() in KEYWORDS:
+                tokens.append(Token("kw", text.upper(), start, match.end()))
+            else:
+                tokens.append(Token("ident", text, start, match.end()))
+        else:
+            tokens.append(Token("op", text, start, match.end()))
+        position = match.end()
+    while tokens and tokens[-1].kind == "op" and tokens[-1].value == ";":
+        tokens.pop()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser for single-table SELECT statements."""
+
+    def __init__(self, sql: str):
+        self.sql = sql.strip()
+        self.tokens = tokenize(sql)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def at(self, kind: str, value: Any = None, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token is not None and token.kind == kind and (value is None or token.value == value)
+
+    def accept(self, kind: str, value: Any = None) -> Optional[Token]:
+        if self.at(kind, value):
+            token = self.tokens[self.position]
+            self.position += 1
+            return token
+        return None
+
+    def expect(self, kind: str, value: Any = None) -> Token:
+        token = self.accept(kind, value)
+        if token is None:
+            found = self.peek()
+            raise UnsupportedQuery(f"Expected {value or kind}, found {found.value if found else 'end of query'}")
+        return token
+
+    def parse(self) -> Query:
+        self.expect("kw", "SELECT")
+        distinct = bool(self.accept("kw", "DISTINCT"))
+        select = [self.select_item()]
+        while self.accept("op", ","):
+            select.append(self.select_item())
+        self.expect("kw", "FROM")
+        table = self.expect("ident").value
+        if self.accept("op", "."):
+            table = self.expect("ident").value
+        if self.at("ident") or self.at("kw", "AS"):
+            raise UnsupportedQuery("Table aliases are not supported locally")
+
+        query = Query(select=select, table=table, distinct=distinct)
+        if self.accept("kw", "WHERE"):
+            query.where = self.expression()
+        if self.accept("kw", "GROUP"):
+            self.expect("kw", "BY")
+            query.group_by = [self.expression()]
+            while self.accept("op", ","):
+                query.group_by.append(self.expression())
+        if self.accept("kw", "HAVING"):
+            query.having = self.expression()
+        if self.accept("kw", "ORDER"):
+            self.expect("kw", "BY")
+            query.order_by = [self.order_item()]
+            while self.accept("op", ","):
+                query.order_by.append(self.order_item())
+        if self.accept("kw", "LIMIT"):
+            first = self.expect("num").value
+            if self.accept("op", ","):
+                query.offset, query.limit = int(first), int(self.expect("num").value)
+            else:
+                query.limit = int(first)
+                if self.accept("kw", "OFFSET"):
+                    query.offset = int(self.expect("num").value)
+        if self.peek() is not None:
+            raise UnsupportedQuery(f"Unsupported clause near: {self.peek().value}")
+        return query
+
+    def select_item(self) -> Tuple[Any, str]:
+        if self.accept("op", "*"):
+            return ("star",), "*"
+        start = self.peek().start if self.peek() else len(self.sql)
+        expression = self.expression()
+        end = self.tokens[self.position - 1].end
+        label = self.sql[start:end]
+        if self.accept("kw", "AS"):
+            label = self.alias()
+        elif self.at("ident") or self.at("str"):
+            label = self.alias()
+        return expression, label
+
+    def alias(self) -> str:
+        token = self.accept("ident") or self.expect("str")
+        return token.value
+
+    def order_item(self) -> Tuple[Any, bool]:
+        expression = self.expression()
+        descending = False
+        if self.accept("kw", "DESC"):
+            descending = True
+        else:
+            self.accept("kw", "ASC")
+        return expression, descending
+
+    # Expressions, lowest precedence first
+    def expression(self):
+        left = self.conjunction()
+        while self.accept("kw", "OR"):
+            left = ("or", left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.accept("kw", "AND"):
+            left = ("and", left, self.negation())
+        return left
+
+    def negation(self):
+        if self.accept("kw", "NOT"):
+            return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.additive()
+        negated = bool(self.accept("kw", "NOT"))
+        if self.accept("kw", "IN"):
+            self.expect("op", "(")
+            if self.at("kw", "SELECT"):
+                raise UnsupportedQuery("Subqueries are not supported locally")
+            values = [self.additive()]
+            while self.accept("op", ","):
+                values.append(self.additive())
+            self.expect("op", ")")
+            node = ("in", left, values)
+        elif self.accept("kw", "BETWEEN"):
+            low = self.additive()
+            self.expect("kw", "AND")
+            node = ("between", left, low, self.additive())
+        elif self.accept("kw", "LIKE"):
+            node = ("like", left, self.expect("str").value)
+        elif negated:
+            raise UnsupportedQuery("Unexpected NOT")
+        elif self.accept("kw", "IS"):
+            is_not = bool(self.accept("kw", "NOT"))
+            self.expect("kw", "NULL")
+            node = ("isnull", left)
+            return ("not", node) if is_not else node
+        elif self.at("op") and self.peek().value in ("=", "!=", "<>", "<", "<=", ">", ">="):
+            op = self.accept("op").value
+            return ("cmp", "!=" if op == "<>" else op, left, self.additive())
+        else:
+            return left
+        return ("not", node) if negated else node
+
+    def additive(self):
+        left = self.multiplicative()
+        while self.at("op") and self.peek().value in ("+", "-"):
+            left = ("arith", self.accept("op").value, left, self.multiplicative())
+        return left
+
+    def multiplicative(self):
+        left = self.unary()
+        while self.at("op") and self.peek().value in ("*", "/", "%"):
+            left = ("arith", self.accept("op").value, left, self.unary())
+        return left
+
+    def unary(self):
+        if self.accept("op", "-"):
+            return ("arith", "-", ("lit", 0), self.unary())
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token is None:
+            raise UnsupportedQuery("Unexpected end of query")
+        if self.accept("op", "("):
+            if self.at("kw", "SELECT"):
+                raise UnsupportedQuery("Subqueries are not supported locally")
+            node = self.expression()
+            self.expect("op", ")")
+            return node
+        if token.kind in ("num", "str"):
+            self.position += 1
+            return ("lit", token.value)
+        if self.accept("kw", "NULL"):
+            return ("lit", None)
+        if self.accept("kw", "TRUE"):
+            return ("lit", 1)
+        if self.accept("kw", "FALSE"):
+            return ("lit", 0)
+        if self.accept("kw", "CASE"):
+            return self.case()
+        if token.kind == "ident":
+            self.position += 1
+            if self.accept("op", "("):
+                return self.function(token.value.upper())
+            name = token.value
+            if self.accept("op", "."):
+                # table.column: the table qualifier is ignored for single-table queries
+                name = self.expect("ident").value
+            return ("col", name)
+        raise UnsupportedQuery(f"Unsupported token: {token.value}")
+
+    def function(self, name: str):
+        if name in AGGREGATES:
+            distinct = bool(self.accept("kw", "DISTINCT"))
+            if name == "COUNT" and self.accept("op", "*"):
+                argument = ("star",)
+            else:
+                argument = self.expression()
+            self.expect("op", ")")
+            return ("agg", name, argument, distinct)
+        arguments = []
+        if not self.accept("op", ")"):
+            arguments.append(self.expression())
+            while self.accept("op", ","):
+                arguments.append(self.expression())
+            self.expect("op", ")")
+        if name not in SCALAR_FUNCTIONS:
+            raise UnsupportedQuery(f"Function {name} is not supported locally")
+        return ("func", name, arguments)
+
+    def case(self):
+        branches = []
+        default = ("lit", None)
+        while self.accept("kw", "WHEN"):
+            condition = self.expression()
+            self.expect("kw", "THEN")
+            branches.append((condition, self.expression()))
+        if self.accept("kw", "ELSE"):
+            default = self.expression()
+        self.expect("kw", "END")
+        if not branches:
+            raise UnsupportedQuery("Only searched CASE WHEN expressions are supported locally")
+        return ("case", branches, default)
+
+
+def parse_sql(sql: str) -> Query:
+    """Parse a SELECT statement into a ``Query`` or raise ``UnsupportedQuery``."""
+    return Parser(sql).parse()
+
+
+# ---------------------------------------------------------------------------
+# Vectorized evaluation
+# ---------------------------------------------------------------------------
+
+def _is_null(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind == "f":
+        return np.isnan(values)
+    if values.dtype.kind == "M":
+        return np.isnat(values)
+    if values.dtype.kind == "O":
+        return np.array([v is None for v in values], dtype=bool)
+    return np.zeros(len(values), dtype=bool)
+
+
+def _round(values, digits=None):
+    digits = 0 if digits is None else int(np.asarray(digits).flat[0])
+    return np.round(values.astype(np.float64), digits)
+
+
+def _date_part(part):
+    def extract(values):
+        if values.dtype.kind != "M":
+            values = values.astype("datetime64[D]")
+        years = values.astype("datetime64[Y]")
+        if part == "year":
+            return years.astype(np.int64) + 1970
+        months = values.astype("datetime64[M]")
+        if part == "month":
+            return (months - years).astype(np.int64) + 1
+        return (values - months).astype(np.int64) + 1
+    return extract
+
+
+def _coalesce(*arrays):
+    result = arrays[0].copy() if arrays[0].dtype.kind != "f" else arrays[0].astype(np.float64)
+    for other in arrays[1:]:
+        missing = _is_null(result)
+        if not missing.any():
+            break
+        result = np.where(missing, other, result)
+    return result
+
+
+SCALAR_FUNCTIONS = {
+    "ROUND": _round,
+    "ABS": lambda values: np.abs(values),
+    "YEAR": _date_part("year"),
+    "MONTH": _date_part("month"),
+    "DAY": _date_part("day"),
+    "LOWER": lambda values: np.char.lower(values.astype(str)),
+    "UPPER": lambda values: np.char.upper(values.astype(str)),
+    "COALESCE": _coalesce,
+    "IFNULL": _coalesce,
+    "DATEDIFF": lambda a, b: (a.astype("datetime64[D]") - b.astype("datetime64[D]")).astype(np.int64),
+}
+
+
+def _contains_aggregate(node) -> bool:
+    if isinstance(node, list):
+        return any(_contains_aggregate(child) for child in node)
+    if not isinstance(node, tuple) or not node:
+        return False
+    if node[0] == "agg":
+        return True
+    return any(_contains_aggregate(child) for child in node if isinstance(child, (tuple, list)))
+
+
+def _coerce_literal(value, like: np.ndarray):
+    """Convert a literal so it compares correctly against a column."""
+    if like.dtype.kind == "M" and isinstance(value, str):
+        try:
+            return np.datetime64(value[:10], "D")
+        except ValueError:
+            raise UnsupportedQuery(f"Invalid date literal: {value}")
+    if like.dtype.kind in "iuf" and isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            raise UnsupportedQuery(f"Comparing a numeric column with text: {value}")
+    if like.dtype.kind == "U" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+_COMPARISONS = {
+    "=": np.equal, "!=": np.not_equal, "<": np.less,
+    "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+
+
+def _fold(value):
+    """Lower-case text so comparisons match MySQL's case-insensitive ``_ci`` collations."""
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, np.ndarray) and value.dtype.kind == "U":
+        return np.char.lower(value)
+    if isinstance(value, np.ndarray) and value.dtype.kind == "O":
+        return np.array([item.lower() if isinstance(item, str) else item for item in value], dtype=object)
+    return value
+
+
+def _like_regex(pattern: str) -> re.Pattern:
+    parts = []
+    for char in pattern:
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("^" + "".join(parts) + "$", re.IGNORECASE | re.DOTALL)
+
+
+class Evaluator:
+    """Evaluates expression trees against the selected rows of a table."""
+
+    def __init__(self, table: ColumnarTable, rows: np.ndarray):
+        self.table = table
+        self.rows = rows
+        self.count = len(rows)
+        self._column_map = {name.lower(): name for name in table.columns}
+
+    def column(self, name: str) -> np.ndarray:
+        actual = self._column_map.get(name.lower())
+        if actual is None:
+            raise UnsupportedQuery(f"Unknown column: {name}")
+        return np.asarray(self.table.columns[actual][self.rows])
+
+    def codes(self, node) -> Tuple[np.ndarray, int]:
+        """
+        Dense integer codes for an expression's values and the number of codes.
+
+        Dictionary-encoded text columns reuse their stored codes instead of
+        sorting strings.
+        """
+        if node[0] == "col":
+            actual = self._column_map.get(node[1].lower())
+            if actual in self.table.codes:
+                return np.asarray(self.table.codes[actual][self.rows]), len(self.table.dictionaries[actual])
+        values = self.rows_eval(node)
+        if values.dtype.kind == "O":
+            values = values.astype(str)
+        distinct, inverse = np.unique(values, return_inverse=True)
+        return inverse.reshape(-1), len(distinct)
+
+    def _dictionary_match(self, node, predicate) -> Optional[np.ndarray]:
+        """
+        Mask of rows whose text value satisfies ``predicate``, or None when
+        ``node`` is not a dictionary-encoded column.
+
+        Each distinct value is tested once and the result looked up by code.
+        """
+        actual = self._column_map.get(node[1].lower()) if node[0] == "col" else None
+        if actual not in self.table.codes:
+            return None
+        matches = np.asarray(predicate(self.table.dictionaries[actual]), dtype=bool)
+        return matches[np.asarray(self.table.codes[actual][self.rows])]
+
+    def _broadcast(self, value) -> np.ndarray:
+        if value is None:
+            return np.full(self.count, np.nan)
+        return np.full(self.count, value)
+
+    def rows_eval(self, node) -> np.ndarray:
+        """Evaluate a row-level (non-aggregate) expression."""
+        kind = node[0]
+        if kind == "col":
+            return self.column(node[1])
+        if kind == "lit":
+            return self._broadcast(node[1])
+        if kind == "arith":
+            return self._arith(node[1], self.rows_eval(node[2]), self.rows_eval(node[3]))
+        if kind == "func":
+            return SCALAR_FUNCTIONS[node[1]](*[self.rows_eval(arg) for arg in node[2]])
+        if kind == "case":
+            conditions = [self.condition(cond) for cond, _ in node[1]]
+            choices = [self.rows_eval(value) for _, value in node[1]]
+            default = self.rows_eval(node[2])
+            return _select(conditions, choices, default)
+        if kind in ("cmp", "and", "or", "not", "in", "between", "like", "isnull"):
+            return _truth_values(*self.truth(node))
+        if kind == "agg":
+            raise UnsupportedQuery("Aggregate used outside an aggregate context")
+        raise UnsupportedQuery(f"Unsupported expression: {kind}")
+
+    def _arith(self, op: str, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        if left.dtype.kind not in "iufb" or right.dtype.kind not in "iufb":
+            raise UnsupportedQuery("Arithmetic on non-numeric values is not supported locally")
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        with np.errstate(divide="ignore", invalid="ignore"):
+            left, right = left.astype(np.float64), right.astype(np.float64)
+            result = left / right if op == "/" else np.fmod(left, right)
+        # Division by zero is NULL in MySQL
+        result[right == 0] = np.nan
+        return result
+
+    def condition(self, node) -> np.ndarray:
+        """Evaluate a predicate to a boolean mask of the rows where it is TRUE (not FALSE or NULL)."""
+        return self.truth(node)[0]
+
+    def truth(self, node) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate a predicate with SQL three-valued logic.
+
+        Returns:
+            Masks of the rows where it is TRUE and where it is NULL (unknown).
+        """
+        kind = node[0]
+        if kind in ("and", "or", "not"):
+            return _logic(kind, *[self.truth(operand) for operand in node[1:]])
+        if kind == "isnull":
+            return _is_null(self.rows_eval(node[1])), np.zeros(self.count, dtype=bool)
+        if kind == "cmp":
+            return self._compare(node[1], node[2], node[3])
+        if kind == "in":
+            if any(item[0] != "lit" for item in node[2]):
+                raise UnsupportedQuery("IN lists must contain literals locally")
+            literals = [item[1] for item in node[2]]
+            if all(isinstance(literal, str) for literal in literals):
+                folded = [literal.lower() for literal in literals]
+                mask = self._dictionary_match(node[1], lambda dictionary: np.isin(_fold(dictionary), folded))
+                if mask is not None:
+                    return mask, np.zeros(self.count, dtype=bool)
+            values = self.rows_eval(node[1])
+            null = _is_null(values)
+            values = _fold(values)
+            mask = np.zeros(self.count, dtype=bool)
+            for literal in literals:
+                if literal is not None:
+                    mask |= values == _fold(_coerce_literal(literal, values))
+            # x NOT IN (..., NULL) is NULL, never TRUE
+            if any(literal is None for literal in literals):
+                null = null | ~mask
+            return mask & ~null, null
+        if kind == "between":
+            return self.truth(("and", ("cmp", ">=", node[1], node[2]), ("cmp", "<=", node[1], node[3])))
+        if kind == "like":
+            pattern = _like_regex(node[2])
+            mask = self._dictionary_match(node[1], lambda dictionary: [bool(pattern.match(v)) for v in dictionary])
+            if mask is not None:
+                return mask, np.zeros(self.count, dtype=bool)
+            values = self.rows_eval(node[1])
+            null = _is_null(values)
+            mask = np.array([bool(pattern.match(v)) for v in values.astype(str)], dtype=bool)
+            return mask & ~null, null
+        values = self.rows_eval(node)
+        null = _is_null(values)
+        with np.errstate(invalid="ignore"):
+            return (values.astype(np.float64) != 0) & ~null, null
+
+    def _compare(self, op: str, left_node, right_node) -> Tuple[np.ndarray, np.ndarray]:
+        """TRUE and NULL masks of a comparison; text compares case-insensitively."""
+        no_nulls = np.zeros(self.count, dtype=bool)
+        if op in ("=", "!=") and left_node[0] == "col" and right_node[0] == "lit" and isinstance(right_node[1], str):
+            literal = right_node[1].lower()
+            mask = self._dictionary_match(left_node, lambda dictionary: _fold(dictionary) == literal)
+            if mask is not None:
+                return (mask if op == "=" else ~mask), no_nulls
+        left = self.rows_eval(left_node) if left_node[0] != "lit" else None
+        right = self.rows_eval(right_node) if right_node[0] != "lit" else None
+        if left is None and right is None:
+            left = self._broadcast(left_node[1])
+        if left is None:
+            left = _coerce_literal(left_node[1], right)
+        if right is None:
+            right = _coerce_literal(right_node[1], left)
+        if right is None or left is None:
+            # Comparing with a NULL literal
+            return no_nulls, ~no_nulls
+        null = no_nulls
+        for side in (left, right):
+            if isinstance(side, np.ndarray):
+                null = null | _is_null(side)
+        if isinstance(left, np.ndarray) and isinstance(right, np.ndarray) and left.dtype.kind != right.dtype.kind:
+            if {left.dtype.kind, right.dtype.kind} - set("iufb"):
+                if left.dtype.kind == "U" or right.dtype.kind == "U":
+                    left, right = left.astype(str), right.astype(str)
+        with np.errstate(invalid="ignore"):
+            result = _COMPARISONS[op](_fold(left), _fold(right))
+        return np.asarray(result, dtype=bool) & ~null, null
+
+
+def _logic(kind: str, *operands: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Combine ``(true, null)`` masks with SQL's three-valued AND, OR or NOT."""
+    if kind == "not":
+        true, null = operands[0]
+        return ~true & ~null, null
+    (left_true, left_null), (right_true, right_null) = operands
+    if kind == "and":
+        true = left_true & right_true
+        false = (~left_true & ~left_null) | (~right_true & ~right_null)
+        return true, ~true & ~false
+    true = left_true | right_true
+    return true, (left_null | right_null) & ~true
+
+
+def _truth_values(true: np.ndarray, null: np.ndarray) -> np.ndarray:
+    """A predicate's value per row: 1, 0, or NaN (NULL) where it is unknown."""
+    if not null.any():
+        return true.astype(np.int64)
+    return np.where(null, np.nan, true.astype(np.float64))
+
+
+def _select(conditions: List[np.ndarray], choices: List[np.ndarray], default: np.ndarray) -> np.ndarray:
+    kinds = {c.dtype.kind for c in choices + [default]}
+    if kinds <= set("iub"):
+        return np.select(conditions, choices, default).astype(np.int64)
+    if kinds <= set("iufb"):
+        return np.select(conditions, [c.astype(np.float64) for c in choices], default.astype(np.float64))
+    return np.select(conditions, [c.astype(object) for c in choices], default.astype(object))
+
+
+class GroupedEvaluator:
+    """Evaluates expressions once per group, computing aggregates with NumPy."""
+
+    def __init__(self, rows_eval: Evaluator, group_ids: np.ndarray, num_groups: int, representatives: np.ndarray):
+        self.rows_eval = rows_eval
+        self.group_ids = group_ids
+        self.num_groups = num_groups
+        self.representatives = representatives
+
+    def eval(self, node) -> np.ndarray:
+        kind = node[0]
+        if kind == "agg":
+            return self.aggregate(node[1], node[2], node[3])
+        if kind == "lit":
+            return np.full(self.num_groups, np.nan if node[1] is None else node[1])
+        if kind == "col":
+            return self.rows_eval.column(node[1])[self.representatives]
+        if kind == "arith":
+            evaluator = Evaluator.__new__(Evaluator)
+            return Evaluator._arith(evaluator, node[1], self.eval(node[2]), self.eval(node[3]))
+        if kind == "func":
+            return SCALAR_FUNCTIONS[node[1]](*[self.eval(arg) for arg in node[2]])
+        if kind in ("cmp", "and", "or", "not", "isnull", "between", "in", "case", "like"):
+            if not _contains_aggregate(node):
+                return self.rows_eval.rows_eval(node)[self.representatives]
+            return self._grouped_condition(node)
+        raise UnsupportedQuery(f"Unsupported expression: {kind}")
+
+    def _grouped_condition(self, node) -> np.ndarray:
+        kind = node[0]
+        if kind in ("and", "or", "not"):
+            return _truth_values(*_logic(kind, *[self.truth(operand) for operand in node[1:]]))
+        if kind == "cmp":
+            left, right = self.eval(node[2]), self.eval(node[3])
+            null = _is_null(left) | _is_null(right)
+            valid = ~null
+            result = np.zeros(self.num_groups, dtype=bool)
+            if valid.any():
+                with np.errstate(invalid="ignore"):
+                    result[valid] = _COMPARISONS[node[1]](_fold(left[valid]), _fold(right[valid]))
+            return _truth_values(result, null)
+        if kind == "between":
+            return self._grouped_condition(("and", ("cmp", ">=", node[1], node[2]), ("cmp", "<=", node[1], node[3])))
+        raise UnsupportedQuery("Aggregates inside this expression are not supported locally")
+
+    def truth(self, node) -> Tuple[np.ndarray, np.ndarray]:
+        """TRUE and NULL masks of a per-group predicate."""
+        values = self.eval(node)
+        null = _is_null(values)
+        with np.errstate(invalid="ignore"):
+            true = np.where(null, 0, values).astype(np.float64) != 0
+        return true & ~null, null
+
+    def condition(self, node) -> np.ndarray:
+        return self.truth(node)[0]
+
+    def aggregate(self, name: str, argument, distinct: bool) -> np.ndarray:
+        groups, size = self.group_ids, self.num_groups
+        if argument[0] == "star":
+            return np.bincount(groups, minlength=size).astype(np.int64)
+        values = self.rows_eval.rows_eval(argument)
+        valid = ~_is_null(values)
+        values, groups = values[valid], groups[valid]
+
+        if distinct:
+            codes, cardinality = self.rows_eval.codes(argument)
+            codes, cardinality = codes[valid], max(cardinality, 1)
+            pairs = np.unique(groups.astype(np.int64) * cardinality + codes)
+            groups = pairs // cardinality
+            if name == "COUNT":
+                return np.bincount(groups, minlength=size).astype(np.int64)
+            raise UnsupportedQuery(f"{name}(DISTINCT ...) is not supported locally")
+
+        counts = np.bincount(groups, minlength=size)
+        if name == "COUNT":
+            return counts.astype(np.int64)
+        if name in ("MIN", "MAX"):
+            return self._min_max(name, values, groups, counts)
+        if values.dtype.kind not in "iufb":
+            raise UnsupportedQuery(f"{name} over non-numeric values is not supported locally")
+
+        numeric = values.astype(np.float64)
+        sums = np.bincount(groups, weights=numeric, minlength=size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if name == "SUM":
+                result = sums
+                if values.dtype.kind in "iub":
+                    result = np.where(counts > 0, sums, np.nan)
+                    return result if np.isnan(result).any() else result.astype(np.int64)
+            elif name == "AVG":
+                result = sums / counts
+            else:
+                squares = np.bincount(groups, weights=numeric * numeric, minlength=size)
+                variance = squares / counts - (sums / counts) ** 2
+                variance = np.maximum(variance, 0)
+                result = variance if name in ("VARIANCE", "VAR_POP") else np.sqrt(variance)
+        result[counts == 0] = np.nan
+        return result
+
+    def _min_max(self, name: str, values: np.ndarray, groups: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        size = self.num_groups
+        if len(values) == 0:
+            return np.full(size, np.nan)
+        # Text orders by the same case-insensitive collation it compares with
+        order = np.lexsort((_fold(values), groups))
+        sorted_groups = groups[order]
+        if name == "MIN":
+            first = np.searchsorted(sorted_groups, np.arange(size), side="left")
+        else:
+            first = np.searchsorted(sorted_groups, np.arange(size), side="right") - 1
+        first = np.clip(first, 0, len(order) - 1)
+        result = values[order][first]
+        if (counts == 0).any():
+            result = result.astype(object)
+            result[counts == 0] = None
+        return result
+
+
+class LocalSQLEngine:
+    """
+    Executes parsed SELECT statements against a ``ColumnarStore``.
+
+    A table whose MySQL copy changed is marked stale, and from then on its
+    queries raise ``UnsupportedQuery`` so they fall back to the database.
+    As SQL tool middleware the engine sees writes sent through
+    ``execute_sql``; ``check_versions`` catches changes made any other way.
+    """
+
+    def __init__(self, store: ColumnarStore, version_check_interval: float = 60.0):
+        self.store = store
+        self.version_check_interval = version_check_interval
+        self.run_sql = None
+        self.stale: set = set()
+        self.stats = {"local": 0, "unsupported": 0, "rejected": 0, "invalidations": 0}
+        self._table_versions: Dict[str, str] = {}
+        self._last_version_check: Optional[float] = None
+        self._version_lock = asyncio.Lock()
+
+    async def start(self, run_sql) -> None:
+        """Record the database's table change signatures to compare later probes against."""
+        self.run_sql = run_sql
+        await self.check_versions()
+
+    def _version_check_due(self) -> bool:
+        if self._last_version_check is None:
+            return True
+        return time.monotonic() - self._last_version_check >= self.version_check_interval
+
+    async def check_versions(self) -> None:
+        """
+        Probe the table change signatures, at most once per check interval,
+        and mark tables that changed since the previous probe stale.
+        """
+        if self.run_sql is None or not self.version_check_interval or not self._version_check_due():
+            return
+        async with self._version_lock:
+            if not self._version_check_due():
+                return
+            self._last_version_check = time.monotonic()
+            try:
+                text = await self.run_sql(VERSION_PROBE_QUERY)
+            except Exception as e:
+                logger.warning(f"Local engine version probe failed: {e}")
+                return
+            if is_error_result(text):
+                logger.warning(f"Local engine version probe failed: {text}")
+                return
+            versions = {row[0].lower(): ",".join(row[1:]) for row in parse_result(text)[1] if row}
+            changed = [
+                table for table in self.store.tables
+                if table in self._table_versions and versions.get(table) != self._table_versions[table]
+            ]
+            self._table_versions = versions
+            if changed:
+                self.invalidate(changed)
+
+    def invalidate(self, tables: Optional[List[str]] = None) -> None:
+        """Stop answering ``tables`` (every table when None) from the local copy."""
+        names = [name.lower() for name in tables] if tables is not None else list(self.store.tables)
+        changed = [name for name in names if name in self.store.tables and name not in self.stale]
+        if changed:
+            self.stale.update(changed)
+            self.stats["invalidations"] += len(changed)
+            logger.info(f"Local copy of {', '.join(changed)} is stale after a change; routing to MySQL")
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``."""
+        query = arguments.get("query", "")
+        result = await call_next(**arguments)
+        if is_write_query(query):
+            self.invalidate(referenced_tables(query) or None)
+        return result
+
+    def execute(self, sql: str) -> Tuple[List[str], List[List[Any]]]:
+        """
+        Run a query locally.
+
+        Returns:
+            The column labels and the result rows.
+
+        Raises:
+            UnsupportedQuery: If the query cannot be answered locally.
+        """
+        return self.execute_query(parse_sql(sql))
+
+    def execute_query(self, query: Query) -> Tuple[List[str], List[List[Any]]]:
+        """Run a parsed query locally; see ``execute``."""
+        if query.table.lower() in self.stale:
+            raise UnsupportedQuery(f"Local copy of {query.table} no longer matches the database")
+        table = self.store.get(query.table)
+        rows = np.arange(table.num_rows)
+
+        if query.where is not None:
+            mask = Evaluator(table, rows).condition(query.where)
+            rows = rows[mask]
+        evaluator = Evaluator(table, rows)
+
+        select = []
+        for expression, label in query.select:
+            if expression[0] == "star":
+                select.extend((("col", name), name) for name in table.columns)
+            else:
+                select.append((expression, label))
+        labels = [label for _, label in select]
+
+        aggregated = bool(query.group_by) or any(_contains_aggregate(e) for e, _ in select) \
+            or query.having is not None
+        if aggregated:
+            columns, order_keys = self._aggregate(query, select, evaluator)
+        else:
+            columns = [evaluator.rows_eval(expression) for expression, _ in select]
+            order_keys = []
+            for expression, desc in query.order_by:
+                key = self._resolve_order(expression, select, columns)
+                order_keys.append((key if key is not None else evaluator.rows_eval(expression), desc))
+
+        count = len(columns[0]) if columns else 0
+        order = np.arange(count)
+        if order_keys:
+            order = np.lexsort([_sort_key(key, desc) for key, desc in reversed(order_keys)])
+        if query.distinct and count:
+            # Keep the first row (in output order) of each distinct combination
+            codes = np.stack([_codes(np.asarray(column)[order]) for column in columns], axis=1)
+            _, first = np.unique(codes, axis=0, return_index=True)
+            order = order[np.sort(first)]
+        end = None if query.limit is None else query.offset + query.limit
+        order = order[query.offset:end]
+        return labels, [[_to_python(column[i]) for column in columns] for i in order]
+
+    def _resolve_order(self, expression, select, columns) -> Optional[np.ndarray]:
+        """Resolve ORDER BY ordinals and select-list aliases to computed columns."""
+        if expression[0] == "lit" and isinstance(expression[1], int):
+            index = expression[1] - 1
+            if not 0 <= index < len(columns):
+                raise UnsupportedQuery(f"Unknown ORDER BY position {expression[1]}")
+            return columns[index]
+        if expression[0] == "col":
+            for index, (item, label) in enumerate(select):
+                if label.lower() == expression[1].lower() and item != expression:
+                    return columns[index]
+        for index, (item, _) in enumerate(select):
+            if item == expression:
+                return columns[index]
+        return None
+
+    def _aggregate(self, query: Query, select, evaluator: Evaluator):
+        count = evaluator.count
+        if query.group_by:
+            # Combine per-key codes into one integer key per row
+            combined, cardinality = np.zeros(count, dtype=np.int64), 1
+            for expression in query.group_by:
+                resolved = None
+                if expression[0] in ("col", "lit"):
+                    resolved = self._resolve_group_alias(expression, select, evaluator.table)
+                codes, size = evaluator.codes(resolved or expression)
+                if cardinality * max(size, 1) >= 2 ** 62:
+                    distinct, combined = np.unique(combined, return_inverse=True)
+                    combined, cardinality = combined.reshape(-1), len(distinct)
+                combined = combined * max(size, 1) + codes
+                cardinality *= max(size, 1)
+            _, first, group_ids = np.unique(combined, return_index=True, return_inverse=True)
+            group_ids = group_ids.reshape(-1)
+            num_groups = len(first)
+        else:
+            group_ids = np.zeros(count, dtype=np.int64)
+            num_groups = 1
+            first = np.zeros(1, dtype=np.int64) if count else np.zeros(0, dtype=np.int64)
+
+        if num_groups == 1 and not query.group_by and count == 0:
+            # Aggregates over no rows still return one row (COUNT 0, others NULL)
+            grouped = _EmptyGroupEvaluator(evaluator)
+        else:
+            grouped = GroupedEvaluator(evaluator, group_ids, num_groups, first)
+
+        columns = [grouped.eval(expression) for expression, _ in select]
+        keep = None
+        if query.having is not None:
+            keep = grouped.condition(self._substitute_aliases(query.having, select, evaluator.table))
+        order_keys = []
+        for expression, desc in query.order_by:
+            key = self._resolve_order(expression, select, columns)
+            order_keys.append((key if key is not None else grouped.eval(expression), desc))
+        if keep is not None:
+            columns = [np.asarray(column)[keep] for column in columns]
+            order_keys = [(np.asarray(key)[keep], desc) for key, desc in order_keys]
+        return columns, order_keys
+
+    def _resolve_group_alias(self, expression, select, table: ColumnarTable):
+        if expression[0] == "lit" and isinstance(expression[1], int):
+            index = expression[1] - 1
+            if 0 <= index < len(select):
+                return select[index][0]
+        if expression[0] == "col" and not table.has_column(expression[1]):
+            for item, label in select:
+                if label.lower() == expression[1].lower():
+                    return item
+        return None
+
+    def _substitute_aliases(self, node, select, table: ColumnarTable):
+        if isinstance(node, tuple) and node and node[0] == "col":
+            if table.has_column(node[1]):
+                return node
+            for item, label in select:
+                if label.lower() == node[1].lower():
+                    return item
+            return node
+        if isinstance(node, tuple):
+            return tuple(self._substitute_aliases(child, select, table) if isinstance(child, (tuple, list)) else child
+                         for child in node)
+        if isinstance(node, list):
+            return [self._substitute_aliases(child, select, table) for child in node]
+        return node
+
+
+class _EmptyGroupEvaluator:
+    """Aggregates over an empty input: COUNT is 0, everything else is NULL."""
+
+    def __init__(self, evaluator: Evaluator):
+        self.evaluator = evaluator
+
+    def eval(self, node) -> np.ndarray:
+        if node[0] == "agg":
+            return np.array([0 if node[1] == "COUNT" else None], dtype=object)
+        if node[0] == "lit":
+            return np.array([node[1]], dtype=object)
+        if node[0] == "func" and node[1] in ("COALESCE", "IFNULL"):
+            values = [self.eval(argument)[0] for argument in node[2]]
+            return np.array([next((value for value in values if value is not None), None)], dtype=object)
+        if node[0] == "arith" or node[0] == "func":
+            arguments = node[2:] if node[0] == "arith" else node[2]
+            values = [self.eval(argument)[0] for argument in arguments]
+            if any(value is None for value in values):
+                return np.array([None], dtype=object)
+            arrays = [np.array([value]) for value in values]
+            if node[0] == "arith":
+                return Evaluator._arith(Evaluator.__new__(Evaluator), node[1], *arrays).astype(object)
+            return SCALAR_FUNCTIONS[node[1]](*arrays).astype(object)
+        raise UnsupportedQuery("Non-aggregate column over an empty input")
+
+    def condition(self, node) -> np.ndarray:
+        raise UnsupportedQuery("HAVING over an empty input")
+
+
+def _codes(values: np.ndarray) -> np.ndarray:
+    """Dense integer codes for any column, with NULLs sharing one code."""
+    if values.dtype.kind == "O":
+        values = values.astype(str)
+    return np.unique(values, return_inverse=True)[1].reshape(-1)
+
+
+def _sort_key(values: np.ndarray, descending: bool) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind in "iufb":
+        key = values.astype(np.float64)
+        # MySQL sorts NULLs first ascending and last descending
+        key = np.where(np.isnan(key), -np.inf, key)
+        return -key if descending else key
+    if values.dtype.kind == "O":
+        # NULLs sort as the empty string: first ascending, last descending
+        values = np.array(["" if value is None else str(value) for value in values])
+    codes = _codes(_fold(values))
+    return -codes if descending else codes
+
+
+def _to_python(value) -> Any:
+    if isinstance(value, np.generic):
+        if isinstance(value, np.datetime64):
+            return None if np.isnat(value) else str(value)
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def format_value(value) -> str:
+    """Format a value the way mysql_mcp_server prints it."""
+    if value is None:
+        return "None"
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return f"{value:.1f}"
+        return f"{value:.6f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def format_result(columns: List[str], rows: List[List[Any]]) -> str:
+    """Render rows in mysql_mcp_server's text format (header line plus comma-joined rows)."""
+    lines = [",".join(columns)]
+    lines.extend(",".join(format_value(value) for value in row) for row in rows)
+    return "\n".join(lines)
+
+
+def create_local_sql_tool(engine: LocalSQLEngine, fallback_tool=None):
+    """
+    Build the ``query_local_data`` tool.
+
+    Args:
+        engine: The local engine.
+        fallback_tool: Tool used for queries the engine cannot answer (normally
+            the MCP ``execute_sql`` tool).
+
+    Returns:
+        A LangChain ``StructuredTool``.
+    """
+    from langchain_core.tools import StructuredTool
+
+    tables = ", ".join(sorted(table.name for table in engine.store.tables.values()))
+
+    async def query_local_data(query: str) -> ToolResult:
+        started = time.perf_counter()
+        await engine.check_versions()
+        try:
+            columns, rows = engine.execute(query)
+        except UnsupportedQuery as e:
+            engine.stats["unsupported"] += 1
+            if fallback_tool is None:
+                return f"Error executing query: {e}", None
+            if first_keyword(query) not in ("SELECT", "WITH") or not is_read_query(query):
+                # Read-only tool: never forward writes or DDL to MySQL
+                engine.stats["rejected"] += 1
+                return f"Error executing query: {LOCAL_TOOL_NAME} only runs SELECT statements", None
+            logger.info(f"Local engine fallback to {fallback_tool.name}: {e}")
+            content = await fallback_tool.ainvoke({"query": query})
+            return result_text(content), None
+        engine.stats["local"] += 1
+        logger.info(f"Local query answered in {(time.perf_counter() - started) * 1000:.1f}ms: {query}")
+        return format_result(columns, rows), None
+
+    return StructuredTool.from_function(
+        coroutine=query_local_data,
+        name=LOCAL_TOOL_NAME,
+        description=(
+            f"Run a read-only SQL SELECT in-process against a local columnar copy of: {tables}. "
+            "Answers single-table filters, GROUP BY, aggregates (COUNT, SUM, AVG, MIN, MAX), "
+            "CASE WHEN, ORDER BY and LIMIT in milliseconds. Queries it cannot answer locally "
+            "(joins, subqueries, other tables) are sent to the MySQL database automatically. "
+            "Returns the same text format as execute_sql."
+        ),
+        response_format="content_and_artifact",
+    )
+
+
+def load_local_engine(config) -> Optional[LocalSQLEngine]:
+    """Create a ``LocalSQLEngine`` over the configured CSV files, or None if unavailable."""
+    store = ColumnarStore(cache_dir=config.local_cache_dir)
+    for path in config.local_data_paths:
+        if not os.path.exists(path):
+            logger.warning(f"Local data file not found: {path}")
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        store.load_csv(path, name=name)
+    if not store.tables:
+        return None
+    return LocalSQLEngine(store, version_check_interval=config.local_version_check_interval)
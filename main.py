@@ -1,22 +1,184 @@
+import time
+
+_import_started = time.perf_counter()
+
 import asyncio
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_mcp_adapters.sessions import StdioConnection
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 from config.database import db_config
+from config.agent import agent_config
 from config.logging import setup_logging, get_logger
-from agent import initiate_llm, build_agent, AgentState
+from sql_cache import SQLResultCache, wrap_tools_with_cache
+from tool_limits import ToolCallLimiter, wrap_tools_with_limits
+from mcp_pool import MCPSessionPool
+from sql_tools import SQL_TOOL_NAME, parse_result, result_text, wrap_sql_tools
+from result_governor import PAGE_TOOL_NAME, ResultGovernor, wrap_tools_with_governor
+from schema_catalog import SchemaCatalog
+from tracing import tracer, tracing_middleware
+from resilience import LLMCallGuard, set_deadline, wait_for
 
 from dotenv import load_dotenv
 import os
 from system_prompt import get_system_prompt
-from langgraph.graph import StateGraph
-from langchain_core.messages import HumanMessage
+
+# LangChain, LangGraph, the MCP adapters and NumPy take seconds to import;
+# they are loaded in load_agent_runtime, overlapping the MCP server start
+if TYPE_CHECKING:
+    from agent import AgentState
+    from frames import FrameStore, ResultFrame
+    from local_engine import LocalSQLEngine
+    from memory import ConversationMemory
+    from plan_cache import PlanCache
+    from preagg import PreAggregator
+    from prompt_budget import PromptAssembler
+    from routing import ModelRouter
 
 load_dotenv()
 
 os.getenv("OPENAI_API_KEY")
 
+logger = get_logger('main')
+
+# LLM-to-tool round trips per answer, across all conversations
+tool_usage_stats = {"answers": 0, "tool_iterations": 0, "tool_calls": 0}
+
+
+def record_tool_usage(messages: Optional[List]) -> dict:
+    """
+    Count the tool iterations of the latest turn and add them to ``tool_usage_stats``.
+
+    A tool iteration is one AI message requesting tools, i.e. one extra
+    LLM round trip before the answer.
+    """
+    iterations = calls = 0
+    for message in reversed(messages or []):
+        if message.type == "human":
+            break
+        if message.type == "ai" and message.tool_calls:
+            iterations += 1
+            calls += len(message.tool_calls)
+    tool_usage_stats["answers"] += 1
+    tool_usage_stats["tool_iterations"] += iterations
+    tool_usage_stats["tool_calls"] += calls
+    average = tool_usage_stats["tool_iterations"] / tool_usage_stats["answers"]
+    logger.info(f"Answer used {iterations} tool iterations ({calls} tool calls); running average {average:.2f}")
+    return {"tool_iterations": iterations, "tool_calls": calls}
+
+def turn_details(messages: List) -> tuple:
+    """Return the SQL queries and summed token usage of the latest turn in ``messages``."""
+    queries: List[str] = []
+    tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for message in reversed(messages or []):
+        if message.type == "human":
+            break
+        if message.type != "ai":
+            continue
+        for call in reversed(message.tool_calls or []):
+            query = call.get("args", {}).get("query")
+            if query:
+                queries.append(query)
+        for key, value in (getattr(message, "usage_metadata", None) or {}).items():
+            if key in tokens:
+                tokens[key] += value
+    queries.reverse()
+    return queries, tokens
+
+
+def final_response(messages: Optional[List]) -> str:
+    """Return the content of the final AI answer in ``messages``."""
+    if messages:
+        # Look for the final AI response (after tool execution)
+        for message in reversed(messages):
+            # Check if this is an AI message with content
+            if (hasattr(message, 'content') and 
+                message.content and 
+                message.content.strip() and
+                message.__class__.__name__ == 'AIMessage'):
+                # Skip messages that only have tool calls and no content
+                if hasattr(message, 'tool_calls') and message.tool_calls and not message.content.strip():
+                    continue
+                return message.content
+
+    return "No response generated from the agent."
+
+
+@dataclass
+class GraphResult:
+    """Structured outcome of one graph run."""
+    answer: str
+    # Typed frames of the turn's SQL results, in call order; the model may only have seen summaries
+    frames: List["ResultFrame"] = field(default_factory=list)
+    queries: List[str] = field(default_factory=list)
+    tokens: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+async def invoke_graph_result(
+        input: "AgentState", graph, config: dict = {}, timeout: Optional[float] = None,
+        frames: Optional["FrameStore"] = None
+        ) -> GraphResult:
+    """
+    Invoke the graph and return the answer with the turn's result frames.
+
+    Args:
+        input: The input for the graph.
+        graph: The compiled graph to run.
+        config: The config to pass to the graph.
+        timeout: Request deadline in seconds (default ``AGENT_REQUEST_TIMEOUT``, 0 disables).
+            LLM and tool calls are bounded by the time left; when it passes, the
+            graph run and its in-flight tool calls are cancelled.
+        frames: Store the SQL tools attached frames to (``AgentRuntime.frames``);
+            without it ``frames`` of the result stays empty.
+
+    Returns:
+        The answer, the full typed frames of the SQL results behind it, the
+        SQL run and the token usage. On failure ``answer`` holds the error message.
+    """
+    timeout = agent_config.request_timeout if timeout is None else timeout
+    thread_id = config.get("configurable", {}).get("thread_id")
+
+    async def run():
+        # Runs in its own task, so the deadline only applies to this request
+        set_deadline(timeout)
+        return await graph.ainvoke(input=input, config=config)
+
+    with tracer.span("request", thread_id=thread_id, streaming=False) as span:
+        try:
+            result = await wait_for(asyncio.create_task(run()), timeout or None)
+
+            messages = None
+            if hasattr(result, 'messages'):
+                messages = result.messages
+            elif isinstance(result, dict) and 'messages' in result:
+                messages = result['messages']
+
+            usage = record_tool_usage(messages)
+            queries, tokens = turn_details(messages)
+            span.set(
+                tokens_in=tokens["input_tokens"], tokens_out=tokens["output_tokens"],
+                tool_calls=usage["tool_calls"]
+            )
+            return GraphResult(
+                answer=final_response(messages),
+                frames=frames.frames_for(messages) if frames is not None else [],
+                queries=queries,
+                tokens=tokens,
+            )
+
+        except asyncio.TimeoutError:
+            span.status = "error"
+            span.set(error="deadline exceeded")
+            error = f"no answer within the {timeout:g}s request deadline"
+            return GraphResult(answer=f"Error during graph execution: {error}", error=error)
+        except Exception as e:
+            span.status = "error"
+            span.set(error=str(e)[:200])
+            return GraphResult(answer=f"Error during graph execution: {str(e)}", error=str(e))
+
+
 async def invoke_graph_response(
-        input: AgentState, graph, config: dict = {}
+        input: "AgentState", graph, config: dict = {}, timeout: Optional[float] = None
         ) -> str:
     """
     Invoke the graph and return the full response.
@@ -25,68 +187,218 @@ async def invoke_graph_response(
         input: The input for the graph.
         graph: The compiled graph to run.
         config: The config to pass to the graph.
+        timeout: Request deadline in seconds (default ``AGENT_REQUEST_TIMEOUT``, 0 disables).
 
     Returns:
         The processed string from the graph's response.
     """
+    return (await invoke_graph_result(input, graph, config=config, timeout=timeout)).answer
+
+
+async def stream_graph_response(
+        input: "AgentState", graph, config: dict = {}, preview_rows: int = 3,
+        timeout: Optional[float] = None
+        ) -> AsyncIterator[dict]:
+    """
+    Run the graph and yield progress events as they happen.
+
+    The graph runs in a separate task. Closing the generator early (e.g.
+    the client disconnected) or passing the deadline cancels it, including
+    in-flight LLM and tool calls.
+
+    Args:
+        input: The input for the graph.
+        graph: The compiled graph to run.
+        config: The config to pass to the graph.
+        preview_rows: Number of result rows included in ``tool_end`` events.
+        timeout: Request deadline in seconds (default ``AGENT_REQUEST_TIMEOUT``, 0 disables).
+
+    Yields:
+        Event dicts with a ``type`` of:
+            - ``token``: ``content`` is the next piece of LLM output
+            - ``tool_start``: ``name`` of the tool and the ``sql`` it runs
+            - ``tool_end``: ``name``, result ``rows`` count and a ``preview``
+            - ``final``: ``content`` is the complete answer
+            - ``error``: ``content`` describes the failure
+    """
+    timeout = agent_config.request_timeout if timeout is None else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    thread_id = config.get("configurable", {}).get("thread_id")
+    with tracer.span("request", thread_id=thread_id, streaming=True) as span:
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            set_deadline(timeout)
+            try:
+                async for event in _traced_stream_events(input, graph, config, preview_rows, span):
+                    events.put_nowait(event)
+            finally:
+                events.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                wait = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                try:
+                    event = await wait_for(events.get(), wait)
+                except asyncio.TimeoutError:
+                    span.status = "error"
+                    span.set(error="deadline exceeded")
+                    yield {
+                        "type": "error",
+                        "content": f"Error during graph execution: no answer within the {timeout:g}s request deadline",
+                    }
+                    return
+                if event is None:
+                    return
+                yield event
+        finally:
+            producer.cancel()
+
+
+async def _traced_stream_events(input, graph, config, preview_rows, span) -> AsyncIterator[dict]:
     try:
-        result = await graph.ainvoke(
-            input=input,
-            config=config
+        async for event in graph.astream_events(input, config=config, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                chunk = event["data"].get("chunk")
+                text = getattr(chunk, "content", "")
+                if isinstance(text, str) and text:
+                    yield {"type": "token", "content": text}
+            elif kind == "on_tool_start":
+                arguments = event["data"].get("input") or {}
+                yield {
+                    "type": "tool_start",
+                    "name": event["name"],
+                    "sql": arguments.get("query") if isinstance(arguments, dict) else str(arguments),
+                }
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                text = result_text(getattr(output, "content", output))
+                artifact = getattr(output, "artifact", None)
+                if isinstance(artifact, dict) and "rows" in artifact:
+                    # Governed results are summarized; the artifact has the real row count
+                    row_count = artifact["rows"]
+                else:
+                    row_count = len(parse_result(text)[1])
+                yield {
+                    "type": "tool_end",
+                    "name": event["name"],
+                    "rows": row_count,
+                    "preview": "\n".join(text.splitlines()[:preview_rows + 1]),
+                }
+
+        state = await graph.aget_state(config)
+        messages = state.values.get("messages")
+        usage = record_tool_usage(messages)
+        _, tokens = turn_details(messages)
+        span.set(
+            tokens_in=tokens["input_tokens"], tokens_out=tokens["output_tokens"], tool_calls=usage["tool_calls"]
         )
-        
-        
-        messages = None
-        if hasattr(result, 'messages'):
-            messages = result.messages
-        elif isinstance(result, dict) and 'messages' in result:
-            messages = result['messages']
-        
-        if messages:
-            # Look for the final AI response (after tool execution)
-            for message in reversed(messages):
-                # Check if this is an AI message with content
-                if (hasattr(message, 'content') and 
-                    message.content and 
-                    message.content.strip() and
-                    message.__class__.__name__ == 'AIMessage'):
-                    # Skip messages that only have tool calls and no content
-                    if hasattr(message, 'tool_calls') and message.tool_calls and not message.content.strip():
-                        continue
-                    return message.content
-        
-        return "No response generated from the agent."
-        
+        yield {"type": "final", "content": final_response(messages)}
+
     except Exception as e:
-        return f"Error during graph execution: {str(e)}"
+        span.status = "error"
+        span.set(error=str(e)[:200])
+        yield {"type": "error", "content": f"Error during graph execution: {str(e)}"}
 
 
+async def render_stream(events: AsyncIterator[dict]) -> str:
+    """
+    Print streamed events to the console and return the final answer.
 
-async def connect_and_list_mcp():
-    """Connect to MySQL MCP server and list available tools."""
-    
-    # Set up logging
-    logger = setup_logging()
-    
-    # Suppress MCP server startup messages from console
-  
-    import sys
-    from contextlib import redirect_stderr
-    from io import StringIO
-    
-    try:
-        # Validate database configuration before proceeding
-        db_config.validate()
-        logger.info(f"Using database configuration: {db_config.host}:{db_config.port}/{db_config.database}")
-   
-        
-    except ValueError as e:
-        logger.error(f"Database configuration error: {e}")
-    
-        return
-    
-    # Create MCP client for MySQL server
-    client = MultiServerMCPClient({
+    Args:
+        events: Events from ``stream_graph_response``.
+
+    Returns:
+        The final answer (or error message).
+    """
+    response = ""
+    answer_streamed = False
+    async for event in events:
+        if event["type"] == "token":
+            print(event["content"], end="", flush=True)
+            answer_streamed = True
+        elif event["type"] == "tool_start":
+            print(f"\n[{event['name']}] {event['sql']}", flush=True)
+            answer_streamed = False
+        elif event["type"] == "tool_end":
+            print(f"[{event['name']}] {event['rows']} rows", flush=True)
+        else:
+            response = event["content"]
+            if not answer_streamed:
+                print(f"\n{response}", end="")
+    print("\n")
+    return response
+
+
+@dataclass
+class AgentRuntime:
+    """Shared objects behind one compiled agent: MCP client, tools and graph."""
+    client: Any
+    tools: List
+    agent: Any
+    pool: Optional[MCPSessionPool] = None
+    sql_cache: Optional[SQLResultCache] = None
+    memory: Optional["ConversationMemory"] = None
+    checkpointer: Any = None
+    local_engine: Optional["LocalSQLEngine"] = None
+    schema_catalog: Optional[SchemaCatalog] = None
+    limiter: Optional[ToolCallLimiter] = None
+    governor: Optional[ResultGovernor] = None
+    llm_guard: Optional[LLMCallGuard] = None
+    plan_cache: Optional["PlanCache"] = None
+    preagg: Optional["PreAggregator"] = None
+    prompt_assembler: Optional["PromptAssembler"] = None
+    frames: Optional["FrameStore"] = None
+    model_router: Optional["ModelRouter"] = None
+
+    async def close(self) -> None:
+        """Stop background refreshes, save the plan cache and close the pooled MCP sessions and the checkpointer."""
+        if self.schema_catalog is not None:
+            await self.schema_catalog.close()
+        if self.preagg is not None:
+            await self.preagg.close()
+        if self.plan_cache is not None:
+            self.plan_cache.close()
+        if self.governor is not None:
+            self.governor.close()
+        if self.pool is not None:
+            await self.pool.close()
+        if hasattr(self.checkpointer, "aclose"):
+            await self.checkpointer.aclose()
+        tracer.close()
+
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase; concurrent phases are timed separately."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def measure(self, name: str, awaitable):
+        with self.phase(name):
+            return await awaitable
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        return f"{phases}; total {time.perf_counter() - self.started:.2f}s"
+
+
+def create_mcp_client():
+    """Create the MCP client for the MySQL server."""
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+
+    return MultiServerMCPClient({
         "mysql": {
             "command": "mysql_mcp_server",
             "args": [],
@@ -96,31 +408,241 @@ async def connect_and_list_mcp():
             "env": db_config.to_env_dict()
         }
     })
-    
+
+
+def render_agent_graph(agent, path: str) -> None:
+    """Write a PNG of the compiled graph; failures (e.g. no network) are only logged."""
     try:
-        logger.info("Connecting to MySQL MCP server...")
-        
-        # Suppress MCP server stderr output to keep user interface clean
-        stderr_buffer = StringIO()
-        
+        png = agent.get_graph().draw_mermaid_png()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(png)
+        logger.info(f"Agent graph rendered to {path}")
+    except Exception as e:
+        logger.warning(f"Could not render the agent graph: {e}")
+
+
+async def load_agent_runtime(logger, client=None, chat_model=None) -> Optional[AgentRuntime]:
+    """
+    Validate configuration, connect to the MCP server and compile the agent.
+
+    Args:
+        logger: The application logger.
+        client: MCP client to use instead of the MySQL server from ``db_config``.
+        chat_model: Chat model to use instead of an OpenAI client for ``AGENT_LLM_MODEL``.
+
+    Returns:
+        The AgentRuntime, or None if configuration or MCP connection failed.
+    """
+    from contextlib import redirect_stderr
+    from io import StringIO
+
+    timer = StartupTimer()
+    try:
+        # Validate database configuration before proceeding
+        db_config.validate()
+        agent_config.validate()
+        tracer.configure(agent_config)
+        logger.info(f"Using database configuration: {db_config.host}:{db_config.port}/{db_config.database}")
+    except ValueError as e:
+        logger.error(f"Database configuration error: {e}")
+        return None
+
+    # Create MCP client for MySQL server and a pool of warm sessions
+    if client is None:
+        with timer.phase("mcp_import"):
+            client = create_mcp_client()
+    pool = MCPSessionPool.from_config(client, db_config)
+
+    logger.info(f"Connecting to MySQL MCP server with {pool.size} pooled sessions...")
+
+    # Suppress MCP server stderr output to keep user interface clean
+    stderr_buffer = StringIO()
+
+    async def start_mcp() -> List:
         # Try to connect to MCP server and get tools
-        tools = []
         try:
             with redirect_stderr(stderr_buffer):
-                tools = await client.get_tools(server_name="mysql")
+                await pool.start()
+                tools = await pool.load_tools()
             logger.info(f"Connected successfully. Available tools: {[tool.name for tool in tools]}")
+            return tools
         except Exception as mcp_error:
             logger.warning(f"MCP server connection failed: {mcp_error}")
             logger.warning("Cannot proceed without MCP tools")
+            return []
+
+    def prepare_llm():
+        # Importing agent pulls in LangGraph and LangChain; done off the event loop
+        from agent import create_chat_model
+        return chat_model if chat_model is not None else create_chat_model(model=agent_config.llm_model)
+
+    async def prepare_checkpointer():
+        from checkpointer import create_checkpointer
+        return await create_checkpointer(agent_config)
+
+    def prepare_local_engine():
+        if not agent_config.local_engine_enabled:
+            return None
+        from local_engine import load_local_engine
+        try:
+            return load_local_engine(agent_config)
+        except Exception as e:
+            logger.warning(f"Local columnar engine unavailable: {e}")
+            return None
+
+    # The MCP server processes boot while the LLM stack is imported and set up
+    tools, chat_client, local_engine = await asyncio.gather(
+        timer.measure("mcp_pool", start_mcp()),
+        timer.measure("llm_setup", asyncio.to_thread(prepare_llm)),
+        timer.measure("local_engine", asyncio.to_thread(prepare_local_engine)),
+    )
+    checkpointer = await timer.measure("checkpointer", prepare_checkpointer())
+
+    # Check if we got MCP tools
+    if not tools:
+        logger.error("No MCP tools available.")
+        await pool.close()
+        if hasattr(checkpointer, "aclose"):
+            await checkpointer.aclose()
+        return None
+
+    # Bound concurrent queries and time-box each one; cache hits below skip the limiter
+    limiter = ToolCallLimiter.from_config(agent_config)
+    tools = wrap_tools_with_limits(tools, limiter)
+    if limiter.max_parallel > pool.size:
+        logger.warning(
+            f"AGENT_TOOL_PARALLELISM={limiter.max_parallel} exceeds MYSQL_POOL_SIZE={pool.size}; "
+            "extra calls wait for a pooled session"
+        )
+
+    # Serve repeated read-only queries from the SQL result cache
+    sql_cache = None
+    if agent_config.cache_enabled:
+        sql_cache = SQLResultCache.from_config(agent_config)
+        tools = wrap_tools_with_cache(tools, sql_cache)
+        logger.info(f"SQL result cache enabled (max_entries={sql_cache.max_entries}, ttl={sql_cache.ttl}s)")
+
+    async def run_sql(query: str) -> str:
+        content, _ = await pool.call_tool(SQL_TOOL_NAME, {"query": query})
+        return result_text(content)
+
+    # Answer client_data queries in-process, falling back to MySQL
+    from local_engine import LOCAL_TOOL_NAME, create_local_sql_tool
+    if local_engine is not None:
+        # Baseline table signatures; later probes route changed tables to MySQL
+        with redirect_stderr(stderr_buffer):
+            await timer.measure("local_engine_versions", local_engine.start(run_sql))
+        # Writes through execute_sql make the local copy of the written table stale
+        tools = wrap_sql_tools(tools, local_engine, [SQL_TOOL_NAME])
+        fallback = next((tool for tool in tools if tool.name == SQL_TOOL_NAME), None)
+        tools = tools + [create_local_sql_tool(local_engine, fallback_tool=fallback)]
+        logger.info(f"Local columnar engine enabled for tables: {sorted(local_engine.store.tables)}")
+
+    # Schema and column statistics for the prompt, so the model skips exploratory queries
+    schema_catalog = None
+    if agent_config.schema_enabled:
+        schema_catalog = SchemaCatalog.from_config(run_sql, agent_config)
+        with redirect_stderr(stderr_buffer):
+            await timer.measure("schema_catalog", schema_catalog.start())
+
+    # Typed frames of SQL results for the caller; the model only sees text or summaries
+    frames = None
+    if agent_config.frames_enabled:
+        from frames import FrameStore
+        frames = FrameStore.from_config(agent_config)
+
+    # Cap, summarize and spill large results before they reach the model
+    governor = ResultGovernor.from_config(agent_config, frames=frames)
+    tools = wrap_tools_with_governor(tools, governor, [SQL_TOOL_NAME, LOCAL_TOOL_NAME])
+
+    # Answer aggregate queries from rollups of client_data / price_data when they match
+    preagg = None
+    from preagg import PREAGG_TOOL_NAME
+    if agent_config.preagg_enabled:
+        from preagg import PreAggregator, wrap_tools_with_preagg
+        preagg = PreAggregator.from_config(run_sql, agent_config)
+        with redirect_stderr(stderr_buffer):
+            await timer.measure("rollups", preagg.start())
+        fallback = next((tool for tool in tools if tool.name == SQL_TOOL_NAME), None)
+        tools = wrap_tools_with_preagg(tools, preagg, [SQL_TOOL_NAME, LOCAL_TOOL_NAME])
+        tools = tools + [preagg.create_tool(fallback_tool=fallback)]
 
-        # Check if we got MCP tools
-        if not tools:
-            logger.error("No MCP tools available.")
+    # Frame the results not framed by the governor (small results, rollup answers)
+    if frames is not None:
+        tools = wrap_sql_tools(tools, frames, [SQL_TOOL_NAME, LOCAL_TOOL_NAME, PREAGG_TOOL_NAME])
+
+    # Cached SQL plans and answers of earlier questions, checked against the live schema
+    plan_cache = None
+    if agent_config.plan_cache_enabled:
+        from plan_cache import PlanCache
+        plan_cache = PlanCache.from_config(run_sql, agent_config)
+        with redirect_stderr(stderr_buffer):
+            await timer.measure("plan_cache", plan_cache.start())
+        # Writes the agent runs drop the plans over the written tables right away
+        tools = wrap_sql_tools(tools, plan_cache, [SQL_TOOL_NAME, LOCAL_TOOL_NAME, PREAGG_TOOL_NAME])
+
+    # Outermost layer: one trace span per tool call made by the ToolNode
+    tools = wrap_sql_tools(
+        tools, tracing_middleware, [SQL_TOOL_NAME, LOCAL_TOOL_NAME, PAGE_TOOL_NAME, PREAGG_TOOL_NAME]
+    )
+
+    from agent import build_agent, initiate_llm
+    from memory import ConversationMemory
+    from prompt_budget import PromptAssembler
+    from routing import ModelRouter
+
+    with timer.phase("build_agent"):
+        logger.info(f"Initializing LLM with {len(tools)} tools")
+        llm = initiate_llm(model=agent_config.llm_model, tools=tools, chat_model=chat_client)
+        memory = ConversationMemory.from_config(agent_config) if agent_config.memory_enabled else None
+        llm_guard = LLMCallGuard.from_config(agent_config)
+        prompt_assembler = PromptAssembler.from_config(agent_config, tools)
+        model_router = None
+        if agent_config.routing_enabled:
+            # A substituted chat model serves both routes
+            small_llm = initiate_llm(
+                model=agent_config.small_llm_model, tools=tools, chat_model=chat_model
+            )
+            model_router = ModelRouter.from_config(agent_config, small_llm)
+            logger.info(f"Routing simple questions to {agent_config.small_llm_model}")
+        agent, _ = build_agent(
+            "Crstl", llm, tools=tools, system_prompt=get_system_prompt([tool.name for tool in tools]),
+            memory=memory, checkpointer=checkpointer, schema_catalog=schema_catalog, llm_guard=llm_guard,
+            plan_cache=plan_cache, prompt_assembler=prompt_assembler, model_router=model_router
+        )
+    if agent_config.render_graph:
+        with timer.phase("render_graph"):
+            render_agent_graph(agent, agent_config.graph_path)
+
+    logger.info(f"Startup timing: import main {MAIN_IMPORT_SECONDS:.2f}s, {timer.summary()}")
+
+    return AgentRuntime(
+        client=client, tools=tools, agent=agent, pool=pool, sql_cache=sql_cache,
+        memory=memory, checkpointer=checkpointer, local_engine=local_engine,
+        schema_catalog=schema_catalog, limiter=limiter, governor=governor, llm_guard=llm_guard,
+        plan_cache=plan_cache, preagg=preagg, prompt_assembler=prompt_assembler, frames=frames,
+        model_router=model_router
+    )
+
+
+async def connect_and_list_mcp():
+    """Connect to MySQL MCP server and list available tools."""
+    
+    # Set up logging
+    logger = setup_logging()
+
+    runtime = None
+    try:
+        runtime = await load_agent_runtime(logger)
+        if runtime is None:
             return
-        
-        logger.info(f"Initializing LLM with {len(tools)} MCP tools")
-        llm = initiate_llm(model="gpt-4", tools=tools)
-        agent, graph_png = build_agent("Crstl", llm, tools=tools, system_prompt=get_system_prompt())
+        agent, tools, sql_cache = runtime.agent, runtime.tools, runtime.sql_cache
+        memory = runtime.memory
+        from agent import AgentState
+        from langchain_core.messages import HumanMessage
 
         # creating a config thread to retain memory
         graph_config={
@@ -135,7 +657,8 @@ async def connect_and_list_mcp():
 
         while True:
             try:
-                user_input = input("\n\nUSER: ")
+                # Read input off the event loop so background tasks keep running
+                user_input = await asyncio.to_thread(input, "\n\nUSER: ")
                 if user_input.lower() in ["quit", "exit", "bye", "stop"]:
                     break
 
@@ -145,17 +668,27 @@ async def connect_and_list_mcp():
                 # Create initial state with user message
                 initial_state = AgentState(messages=[HumanMessage(content=user_input)])
                 
-                response = await invoke_graph_response(
-                    input=initial_state,
-                    graph=agent, 
-                    config=graph_config
-                )
+                if agent_config.stream_output:
+                    # Render tokens and tool progress as they arrive
+                    print()
+                    response = await render_stream(
+                        stream_graph_response(input=initial_state, graph=agent, config=graph_config)
+                    )
+                else:
+                    response = await invoke_graph_response(
+                        input=initial_state,
+                        graph=agent, 
+                        config=graph_config
+                    )
                 
                 # Log the response for debugging
                 logger.info(f"Agent response: {response}")
+                if memory is not None:
+                    logger.info(f"Memory usage: {memory.usage(graph_config['configurable']['thread_id'])}")
                 
-                # Only show the clean answer to the user
-                print(f"\n{response}\n")
+                if not agent_config.stream_output:
+                    # Only show the clean answer to the user
+                    print(f"\n{response}\n")
             except KeyboardInterrupt:
                 print("\nExiting...")
                 break
@@ -178,6 +711,24 @@ async def connect_and_list_mcp():
                     logger.info(f"  Parameters: {tool.parameters}")
              
         
+        if sql_cache is not None:
+            logger.info(f"SQL result cache stats: {sql_cache.stats.as_dict()}")
+        if runtime.local_engine is not None:
+            logger.info(f"Local engine stats: {runtime.local_engine.stats}")
+        logger.info(f"Tool usage per answer: {tool_usage_stats}")
+        logger.info(f"Tool call limiter stats: {runtime.limiter.stats}")
+        logger.info(f"Result governance stats: {runtime.governor.stats}")
+        logger.info(f"LLM call stats: {runtime.llm_guard.stats}, circuit breaker: {runtime.llm_guard.breaker.stats}")
+        logger.info(f"Prompt budget stats: {runtime.prompt_assembler.stats}")
+        if runtime.frames is not None:
+            logger.info(f"Result frame stats: {runtime.frames.stats}")
+        if runtime.model_router is not None:
+            logger.info(f"Routing stats: {runtime.model_router.summary()}")
+        if runtime.plan_cache is not None:
+            logger.info(f"Plan cache stats: {runtime.plan_cache.stats}")
+        if runtime.preagg is not None:
+            logger.info(f"Rollup stats: {runtime.preagg.stats}")
+
         # Log connection summary
         logger.info(f"MCP Server Connection Complete - Tools: {len(tools)}, Status: SUCCESS")
       
@@ -189,13 +740,15 @@ async def connect_and_list_mcp():
     finally:
         # Close MCP client connection
         try:
-            if 'client' in locals():
-                # MCP client cleanup is handled automatically
+            if runtime is not None:
+                await runtime.close()
                 logger.info("MCP client cleanup completed")
         except Exception as e:
             logger.warning(f"Error during MCP client cleanup: {e}")
         
         logger.info("MCP client operations completed")
 
+MAIN_IMPORT_SECONDS = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
     asyncio.run(connect_and_list_mcp())
\ No newline at end of file
@@ -0,0 +1,328 @@
+"""
+Pool of long-lived MCP sessions to the MySQL server.
+
+Tools loaded with ``MultiServerMCPClient.get_tools`` open a fresh stdio
+session (and a fresh ``mysql_mcp_server`` subprocess) for every call. The
+pool instead keeps ``size`` sessions open, warms them up at startup, probes
+idle ones in the background and respawns sessions that die or outlive
+``max_lifetime``. Tools bound with ``MCPSessionPool.bind_tools`` borrow a
+session per call, so concurrent tool calls run on separate subprocesses.
+
+Only the MCP sessions and their subprocesses are reused: ``mysql_mcp_server``
+still opens (and closes) a new MySQL connection for every tool call, so each
+query pays the MySQL connect and authentication round trips. Pooling those
+would have to happen inside the server.
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, List, Optional
+
+from config.logging import get_logger
+from sql_tools import SQL_TOOL_NAME, ToolResult, is_read_query, wrap_tool
+from tracing import result_size, sql_hash, tracer
+
+logger = get_logger('mcp_pool')
+
+HEALTH_PROBE_QUERY = "SELECT 1"
+
+
+class PoolClosedError(Exception):
+    """Raised when a session is requested from a closed pool."""
+
+
+@dataclass
+class PooledSession:
+    slot_id: int
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    closing: asyncio.Event = field(default_factory=asyncio.Event)
+    session: Any = None
+    task: Optional[asyncio.Task] = None
+    error: Optional[BaseException] = None
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    calls: int = 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    @property
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_used
+
+
+def convert_call_tool_result(result) -> ToolResult:
+    """Convert an MCP ``CallToolResult`` into the adapters' ``(content, artifact)`` format."""
+    from langchain_core.tools import ToolException
+    from mcp.types import TextContent
+
+    texts = [item.text for item in result.content if isinstance(item, TextContent)]
+    others = [item for item in result.content if not isinstance(item, TextContent)]
+    content: Any = texts[0] if len(texts) == 1 else (texts or "")
+    if result.isError:
+        raise ToolException(content)
+    return content, others or None
+
+
+class MCPSessionPool:
+    """Fixed-size pool of warm MCP client sessions with health checks and respawn."""
+
+    def __init__(
+            self,
+            client,
+            server_name: str = "mysql",
+            size: int = 4,
+            idle_timeout: float = 300.0,
+            max_lifetime: float = 3600.0,
+            health_check_interval: float = 60.0,
+            connect_timeout: float = 30.0
+    ):
+        self.client = client
+        self.server_name = server_name
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.stats = {"spawned": 0, "respawned": 0, "probes": 0, "probe_failures": 0, "calls": 0}
+        self._idle: "asyncio.Queue[PooledSession]" = asyncio.Queue()
+        self._slots: List[PooledSession] = []
+        self._ids = itertools.count(1)
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, client, config, server_name: str = "mysql") -> "MCPSessionPool":
+        """Create a pool sized from a ``DatabaseConfig`` instance."""
+        return cls(
+            client,
+            server_name=server_name,
+            size=config.pool_size,
+            idle_timeout=config.pool_idle_timeout,
+            max_lifetime=config.pool_max_lifetime,
+            health_check_interval=config.pool_health_check_interval,
+            connect_timeout=config.connect_timeout,
+        )
+
+    async def _run_session(self, slot: PooledSession) -> None:
+        # The stdio transport uses anyio cancel scopes, so a session must be
+        # opened and closed by the same task; each slot owns one such task.
+        try:
+            async with self.client.session(self.server_name) as session:
+                slot.session = session
+                slot.ready.set()
+                await slot.closing.wait()
+        except Exception as e:
+            slot.error = e
+        finally:
+            slot.session = None
+            slot.ready.set()
+
+    async def _spawn(self) -> PooledSession:
+        """Open one session, run a warm-up probe and register it."""
+        slot = PooledSession(slot_id=next(self._ids))
+        slot.task = asyncio.create_task(self._run_session(slot))
+        try:
+            await asyncio.wait_for(slot.ready.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            slot.task.cancel()
+            raise TimeoutError(f"MCP session {slot.slot_id} did not start within {self.connect_timeout}s")
+        if slot.session is None:
+            raise RuntimeError(f"MCP session {slot.slot_id} failed to start: {slot.error}")
+        try:
+            await self._probe(slot)
+        except Exception:
+            await self._retire(slot)
+            raise
+        self._slots.append(slot)
+        self.stats["spawned"] += 1
+        logger.info(f"MCP session {slot.slot_id} ready")
+        return slot
+
+    async def _retire(self, slot: PooledSession) -> None:
+        """Close a session and forget it."""
+        if slot in self._slots:
+            self._slots.remove(slot)
+        slot.closing.set()
+        if slot.task is not None:
+            try:
+                await asyncio.wait_for(slot.task, timeout=5)
+            except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+                slot.task.cancel()
+
+    async def _replace(self, slot: PooledSession, reason: str) -> Optional[PooledSession]:
+        """Retire a session and spawn its replacement. Returns None if the spawn failed."""
+        logger.info(f"Respawning MCP session {slot.slot_id}: {reason}")
+        await self._retire(slot)
+        try:
+            new_slot = await self._spawn()
+        except Exception as e:
+            logger.error(f"Failed to respawn MCP session: {e}")
+            return None
+        self.stats["respawned"] += 1
+        return new_slot
+
+    async def _probe(self, slot: PooledSession) -> bool:
+        """
+        Run a trivial query on a session.
+
+        Raises on transport failures (the session is dead); returns False when
+        the session works but MySQL reported an error.
+        """
+        self.stats["probes"] += 1
+        result = await asyncio.wait_for(
+            slot.session.call_tool(SQL_TOOL_NAME, {"query": HEALTH_PROBE_QUERY}),
+            timeout=self.connect_timeout,
+        )
+        slot.last_used = time.monotonic()
+        text = "".join(getattr(item, "text", "") for item in result.content)
+        if result.isError or text.startswith("Error"):
+            self.stats["probe_failures"] += 1
+            logger.warning(f"MCP session {slot.slot_id} health probe failed: {text}")
+            return False
+        return True
+
+    async def _check(self, slot: PooledSession) -> Optional[PooledSession]:
+        """
+        Replace a session that is dead or too old before use.
+
+        Idle sessions are not probed here, which would add a round trip to the
+        caller's query; ``check_health`` probes them in the background.
+        """
+        if slot.task is None or slot.task.done():
+            return await self._replace(slot, "session task exited")
+        if slot.age > self.max_lifetime:
+            return await self._replace(slot, f"max lifetime {self.max_lifetime}s reached")
+        return slot
+
+    async def start(self) -> None:
+        """Open and warm up all sessions, then start the health checker."""
+        results = await asyncio.gather(*(self._spawn() for _ in range(self.size)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"MCP session warm-up failed: {result}")
+            else:
+                self._idle.put_nowait(result)
+        if not self._slots:
+            raise RuntimeError("No MCP sessions could be started")
+        if self.health_check_interval:
+            self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"MCP session pool started with {len(self._slots)}/{self.size} sessions")
+
+    async def _health_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.warning(f"MCP pool health check error: {e}")
+
+    async def check_health(self) -> None:
+        """
+        Respawn dead or expired idle sessions, probe those idle longer than
+        ``idle_timeout`` and refill missing slots.
+
+        Each session goes back to the queue as soon as it is checked, so
+        callers never wait for the whole sweep.
+        """
+        for _ in range(self._idle.qsize()):
+            try:
+                slot = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                # Borrowed by a caller meanwhile
+                break
+            try:
+                if slot.task is None or slot.task.done():
+                    raise RuntimeError("session task exited")
+                if slot.age > self.max_lifetime:
+                    raise RuntimeError(f"max lifetime {self.max_lifetime}s reached")
+                if slot.idle_for > self.idle_timeout:
+                    await self._probe(slot)
+            except Exception as e:
+                slot = await self._replace(slot, str(e))
+            if slot is not None:
+                self._idle.put_nowait(slot)
+
+        for _ in range(self.size - len(self._slots)):
+            try:
+                self._idle.put_nowait(await self._spawn())
+            except Exception as e:
+                logger.error(f"Failed to refill MCP session pool: {e}")
+                break
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Borrow a validated session for the duration of the block."""
+        if self._closed:
+            raise PoolClosedError("MCP session pool is closed")
+        with tracer.span("mcp.acquire", idle=self._idle.qsize()):
+            if not self._slots and self._idle.empty():
+                # Every session died and could not be replaced; try to start one now
+                slot = await self._spawn()
+            else:
+                slot = await self._idle.get()
+                slot = await self._check(slot) or await self._spawn()
+        try:
+            yield slot.session
+        except Exception:
+            # Distinguish a dead session from an ordinary failed call
+            try:
+                if slot.session is None:
+                    raise RuntimeError("session closed")
+                await self._probe(slot)
+            except Exception as e:
+                slot = await self._replace(slot, f"session failed during call: {e}")
+            raise
+        finally:
+            if slot is not None:
+                slot.last_used = time.monotonic()
+                slot.calls += 1
+                if self._closed:
+                    await self._retire(slot)
+                else:
+                    self._idle.put_nowait(slot)
+
+    async def call_tool(self, name: str, arguments: dict) -> ToolResult:
+        """Call an MCP tool on a pooled session, retrying read queries once on a dead session."""
+        self.stats["calls"] += 1
+        query = arguments.get("query", "")
+        retryable = name == SQL_TOOL_NAME and is_read_query(query)
+        with tracer.span("mcp.call", tool=name, sql_hash=sql_hash(query) if query else None) as span:
+            for attempt in (1, 2):
+                try:
+                    async with self.acquire() as session:
+                        result = await session.call_tool(name, arguments)
+                    content, artifact = convert_call_tool_result(result)
+                    span.set(attempts=attempt, **result_size(content, artifact))
+                    return content, artifact
+                except (OSError, EOFError, RuntimeError) as e:
+                    if attempt == 2 or not retryable:
+                        raise
+                    logger.warning(f"MCP call failed on a pooled session, retrying: {e}")
+
+    async def load_tools(self) -> List:
+        """List the server's tools over a pooled session and bind them to the pool."""
+        from langchain_mcp_adapters.tools import load_mcp_tools
+
+        async with self.acquire() as session:
+            tools = await load_mcp_tools(session)
+        return self.bind_tools(tools)
+
+    def bind_tools(self, tools: List) -> List:
+        """Return ``tools`` rebuilt so every call runs on a pooled session."""
+        async def via_pool(tool_name: str, arguments: dict, call_next) -> ToolResult:
+            return await self.call_tool(tool_name, arguments)
+
+        return [wrap_tool(tool, via_pool) for tool in tools]
+
+    async def close(self) -> None:
+        """Stop the health checker and close every session."""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await asyncio.gather(*(self._retire(slot) for slot in list(self._slots)), return_exceptions=True)
+        logger.info(f"MCP session pool closed. Stats: {self.stats}")
@@ -0,0 +1,243 @@
+"""
+Bounded conversation memory for the agent graph.
+
+Without it every turn re-sends the whole thread, including raw SQL result
+tables, to the LLM and keeps it in the checkpointer forever. The memory
+manager runs at the start of each agent step and:
+
+- keeps the last ``window_turns`` turns verbatim (a turn starts at a user message)
+- folds older turns into a running plain-text summary
+- replaces large tool results from finished turns with a compact summary
+- drops further old turns while the thread is above ``token_budget``
+
+Compaction is written back into the graph state through ``add_messages``
+(``RemoveMessage`` for dropped messages, same-id replacements for compacted
+ones), so checkpoints stay bounded as well as prompts.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain_core.messages import (
+    AIMessage, BaseMessage, HumanMessage, RemoveMessage, ToolMessage,
+)
+
+from config.logging import get_logger
+from result_governor import RESULT_MARKER
+from sql_tools import parse_result, result_text
+
+logger = get_logger('memory')
+
+COMPACTED_MARKER = "[Compacted result:"
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when its encoding is available, else estimate."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Approximate prompt tokens used by one message, including tool call arguments."""
+    tokens = count_tokens(result_text(message.content)) + 4
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(str(call.get("args", ""))) + 4
+    return tokens
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a HumanMessage."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def summarize_result(text: str, preview_rows: int = 5) -> str:
+    """Describe a SQL result by its shape and first rows."""
+    if text.startswith(RESULT_MARKER):
+        # Governed results already carry a summary; keep it and the pageable result id
+        return f"{COMPACTED_MARKER} summarized result]\n" + text.split("\nColumn summary:")[0]
+    columns, rows = parse_result(text)
+    if not columns:
+        return text[:500]
+    preview = "\n".join(",".join(row) for row in rows[:preview_rows])
+    return (
+        f"{COMPACTED_MARKER} {len(rows)} rows x {len(columns)} columns]\n"
+        f"{','.join(columns)}\n{preview}"
+    )
+
+
+def summarize_turn(turn: List[BaseMessage], answer_chars: int = 300) -> str:
+    """One-line summary of a finished turn: question, SQL run and the start of the answer."""
+    question = ""
+    queries = []
+    answer = ""
+    for message in turn:
+        if isinstance(message, HumanMessage):
+            question = result_text(message.content)
+        elif isinstance(message, AIMessage):
+            for call in message.tool_calls or []:
+                query = call.get("args", {}).get("query")
+                if query:
+                    queries.append(" ".join(query.split()))
+            if message.content and not message.tool_calls:
+                answer = result_text(message.content)
+    parts = [f"Q: {question}"]
+    if queries:
+        parts.append("SQL: " + " ; ".join(queries))
+    if answer:
+        answer = " ".join(answer.split())
+        parts.append("A: " + (answer[:answer_chars] + "..." if len(answer) > answer_chars else answer))
+    return " | ".join(parts)
+
+
+@dataclass
+class MemoryUpdate:
+    """Result of compacting a thread before an LLM call."""
+    messages: List[BaseMessage]
+    state_updates: List[BaseMessage] = field(default_factory=list)
+    summary: str = ""
+
+
+class ConversationMemory:
+    """Sliding-window, summarizing memory manager with a per-thread token budget."""
+
+    def __init__(
+            self,
+            window_turns: int = 6,
+            tool_result_chars: int = 2000,
+            token_budget: int = 6000,
+            summary_chars: int = 3000,
+            max_threads: int = 1000
+    ):
+        self.window_turns = window_turns
+        self.tool_result_chars = tool_result_chars
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self.max_threads = max_threads
+        # Usage of the most recently compacted threads, least recent first
+        self._usage: "OrderedDict[str, dict]" = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config) -> "ConversationMemory":
+        """Create a memory manager from an ``AgentConfig`` instance."""
+        return cls(
+            window_turns=config.memory_window_turns,
+            tool_result_chars=config.memory_tool_result_chars,
+            token_budget=config.memory_token_budget,
+            summary_chars=config.memory_summary_chars,
+            max_threads=config.max_threads,
+        )
+
+    def _compact_tool_message(self, message: BaseMessage) -> Optional[ToolMessage]:
+        if not isinstance(message, ToolMessage):
+            return None
+        text = result_text(message.content)
+        if len(text) <= self.tool_result_chars or text.startswith(COMPACTED_MARKER):
+            return None
+        return ToolMessage(
+            content=summarize_result(text),
+            tool_call_id=message.tool_call_id,
+            name=message.name,
+            id=message.id,
+        )
+
+    def _extend_summary(self, summary: str, turns: List[List[BaseMessage]]) -> str:
+        lines = [line for line in summary.splitlines() if line]
+        lines.extend(summarize_turn(turn) for turn in turns)
+        text = "\n".join(lines)
+        # Keep the most recent part of the summary when it outgrows its budget
+        while len(text) > self.summary_chars and len(lines) > 1:
+            lines.pop(0)
+            text = "\n".join(lines)
+        return text[-self.summary_chars:]
+
+    def compact(self, messages: List[BaseMessage], summary: str = "", thread_id: Optional[str] = None) -> MemoryUpdate:
+        """
+        Bound a thread's history before it is sent to the LLM.
+
+        Args:
+            messages: The thread's messages (without the system prompt).
+            summary: The thread's current running summary.
+            thread_id: Used to record per-thread usage.
+
+        Returns:
+            A MemoryUpdate with the messages to send, the state updates that
+            persist the compaction, and the new summary.
+        """
+        turns = split_turns(list(messages))
+        removed: List[List[BaseMessage]] = []
+
+        if len(turns) > self.window_turns:
+            removed = turns[:-self.window_turns]
+            turns = turns[-self.window_turns:]
+
+        # Large results are only compacted once their turn is finished
+        replacements = []
+        for turn in turns[:-1]:
+            for index, message in enumerate(turn):
+                compacted = self._compact_tool_message(message)
+                if compacted is not None:
+                    turn[index] = compacted
+                    replacements.append(compacted)
+
+        tokens = sum(message_tokens(m) for turn in turns for m in turn)
+        while tokens > self.token_budget and len(turns) > 1:
+            dropped = turns.pop(0)
+            removed.append(dropped)
+            tokens -= sum(message_tokens(m) for m in dropped)
+
+        if removed:
+            summary = self._extend_summary(summary, removed)
+
+        kept = [message for turn in turns for message in turn]
+        state_updates: List[BaseMessage] = [
+            RemoveMessage(id=message.id) for turn in removed for message in turn if message.id
+        ]
+        state_updates.extend(replacements)
+
+        if tokens > self.token_budget:
+            logger.warning(f"Thread {thread_id} current turn uses {tokens} tokens, above budget {self.token_budget}")
+
+        if thread_id is not None:
+            usage = self._usage.setdefault(thread_id, {"compactions": 0, "dropped_messages": 0})
+            self._usage.move_to_end(thread_id)
+            # Same bound as the checkpointer's threads; evicted threads' counters go with them
+            while len(self._usage) > self.max_threads:
+                self._usage.popitem(last=False)
+            usage.update({
+                "messages": len(kept),
+                "turns": len(turns),
+                "history_tokens": tokens,
+                "summary_tokens": count_tokens(summary) if summary else 0,
+            })
+            if state_updates:
+                usage["compactions"] += 1
+                usage["dropped_messages"] += sum(len(turn) for turn in removed)
+
+        return MemoryUpdate(messages=kept, state_updates=state_updates, summary=summary)
+
+    def usage(self, thread_id: Optional[str] = None) -> dict:
+        """Return memory usage for one thread, or for all threads when ``thread_id`` is None."""
+        if thread_id is None:
+            return {key: dict(value) for key, value in self._usage.items()}
+        return dict(self._usage.get(thread_id, {}))
+
+    def forget(self, thread_id: str) -> None:
+        """Drop usage counters for a thread."""
+        self._usage.pop(thread_id, None)
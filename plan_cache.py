@@ -0,0 +1,424 @@
+"""
+Question-level cache of SQL plans and final answers.
+
+Many questions are rephrasings of earlier ones ("total net_margin by
+channel", "net margin per sales channel"), yet each costs one or more LLM
+calls before any SQL runs. ``PlanCache`` remembers, per normalized
+question, the read-only SQL the agent executed and the answer it gave:
+
+- questions are normalized locally into word tokens (lower case, split on
+  punctuation and underscores, filler words dropped, plurals folded) and
+  compared by Jaccard similarity; numbers, polarity words (negations,
+  min/max, highest/lowest, top/bottom), comparatives (before/after,
+  above/below, more/less) and conjunctions (and/or) must match exactly
+- a question that is the same, word for word and in order once case,
+  punctuation, articles and plurals are normalized, over tables that have
+  not changed since returns the cached answer without calling the LLM
+- a similar question, or an exact one over changed data, replays the
+  cached SQL so the LLM only has to write the answer from fresh results
+- entries record the schema version (a hash of ``information_schema.COLUMNS``)
+  and the change signature of each table they read; a schema change drops
+  them, a data change only stops their answers from being reused; a write
+  the agent runs through the SQL tools drops the entries of its tables
+
+Follow-up questions that lean on earlier turns ("what about for 2016?")
+are never looked up or stored. The cache is LRU-bounded and persisted to
+a JSON file.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from config.logging import get_logger
+from memory import split_turns
+from schema_catalog import COLUMNS_QUERY
+from sql_cache import VERSION_PROBE_QUERY
+from sql_tools import (
+    CallNext, ToolResult, is_error_result, is_read_query, is_write_query, parse_result,
+    referenced_tables, result_text,
+)
+
+logger = get_logger('plan_cache')
+
+RunSQL = Callable[[str], Awaitable[str]]
+
+# Words that do not change what a question asks for
+FILLER_WORDS = {
+    "a", "an", "the", "of", "by", "per", "for", "in", "on", "at", "to", "and", "or", "is", "are",
+    "was", "were", "be", "what", "which", "who", "show", "me", "give", "list", "tell", "please",
+    "each", "every", "across", "do", "does", "did", "can", "could", "i", "we", "our", "my",
+    "all", "total", "overall",
+}
+
+# Words that point back at an earlier turn
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "those", "these", "them", "they", "same", "above", "previous",
+    "instead", "also", "again", "else", "other",
+}
+
+# Words that flip or bound what a question asks for; they must match exactly
+POLARITY_WORDS = {
+    "not", "no", "non", "never", "without", "excluding", "except",
+    "min", "max", "minimum", "maximum", "highest", "lowest", "top", "bottom",
+}
+
+# Comparatives and conjunctions: they change which rows a question selects
+COMPARISON_WORDS = {
+    "before", "after", "since", "until", "above", "below", "over", "under", "between",
+    "more", "less", "greater", "fewer", "higher", "lower", "most", "least", "than",
+    "and", "or",
+}
+
+# Words an exact question match may ignore
+ARTICLE_WORDS = {"a", "an", "the", "please"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def _fold_plural(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss") and not word[0].isdigit():
+        return word[:-1]
+    return word
+
+
+def question_tokens(question: str) -> Set[str]:
+    """Normalize a question into its set of significant word tokens."""
+    return {_fold_plural(word) for word in _WORD_RE.findall(question.lower()) if word not in FILLER_WORDS}
+
+
+def question_key(question: str) -> str:
+    """
+    Normalize a question for exact matching: every word but articles, in
+    order, lower-cased with plurals folded.
+    """
+    return " ".join(_fold_plural(word) for word in _WORD_RE.findall(question.lower()) if word not in ARTICLE_WORDS)
+
+
+def exact_words(question: str) -> Set[str]:
+    """Polarity words, comparatives and conjunctions of a question; two questions must share them to match."""
+    return set(_WORD_RE.findall(question.lower())) & (POLARITY_WORDS | COMPARISON_WORDS)
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _numbers(tokens: Set[str]) -> Set[str]:
+    return {token for token in tokens if token[0].isdigit()}
+
+
+def is_follow_up(question: str) -> bool:
+    """Check whether a question refers back to an earlier turn."""
+    words = set(_WORD_RE.findall(question.lower()))
+    return bool(words & FOLLOW_UP_WORDS) or bool(re.match(r"\s*(and|what about|how about)\b", question.lower()))
+
+
+def standalone_question(messages: List[BaseMessage], summary: str = "") -> Optional[str]:
+    """
+    The current turn's question if it can be answered without earlier turns.
+
+    The first question of a thread always qualifies; later ones only when
+    they do not look like follow-ups.
+    """
+    turns = split_turns(messages)
+    if not turns or not isinstance(turns[-1][0], HumanMessage):
+        return None
+    question = turns[-1][0].content
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if (len(turns) > 1 or summary) and is_follow_up(question):
+        return None
+    return question
+
+
+def executed_queries(turn: List[BaseMessage]) -> Optional[List[List[str]]]:
+    """
+    ``[tool_name, sql]`` of the successful queries in a turn.
+
+    Returns None when the turn must not be cached: it ran a write or other
+    non-read statement.
+    """
+    results = {message.tool_call_id: message for message in turn if isinstance(message, ToolMessage)}
+    queries = []
+    for message in turn:
+        if not isinstance(message, AIMessage):
+            continue
+        for call in message.tool_calls or []:
+            query = (call.get("args") or {}).get("query")
+            if not isinstance(query, str):
+                continue
+            if not is_read_query(query):
+                return None
+            result = results.get(call.get("id"))
+            if result is None or result.status == "error" or is_error_result(result_text(result.content)):
+                continue
+            if [call["name"], query] not in queries:
+                queries.append([call["name"], query])
+    return queries
+
+
+@dataclass
+class PlanEntry:
+    question: str
+    tokens: List[str]
+    queries: List[List[str]]
+    answer: str
+    tables: List[str]
+    schema_version: str
+    data_version: Dict[str, str] = field(default_factory=dict)
+    created_at: float = 0.0
+    hits: int = 0
+
+
+@dataclass
+class PlanHit:
+    entry: PlanEntry
+    similarity: float
+    # Set when the cached answer can be returned as is
+    answer: Optional[str] = None
+
+
+class PlanCache:
+    """Bounded, persisted map of normalized questions to SQL plans and answers."""
+
+    def __init__(
+            self,
+            run_sql: Optional[RunSQL] = None,
+            path: Optional[str] = None,
+            max_entries: int = 500,
+            min_similarity: float = 0.7,
+            version_check_interval: float = 60.0,
+            save_interval: float = 30.0
+    ):
+        self.run_sql = run_sql
+        self.path = path
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.version_check_interval = version_check_interval
+        self.save_interval = save_interval
+        self.stats = {
+            "lookups": 0, "answer_hits": 0, "plan_hits": 0, "misses": 0,
+            "bypassed": 0, "stored": 0, "evictions": 0, "invalidations": 0,
+        }
+        self.schema_version = ""
+        self._entries: "OrderedDict[str, PlanEntry]" = OrderedDict()
+        self._table_versions: Dict[str, str] = {}
+        self._last_version_check: Optional[float] = None
+        self._version_lock = asyncio.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def from_config(cls, run_sql: Optional[RunSQL], config) -> "PlanCache":
+        """Create a plan cache from an ``AgentConfig`` instance."""
+        return cls(
+            run_sql,
+            path=config.plan_cache_path,
+            max_entries=config.plan_cache_max_entries,
+            min_similarity=config.plan_cache_similarity,
+            version_check_interval=config.plan_cache_version_check_interval,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> None:
+        """Load persisted entries, if any."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            entries = [PlanEntry(**entry) for entry in data["entries"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable plan cache {self.path}: {e}")
+            return
+        self._entries = OrderedDict((question_key(entry.question), entry) for entry in entries[-self.max_entries:])
+
+    def save(self) -> None:
+        """Persist the entries, least recently used first."""
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"entries": [asdict(entry) for entry in self._entries.values()]}, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write plan cache {self.path}: {e}")
+
+    async def start(self) -> None:
+        """Load persisted entries and drop those made for another schema."""
+        self.load()
+        await self.check_versions()
+        logger.info(f"Plan cache ready: {len(self)} entries")
+
+    def close(self) -> None:
+        """Persist pending changes."""
+        if self._dirty:
+            self.save()
+
+    def _version_check_due(self) -> bool:
+        if self._last_version_check is None:
+            return True
+        return time.monotonic() - self._last_version_check >= self.version_check_interval
+
+    async def check_versions(self) -> None:
+        """
+        Probe the schema version and per-table change signatures, at most once
+        per check interval, and drop entries made for another schema.
+        """
+        if self.run_sql is None or not self.version_check_interval or not self._version_check_due():
+            return
+        async with self._version_lock:
+            if not self._version_check_due():
+                return
+            self._last_version_check = time.monotonic()
+            try:
+                columns = await self.run_sql(COLUMNS_QUERY)
+                tables = await self.run_sql(VERSION_PROBE_QUERY)
+            except Exception as e:
+                logger.warning(f"Plan cache version probe failed: {e}")
+                self._table_versions = {}
+                return
+            if is_error_result(columns) or is_error_result(tables):
+                logger.warning("Plan cache version probe failed; cached answers are not reused")
+                self._table_versions = {}
+                return
+            self.schema_version = hashlib.sha1(columns.encode("utf-8")).hexdigest()[:16]
+            self._table_versions = {row[0].lower(): ",".join(row[1:]) for row in parse_result(tables)[1] if row}
+
+            stale = [key for key, entry in self._entries.items() if entry.schema_version != self.schema_version]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.stats["invalidations"] += len(stale)
+                self._dirty = True
+                logger.info(f"Dropped {len(stale)} cached plans after a schema change")
+
+    def invalidate(self, tables: Optional[List[str]] = None) -> int:
+        """Drop the entries that read from ``tables`` (every entry when None). Returns the number dropped."""
+        changed = set(tables) if tables is not None else None
+        stale = [
+            key for key, entry in self._entries.items()
+            if changed is None or changed & set(entry.tables)
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.stats["invalidations"] += len(stale)
+            self._dirty = True
+            logger.info(f"Dropped {len(stale)} cached plans after a write")
+        return len(stale)
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``: drop plans over tables the agent writes to."""
+        query = arguments.get("query", "")
+        result = await call_next(**arguments)
+        if is_write_query(query):
+            self.invalidate(referenced_tables(query) or None)
+        return result
+
+    def _data_unchanged(self, entry: PlanEntry) -> bool:
+        return bool(self._table_versions) and all(
+            self._table_versions.get(table) == entry.data_version.get(table) for table in entry.tables
+        )
+
+    async def lookup(self, question: str, tool_names: Optional[Set[str]] = None) -> Optional[PlanHit]:
+        """
+        Find the cached plan for the most similar earlier question.
+
+        Args:
+            question: The user's question.
+            tool_names: Tools currently available; plans using others are skipped.
+
+        Returns:
+            A ``PlanHit`` (with ``answer`` set when it can be returned as is), or None.
+        """
+        self.stats["lookups"] += 1
+        await self.check_versions()
+        tokens = question_tokens(question)
+        numbers = _numbers(tokens)
+        required = exact_words(question)
+        key = question_key(question)
+        best, best_key, best_rank = None, None, (0.0, False)
+        for entry_key, entry in self._entries.items():
+            entry_tokens = set(entry.tokens)
+            if _numbers(entry_tokens) != numbers or exact_words(entry.question) != required:
+                continue
+            if tool_names is not None and any(tool not in tool_names for tool, _ in entry.queries):
+                continue
+            # The same question wins ties with rephrasings of it
+            rank = (similarity(tokens, entry_tokens), entry_key == key)
+            if rank >= best_rank:
+                best, best_key, best_rank = entry, entry_key, rank
+        best_score = best_rank[0]
+        if best is None or best_score < self.min_similarity:
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(best_key)
+        best.hits += 1
+        self._dirty = True
+        # Similarity ignores word order and filler words; reusing the answer needs the same question
+        if best_key == key and self._data_unchanged(best):
+            self.stats["answer_hits"] += 1
+            logger.info(f"Plan cache answered {question!r} from {best.question!r}")
+            return PlanHit(entry=best, similarity=best_score, answer=best.answer)
+        self.stats["plan_hits"] += 1
+        logger.info(f"Plan cache replays {len(best.queries)} queries of {best.question!r} (similarity {best_score:.2f})")
+        return PlanHit(entry=best, similarity=best_score)
+
+    def record(self, question: str, queries: List[List[str]], answer: str) -> None:
+        """Store the queries a question ran and its answer, evicting the least recently used entries."""
+        if not queries or not answer:
+            self.stats["bypassed"] += 1
+            return
+        tokens = sorted(question_tokens(question))
+        tables = []
+        for _, query in queries:
+            tables.extend(table for table in referenced_tables(query) if table not in tables)
+        key = question_key(question)
+        self._entries[key] = PlanEntry(
+            question=question, tokens=tokens, queries=queries, answer=answer, tables=tables,
+            schema_version=self.schema_version,
+            data_version={table: self._table_versions[table] for table in tables if table in self._table_versions},
+            created_at=time.time(),
+        )
+        self._entries.move_to_end(key)
+        self.stats["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def record_turn(self, messages: List[BaseMessage], answer: str, summary: str = "") -> None:
+        """Store the current turn of a thread, unless it is a follow-up or ran a write."""
+        question = standalone_question(messages, summary)
+        if question is None:
+            self.stats["bypassed"] += 1
+            return
+        queries = executed_queries(split_turns(messages)[-1])
+        if queries is None:
+            self.stats["bypassed"] += 1
+            return
+        self.record(question, queries, answer)
@@ -0,0 +1,434 @@
+"""
+Materialized rollups of the known client_data / price_data workloads.
+
+The agent's domain is fixed (churn, consumption, margins and prices by
+segment), yet every answer used to re-scan a base table. ``PreAggregator``
+keeps small GROUP BY rollups of those tables in a local columnar store:
+
+- each rollup stores, per combination of its dimension columns, the row
+  count and the SUM, COUNT, MIN and MAX of its measure columns; rollups are
+  built with one aggregate query through ``execute_sql`` and snapshotted
+  to disk
+- refreshes are incremental per rollup: only rollups whose source table's
+  ``information_schema.TABLES`` signature changed (or that a write through
+  the agent touched) are rebuilt
+- aggregate queries over a source table whose filters, groups and
+  aggregates can be derived from a rollup (COUNT(*), COUNT/SUM/AVG/MIN/MAX
+  of a measure, MIN/MAX/COUNT(DISTINCT) of a dimension) are rewritten onto
+  it and answered by the local SQL engine; everything else goes to the
+  database unchanged
+- answers from a rollup end with a note saying which rollup served them
+  and when it was refreshed
+
+Queries are routed automatically on ``execute_sql`` and ``query_local_data``;
+``query_rollups`` is the same routing exposed as a tool whose description
+lists the rollups, so the model can aim for them.
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from config.logging import get_logger
+from local_engine import (
+    ColumnarStore, LocalSQLEngine, Query, UnsupportedQuery, _contains_aggregate, format_result, parse_sql,
+)
+from sql_cache import VERSION_PROBE_QUERY
+from sql_tools import (
+    CallNext, ToolResult, is_error_result, is_write_query, parse_result, referenced_tables, result_text,
+)
+
+logger = get_logger('preagg')
+
+PREAGG_TOOL_NAME = "query_rollups"
+
+RunSQL = Callable[[str], Awaitable[str]]
+
+# Row count column of every rollup
+ROWS_COLUMN = "_rows"
+
+MEASURE_PARTS = ("sum", "count", "min", "max")
+
+
+@dataclass
+class RollupSpec:
+    name: str
+    source: str
+    dimensions: List[str]
+    measures: List[str]
+
+    def build_sql(self) -> str:
+        """The aggregate query that materializes the rollup from its source table."""
+        items = list(self.dimensions) + [f"COUNT(*) AS {ROWS_COLUMN}"]
+        for measure in self.measures:
+            items.extend(f"{part.upper()}({measure}) AS {measure}__{part}" for part in MEASURE_PARTS)
+        return f"SELECT {', '.join(items)} FROM {self.source} GROUP BY {', '.join(self.dimensions)}"
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha1(self.build_sql().encode("utf-8")).hexdigest()[:12]
+
+
+CLIENT_MEASURES = [
+    "churn", "net_margin", "margin_gross_pow_ele", "margin_net_pow_ele", "cons_12m", "cons_gas_12m",
+    "cons_last_month", "forecast_cons_12m", "imp_cons", "pow_max", "forecast_price_energy_off_peak",
+    "forecast_price_energy_peak", "num_years_antig", "nb_prod_act",
+]
+
+PRICE_MEASURES = [
+    "price_off_peak_var", "price_peak_var", "price_mid_peak_var",
+    "price_off_peak_fix", "price_peak_fix", "price_mid_peak_fix",
+]
+
+DEFAULT_ROLLUPS = [
+    RollupSpec("client_segments", "client_data", ["channel_sales", "origin_up", "has_gas"], CLIENT_MEASURES),
+    RollupSpec(
+        "client_tenure", "client_data", ["num_years_antig", "nb_prod_act"],
+        [measure for measure in CLIENT_MEASURES if measure not in ("num_years_antig", "nb_prod_act")],
+    ),
+    RollupSpec("price_by_date", "price_data", ["price_date"], PRICE_MEASURES),
+]
+
+
+@dataclass
+class Rollup:
+    spec: RollupSpec
+    signature: Optional[str] = None
+    built_at: Optional[float] = None
+    rows: int = 0
+    stale: bool = True
+    dimension_set: set = field(default_factory=set, init=False)
+    measure_set: set = field(default_factory=set, init=False)
+
+    def __post_init__(self):
+        self.dimension_set = {dimension.lower() for dimension in self.spec.dimensions}
+        self.measure_set = {measure.lower() for measure in self.spec.measures}
+
+
+def _age(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def _sum(column: str):
+    return ("agg", "SUM", ("col", column), False)
+
+
+def _count(column: str):
+    # COUNT is 0, not NULL, when no rollup rows match
+    return ("func", "COALESCE", [_sum(column), ("lit", 0)])
+
+
+class PreAggregator:
+    """Builds, refreshes and answers queries from rollups of the source tables."""
+
+    def __init__(
+            self,
+            run_sql: RunSQL,
+            specs: Optional[List[RollupSpec]] = None,
+            cache_dir: Optional[str] = None,
+            refresh_interval: float = 300.0
+    ):
+        self.run_sql = run_sql
+        self.rollups = {spec.name: Rollup(spec) for spec in (specs if specs is not None else DEFAULT_ROLLUPS)}
+        self.store = ColumnarStore(cache_dir=cache_dir)
+        self.engine = LocalSQLEngine(self.store)
+        self.refresh_interval = refresh_interval
+        self.stats = {"routed": 0, "not_routed": 0, "builds": 0, "build_errors": 0, "invalidations": 0}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending_refresh: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, run_sql: RunSQL, config) -> "PreAggregator":
+        """Create a pre-aggregator from an ``AgentConfig`` instance."""
+        return cls(run_sql, cache_dir=config.preagg_dir, refresh_interval=config.preagg_refresh_interval)
+
+    def load(self) -> None:
+        """Memory-map persisted rollups built from the current definitions."""
+        for rollup in self.rollups.values():
+            snapshot = self.store.load_snapshot(rollup.spec.name)
+            if snapshot is None:
+                continue
+            table, source = snapshot
+            if not isinstance(source, dict) or source.get("fingerprint") != rollup.spec.fingerprint:
+                continue
+            self.store.tables[rollup.spec.name.lower()] = table
+            rollup.signature, rollup.built_at = source.get("signature"), source.get("built_at")
+            rollup.rows, rollup.stale = table.num_rows, False
+
+    async def refresh(self, force: bool = False) -> List[str]:
+        """
+        Rebuild rollups whose source table changed since they were built.
+
+        Args:
+            force: Rebuild every rollup.
+
+        Returns:
+            Names of the rollups rebuilt.
+        """
+        async with self._lock:
+            text = await self.run_sql(VERSION_PROBE_QUERY)
+            if is_error_result(text):
+                raise RuntimeError(text)
+            versions = {row[0].lower(): ",".join(row[1:]) for row in parse_result(text)[1] if row}
+            rebuilt = []
+            for rollup in self.rollups.values():
+                signature = versions.get(rollup.spec.source.lower())
+                if signature is None:
+                    continue
+                if force or rollup.stale or rollup.signature != signature:
+                    if await self._build(rollup, signature):
+                        rebuilt.append(rollup.spec.name)
+            return rebuilt
+
+    async def _build(self, rollup: Rollup, signature: str) -> bool:
+        spec = rollup.spec
+        started = time.perf_counter()
+        try:
+            text = await self.run_sql(spec.build_sql())
+            if is_error_result(text):
+                raise RuntimeError(text)
+        except Exception as e:
+            self.stats["build_errors"] += 1
+            logger.warning(f"Could not build rollup {spec.name}: {e}")
+            return False
+        header, rows = parse_result(text)
+        # mysql_mcp_server prints NULL as None
+        values = [["" if row[index] == "None" else row[index] for row in rows] for index in range(len(header))]
+        built_at = time.time()
+        source = {"fingerprint": spec.fingerprint, "signature": signature, "built_at": built_at}
+        await asyncio.to_thread(self.store.add_table, spec.name, header, values, source)
+        rollup.signature, rollup.built_at, rollup.rows, rollup.stale = signature, built_at, len(rows), False
+        self.stats["builds"] += 1
+        logger.info(
+            f"Built rollup {spec.name} ({len(rows)} rows from {spec.source}) "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return True
+
+    def invalidate(self, tables: Optional[List[str]] = None) -> int:
+        """
+        Stop answering from rollups of ``tables`` (all when None) until they
+        are rebuilt. Returns the number invalidated.
+        """
+        changed = {table.lower() for table in tables} if tables else None
+        invalidated = 0
+        for rollup in self.rollups.values():
+            if not rollup.stale and (changed is None or rollup.spec.source.lower() in changed):
+                rollup.stale = True
+                invalidated += 1
+        self.stats["invalidations"] += invalidated
+        return invalidated
+
+    async def start(self) -> None:
+        """Load persisted rollups, rebuild changed ones and start periodic refreshes."""
+        self.load()
+        try:
+            rebuilt = await self.refresh()
+            ready = [name for name, rollup in self.rollups.items() if not rollup.stale]
+            logger.info(f"Rollups ready: {ready} ({len(rebuilt)} rebuilt)")
+        except Exception as e:
+            logger.warning(f"Rollup refresh failed, using persisted rollups: {e}")
+        if self.refresh_interval and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self._refresh_quietly()
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            rebuilt = await self.refresh()
+            if rebuilt:
+                logger.info(f"Rollups refreshed: {rebuilt}")
+        except Exception as e:
+            logger.warning(f"Rollup refresh failed: {e}")
+
+    async def close(self) -> None:
+        """Stop periodic and pending refreshes."""
+        for task in (self._task, self._pending_refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._pending_refresh = None
+
+    # Routing
+
+    def _rewrite(self, node, rollup: Rollup, aliases: set):
+        """Map an expression over the source table onto the rollup's columns."""
+        if isinstance(node, list):
+            return [self._rewrite(child, rollup, aliases) for child in node]
+        if not isinstance(node, tuple) or not node:
+            return node
+        kind = node[0]
+        if kind == "agg":
+            return self._rewrite_aggregate(node, rollup)
+        if kind == "col":
+            if node[1].lower() in rollup.dimension_set or node[1].lower() in aliases:
+                return node
+            raise UnsupportedQuery(f"{node[1]} is not a dimension of rollup {rollup.spec.name}")
+        if kind in ("star", "isnull"):
+            raise UnsupportedQuery(f"{kind} cannot be answered from a rollup")
+        return tuple(self._rewrite(child, rollup, aliases) for child in node)
+
+    def _rewrite_aggregate(self, node, rollup: Rollup):
+        name, argument, distinct = node[1], node[2], node[3]
+        if argument[0] == "star":
+            return _count(ROWS_COLUMN)
+        if argument[0] != "col":
+            raise UnsupportedQuery("Only aggregates of plain columns can be answered from a rollup")
+        column = argument[1].lower()
+        if column in rollup.dimension_set:
+            if name in ("MIN", "MAX") or (name == "COUNT" and distinct):
+                return node
+        elif column in rollup.measure_set and not distinct:
+            if name == "COUNT":
+                return _count(f"{column}__count")
+            if name == "SUM":
+                return _sum(f"{column}__sum")
+            if name == "AVG":
+                return ("arith", "/", _sum(f"{column}__sum"), _sum(f"{column}__count"))
+            if name in ("MIN", "MAX"):
+                return ("agg", name, ("col", f"{column}__{name.lower()}"), False)
+        raise UnsupportedQuery(f"{name}({argument[1]}) cannot be answered from rollup {rollup.spec.name}")
+
+    def _route(self, query: Query, rollup: Rollup) -> Query:
+        if query.where is not None:
+            if _contains_aggregate(query.where):
+                raise UnsupportedQuery("Aggregates in WHERE")
+            where = self._rewrite(query.where, rollup, set())
+        else:
+            where = None
+        aggregated = bool(query.group_by) or query.having is not None \
+            or any(_contains_aggregate(expression) for expression, _ in query.select)
+        if not aggregated and not query.distinct:
+            raise UnsupportedQuery("Row-level queries cannot be answered from a rollup")
+        aliases = {label.lower() for _, label in query.select}
+        return replace(
+            query,
+            table=rollup.spec.name,
+            select=[(self._rewrite(expression, rollup, set()), label) for expression, label in query.select],
+            where=where,
+            group_by=[self._rewrite(expression, rollup, aliases) for expression in query.group_by],
+            having=None if query.having is None else self._rewrite(query.having, rollup, aliases),
+            order_by=[(self._rewrite(expression, rollup, aliases), desc) for expression, desc in query.order_by],
+        )
+
+    def answer(self, sql: str) -> Optional[ToolResult]:
+        """
+        Answer a query from the smallest rollup it can be derived from.
+
+        Returns:
+            The result text with a freshness note, or None when no rollup applies.
+        """
+        try:
+            query = parse_sql(sql)
+        except UnsupportedQuery:
+            return None
+        candidates = sorted(
+            (rollup for rollup in self.rollups.values()
+             if not rollup.stale and rollup.spec.source.lower() == query.table.lower()),
+            key=lambda rollup: rollup.rows,
+        )
+        for rollup in candidates:
+            try:
+                routed = self._route(query, rollup)
+                started = time.perf_counter()
+                columns, rows = self.engine.execute_query(routed)
+            except UnsupportedQuery:
+                continue
+            except Exception as e:
+                logger.warning(f"Rollup {rollup.spec.name} failed on query, using the database: {e}")
+                continue
+            self.stats["routed"] += 1
+            refreshed = datetime.fromtimestamp(rollup.built_at, timezone.utc)
+            note = (
+                f"[Pre-aggregated from rollup {rollup.spec.name} of {rollup.spec.source}, refreshed "
+                f"{refreshed:%Y-%m-%d %H:%M:%S} UTC ({_age(time.time() - rollup.built_at)} ago)]"
+            )
+            logger.info(
+                f"Rollup {rollup.spec.name} answered in {(time.perf_counter() - started) * 1000:.2f}ms: {sql}"
+            )
+            artifact = {"rows": len(rows), "rollup": rollup.spec.name, "refreshed_at": refreshed.isoformat()}
+            return f"{format_result(columns, rows)}\n{note}", artifact
+        self.stats["not_routed"] += 1
+        return None
+
+    def _schedule_refresh(self) -> None:
+        if self._pending_refresh is None or self._pending_refresh.done():
+            self._pending_refresh = asyncio.create_task(self._refresh_quietly())
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``."""
+        query = arguments.get("query", "")
+        if is_write_query(query):
+            result = await call_next(**arguments)
+            if self.invalidate(referenced_tables(query) or None):
+                self._schedule_refresh()
+            return result
+        routed = self.answer(query)
+        if routed is not None:
+            return routed
+        return await call_next(**arguments)
+
+    def ready(self) -> List[Rollup]:
+        """Rollups that are built and current."""
+        return [rollup for rollup in self.rollups.values() if not rollup.stale]
+
+    def create_tool(self, fallback_tool=None):
+        """
+        Build the ``query_rollups`` tool.
+
+        Args:
+            fallback_tool: Tool used for queries no rollup can answer (normally ``execute_sql``).
+
+        Returns:
+            A LangChain ``StructuredTool``.
+        """
+        from langchain_core.tools import StructuredTool
+
+        async def query_rollups(query: str) -> ToolResult:
+            routed = self.answer(query)
+            if routed is not None:
+                return routed
+            if fallback_tool is None:
+                return "Error executing query: no rollup can answer this query", None
+            logger.info(f"No rollup for query, using {fallback_tool.name}: {query}")
+            return result_text(await fallback_tool.ainvoke({"query": query})), None
+
+        rollups = "; ".join(
+            f"{rollup.spec.source} by ({', '.join(rollup.spec.dimensions)}) with "
+            f"{', '.join(rollup.spec.measures)}"
+            for rollup in self.ready()
+        )
+        return StructuredTool.from_function(
+            coroutine=query_rollups,
+            name=PREAGG_TOOL_NAME,
+            description=(
+                "Run a read-only aggregate SQL SELECT written against the base tables, answered in "
+                f"microseconds from pre-computed rollups: {rollups or 'none built yet'}. "
+                "It applies when WHERE, GROUP BY and ORDER BY only use one rollup's dimension columns and "
+                "the aggregates are COUNT(*) or COUNT/SUM/AVG/MIN/MAX of its measure columns. "
+                "Other queries are sent to the MySQL database automatically. Results from a rollup end "
+                "with a note of when it was refreshed."
+            ),
+            response_format="content_and_artifact",
+        )
+
+
+def wrap_tools_with_preagg(tools: List, preagg: PreAggregator, tool_names: List[str]) -> List:
+    """Return ``tools`` with matching queries on ``tool_names`` answered from rollups."""
+    from sql_tools import wrap_sql_tools
+
+    return wrap_sql_tools(tools, preagg, tool_names)
@@ -0,0 +1,176 @@
+"""
+Token-budgeted prompt assembly for each LLM call.
+
+Conversation memory bounds what a thread keeps between turns, but inside a
+turn every hop of the tool loop re-sends the system prompt, the schema
+block, the summary and all tool results so far. ``PromptAssembler`` builds
+each call's messages in a fixed order:
+
+1. the system prompt with the schema block: identical on every call, so
+   the provider's prompt cache can reuse it as a prefix
+2. the running summary of earlier turns
+3. the history, oldest first
+
+and, while the locally counted total (tool definitions included) is above
+``token_budget``, sheds the least valuable content first:
+
+- large tool results of earlier turns are condensed to shape and first rows
+- earlier turns are dropped oldest first, leaving a one-line summary each
+- tool results of the current turn are condensed, oldest hop first
+- the summary is cut, keeping its most recent part
+
+Nothing is written back to the graph state; the next call starts again
+from the full history.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+
+from config.logging import get_logger
+from memory import COMPACTED_MARKER, count_tokens, message_tokens, split_turns, summarize_result, summarize_turn
+from sql_tools import result_text
+
+logger = get_logger('prompt_budget')
+
+
+def tool_definition_tokens(tools: Optional[List]) -> int:
+    """Tokens taken by the tool definitions sent with every call."""
+    if not tools:
+        return 0
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    return count_tokens(json.dumps([convert_to_openai_tool(tool) for tool in tools]))
+
+
+@dataclass
+class PromptReport:
+    """Token accounting of one assembled prompt."""
+    prefix_tokens: int = 0
+    summary_tokens: int = 0
+    history_tokens: int = 0
+    dropped_messages: int = 0
+    condensed_results: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prefix_tokens + self.summary_tokens + self.history_tokens
+
+
+class PromptAssembler:
+    """Orders prompt content for prefix caching and enforces a token budget."""
+
+    def __init__(self, token_budget: Optional[int] = None, tool_tokens: int = 0):
+        self.token_budget = token_budget
+        self.tool_tokens = tool_tokens
+        self.stats = {"calls": 0, "over_budget": 0, "dropped_messages": 0, "condensed_results": 0}
+        self._prefix: Optional[Tuple[str, int]] = None
+
+    @classmethod
+    def from_config(cls, config, tools: Optional[List] = None) -> "PromptAssembler":
+        """Create an assembler from an ``AgentConfig`` instance and the tools bound to the LLM."""
+        return cls(token_budget=config.prompt_token_budget or None, tool_tokens=tool_definition_tokens(tools))
+
+    def _prefix_tokens(self, system_prompt: str) -> int:
+        # The prompt only changes when the schema block is refreshed
+        if self._prefix is None or self._prefix[0] != system_prompt:
+            self._prefix = (system_prompt, count_tokens(system_prompt) + self.tool_tokens)
+        return self._prefix[1]
+
+    @staticmethod
+    def _condense(message: BaseMessage) -> Optional[ToolMessage]:
+        if not isinstance(message, ToolMessage):
+            return None
+        text = result_text(message.content)
+        if text.startswith(COMPACTED_MARKER):
+            return None
+        condensed = summarize_result(text)
+        if len(condensed) >= len(text):
+            return None
+        return ToolMessage(content=condensed, tool_call_id=message.tool_call_id, name=message.name, id=message.id)
+
+    def assemble(
+            self,
+            system_prompt: str,
+            messages: List[BaseMessage],
+            summary: str = ""
+    ) -> Tuple[List[BaseMessage], PromptReport]:
+        """
+        Build the messages for one LLM call within the token budget.
+
+        Args:
+            system_prompt: Static system prompt, schema block included.
+            messages: The thread's history (without system messages).
+            summary: Running summary of turns no longer in ``messages``.
+
+        Without a ``token_budget`` nothing is trimmed; the prompt is only ordered and counted.
+
+        Returns:
+            The messages to send and their token accounting.
+        """
+        self.stats["calls"] += 1
+        budget = self.token_budget if self.token_budget is not None else float("inf")
+        report = PromptReport(prefix_tokens=self._prefix_tokens(system_prompt))
+        turns = split_turns(list(messages))
+        sizes = [[message_tokens(message) for message in turn] for turn in turns]
+        dropped_lines: List[str] = []
+
+        def summary_text() -> str:
+            return "\n".join(line for line in [summary, *dropped_lines] if line)
+
+        def total() -> int:
+            text = summary_text()
+            summary_tokens = count_tokens(text) + 10 if text else 0
+            return report.prefix_tokens + summary_tokens + sum(sum(turn) for turn in sizes)
+
+        def condense(turn_index: int, message_index: int) -> None:
+            condensed = self._condense(turns[turn_index][message_index])
+            if condensed is not None:
+                turns[turn_index][message_index] = condensed
+                sizes[turn_index][message_index] = message_tokens(condensed)
+                report.condensed_results += 1
+
+        if total() > budget:
+            for turn_index in range(len(turns) - 1):
+                for message_index in range(len(turns[turn_index])):
+                    condense(turn_index, message_index)
+        while total() > budget and len(turns) > 1:
+            dropped = turns.pop(0)
+            sizes.pop(0)
+            dropped_lines.append(summarize_turn(dropped))
+            report.dropped_messages += len(dropped)
+        if total() > budget and turns:
+            # Oldest results of the current turn first; the latest hop's results go last
+            for message_index in range(len(turns[-1])):
+                if total() <= budget:
+                    break
+                condense(-1, message_index)
+
+        text = summary_text()
+        fixed = report.prefix_tokens + sum(sum(turn) for turn in sizes)
+        if text and fixed + count_tokens(text) + 10 > budget:
+            # Keep the most recent part of the summary that still fits
+            room = max(budget - fixed - 10, 0)
+            lines = text.splitlines()
+            while lines and count_tokens("\n".join(lines)) > room:
+                lines.pop(0)
+            text = "\n".join(lines)
+
+        prompt: List[BaseMessage] = [SystemMessage(content=system_prompt)]
+        if text:
+            prompt.append(SystemMessage(content=f"Summary of earlier conversation:\n{text}"))
+            report.summary_tokens = count_tokens(text) + 10
+        history = [message for turn in turns for message in turn]
+        prompt.extend(history)
+        report.history_tokens = sum(sum(turn) for turn in sizes)
+
+        self.stats["dropped_messages"] += report.dropped_messages
+        self.stats["condensed_results"] += report.condensed_results
+        if report.total_tokens > budget:
+            self.stats["over_budget"] += 1
+            logger.warning(
+                f"Prompt uses {report.total_tokens} tokens after trimming, above budget {budget}"
+            )
+        return prompt, report
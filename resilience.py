@@ -0,0 +1,243 @@
+"""
+Request deadlines, LLM retries and a circuit breaker.
+
+A deadline is set once per request (``invoke_graph_response`` /
+``stream_graph_response``) in a context variable, so every LLM and tool
+call made while answering it can bound its own timeout by the time left
+(``bounded_timeout``). LLM calls go through ``LLMCallGuard``:
+
+- each attempt is time-boxed by ``timeout`` and the request deadline
+- rate limits, timeouts, connection errors and 5xx responses are retried
+  with full-jitter exponential backoff, honouring ``Retry-After``
+- a process-wide ``CircuitBreaker`` opens after consecutive failures, so
+  during an outage requests fail fast instead of queueing retries
+"""
+
+import asyncio
+import random
+import time
+from contextvars import Context, ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+from config.logging import get_logger
+
+logger = get_logger('resilience')
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+
+def set_deadline(timeout: Optional[float]) -> None:
+    """Give the current context (task) a deadline ``timeout`` seconds from now; falsy disables."""
+    _deadline.set(time.monotonic() + timeout if timeout else None)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def bounded_timeout(timeout: Optional[float]) -> Optional[float]:
+    """The smaller of ``timeout`` (falsy for none) and the time left before the deadline."""
+    remaining = remaining_time()
+    if not timeout:
+        return remaining
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+async def wait_for(awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """
+    ``asyncio.wait_for`` whose timer does not keep the caller's context alive.
+
+    A cancelled timer stays in the event loop until it would have fired,
+    together with the context it was scheduled in; inside a graph node that
+    context holds the whole run's state, so a 60s timeout would pin every
+    finished turn for a minute. This timer runs in an empty context instead.
+
+    Raises:
+        asyncio.TimeoutError: If ``awaitable`` did not finish within ``timeout`` seconds.
+    """
+    if timeout is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    expired = False
+
+    def expire():
+        nonlocal expired
+        expired = True
+        task.cancel()
+
+    timer = asyncio.get_running_loop().call_later(max(timeout, 0.0), expire, context=Context())
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if expired and task.cancelled():
+            raise asyncio.TimeoutError() from None
+        raise
+    finally:
+        timer.cancel()
+
+
+def is_retryable_llm_error(error: BaseException) -> bool:
+    """Check whether an LLM client error is transient (rate limit, timeout, outage)."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """The server's ``Retry-After`` delay in seconds, if the error carries one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds; then one trial call
+    is let through (half-open) and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.stats = {"opened": 0, "rejected": 0}
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def check(self) -> None:
+        """
+        Allow a call or reject it.
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or a trial call is in flight.
+        """
+        if self.state == "closed":
+            return
+        # In half-open state _opened_at is the trial's start; an abandoned trial is replaced
+        waited = time.monotonic() - self._opened_at
+        if waited >= self.reset_timeout:
+            self.state = "half_open"
+            self._opened_at = time.monotonic()
+            return
+        self.stats["rejected"] += 1
+        retry_in = max(self.reset_timeout - waited, 0.0)
+        raise CircuitOpenError(f"LLM unavailable after repeated failures; retry in {retry_in:.0f}s")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self.stats["opened"] += 1
+                logger.warning(f"LLM circuit opened after {self._failures} consecutive failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class LLMCallGuard:
+    """Time-boxed, retried and circuit-broken LLM calls."""
+
+    def __init__(
+            self,
+            timeout: float = 60.0,
+            max_attempts: int = 4,
+            base_delay: float = 0.5,
+            max_delay: float = 8.0,
+            breaker: Optional[CircuitBreaker] = None
+    ):
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "deadline_exceeded": 0, "failures": 0}
+
+    @classmethod
+    def from_config(cls, config) -> "LLMCallGuard":
+        """Create a guard from an ``AgentConfig`` instance."""
+        return cls(
+            timeout=config.llm_timeout,
+            max_attempts=config.llm_max_attempts,
+            base_delay=config.llm_retry_base_delay,
+            max_delay=config.llm_retry_max_delay,
+            breaker=CircuitBreaker(config.llm_breaker_threshold, config.llm_breaker_reset),
+        )
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential delay before retry ``attempt`` (1-based), or the server's Retry-After."""
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def invoke(self, llm, messages):
+        """
+        Call ``llm.ainvoke(messages)`` with retries.
+
+        A timeout cut short by the request deadline says nothing about the
+        LLM's health: it is raised at once, without a retry and without
+        counting towards the circuit breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            asyncio.TimeoutError: If the request deadline passed.
+            Exception: The last error once retries are exhausted, or any non-transient error.
+        """
+        self.stats["calls"] += 1
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                self.stats["deadline_exceeded"] += 1
+                raise asyncio.TimeoutError("Request deadline passed before the LLM call")
+            self.breaker.check()
+            # The deadline, not the per-call timeout, is what can expire this attempt
+            deadline_bound = remaining is not None and (not self.timeout or remaining < self.timeout)
+            try:
+                response = await wait_for(llm.ainvoke(messages), bounded_timeout(self.timeout))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    if deadline_bound:
+                        self.stats["deadline_exceeded"] += 1
+                        raise
+                    self.stats["timeouts"] += 1
+                if not is_retryable_llm_error(e):
+                    # The service answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+                remaining = remaining_time()
+                delay = self.backoff(attempt, e)
+                out_of_time = remaining is not None and delay >= remaining
+                if attempt == self.max_attempts or out_of_time or self.breaker.state == "open":
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(
+                    f"LLM call failed ({type(e).__name__}: {e}); retry {attempt} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
@@ -0,0 +1,245 @@
+"""
+Result-set size governance for the SQL tools.
+
+Unbounded results used to land whole in a ``ToolMessage`` and were sent
+back to the LLM on every step. ``ResultGovernor`` sits around the SQL
+tools and:
+
+- appends ``LIMIT max_rows + 1`` to read queries without a LIMIT, so the
+  database never ships more than ``max_rows`` rows
+- passes small results through unchanged
+- spills large results to disk and answers with a summary instead: row
+  count, per-column statistics computed over a typed frame of all rows
+  (see ``frames``) and one page of rows (the first rows of an ordered
+  result, an evenly spaced sample otherwise)
+- serves further pages through the ``fetch_result_page`` tool
+- logs the bytes received from the database and sent to the model
+"""
+
+import os
+import re
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, List, Optional
+
+from config.logging import get_logger
+from sql_tools import (
+    CallNext, ToolResult, first_keyword, is_error_result, normalize_sql, parse_result,
+    result_text, wrap_sql_tools,
+)
+
+# frames imports NumPy; it is loaded with the first large result
+if TYPE_CHECKING:
+    from frames import FrameStore, ResultFrame
+
+logger = get_logger('result_governor')
+
+PAGE_TOOL_NAME = "fetch_result_page"
+RESULT_MARKER = "[Result "
+
+_LIMIT_RE = re.compile(r"\blimit\s+\d+(\s*(,|offset)\s*\d+)?\s*$")
+_ORDER_RE = re.compile(r"\border\s+by\b")
+
+
+def add_row_limit(query: str, max_rows: int) -> str:
+    """
+    Append ``LIMIT max_rows + 1`` to a SELECT without a trailing LIMIT.
+
+    The extra row tells the caller that the cap cut the result short.
+    """
+    if first_keyword(query) not in ("SELECT", "WITH"):
+        return query
+    normalized = normalize_sql(query)
+    if _LIMIT_RE.search(normalized) or " into " in f" {normalized} " or normalized.endswith("for update"):
+        return query
+    return f"{query.strip().rstrip(';').rstrip()} LIMIT {max_rows + 1}"
+
+
+@dataclass
+class SpilledResult:
+    result_id: str
+    path: str
+    header: str
+    rows: int
+    columns: int
+    created_at: float
+
+
+class ResultGovernor:
+    """Middleware that caps, summarizes, pages and spills large SQL results."""
+
+    def __init__(
+            self,
+            max_rows: int = 10000,
+            page_rows: int = 50,
+            spill_dir: Optional[str] = None,
+            max_spilled: int = 100,
+            frames: Optional["FrameStore"] = None
+    ):
+        self.max_rows = max_rows
+        self.page_rows = page_rows
+        self.spill_dir = spill_dir
+        self.max_spilled = max_spilled
+        self.frames = frames
+        self.stats = {
+            "queries": 0, "limited": 0, "truncated": 0, "spilled": 0,
+            "bytes_received": 0, "bytes_to_model": 0,
+        }
+        self._spilled: "OrderedDict[str, SpilledResult]" = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config, frames: Optional["FrameStore"] = None) -> "ResultGovernor":
+        """Create a governor from an ``AgentConfig`` instance; large results are kept in ``frames`` when given."""
+        return cls(
+            max_rows=config.result_max_rows,
+            page_rows=config.result_page_rows,
+            spill_dir=config.result_spill_dir,
+            max_spilled=config.result_spill_max,
+            frames=frames,
+        )
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``."""
+        query = arguments.get("query", "")
+        limited_query = add_row_limit(query, self.max_rows) if query else query
+        if limited_query != query:
+            self.stats["limited"] += 1
+            arguments = {**arguments, "query": limited_query}
+
+        content, artifact = await call_next(**arguments)
+        text = result_text(content)
+        received = len(text.encode("utf-8"))
+        self.stats["queries"] += 1
+        self.stats["bytes_received"] += received
+
+        columns, rows = parse_result(text)
+        if is_error_result(text) or len(rows) <= self.page_rows:
+            self.stats["bytes_to_model"] += received
+            logger.info(f"{tool_name} transferred {received} bytes ({len(rows)} rows)")
+            return content, artifact
+
+        truncated = len(rows) > self.max_rows
+        if truncated:
+            self.stats["truncated"] += 1
+            rows = rows[:self.max_rows]
+        ordered = bool(_ORDER_RE.search(normalize_sql(query)))
+        from frames import ResultFrame
+        frame = ResultFrame.from_rows(columns, rows, query=query)
+        spilled = self._spill(columns, rows)
+        summary = self._summarize(spilled, frame, rows, ordered, truncated)
+        sent = len(summary.encode("utf-8"))
+        self.stats["bytes_to_model"] += sent
+        logger.info(
+            f"{tool_name} transferred {received} bytes ({len(rows)} rows); "
+            f"sent a {sent} byte summary, full result spilled as {spilled.result_id}"
+        )
+        artifact = {"result_id": spilled.result_id, "rows": len(rows), "columns": columns}
+        if self.frames is not None:
+            artifact["frame_id"] = self.frames.add(frame)
+        return summary, artifact
+
+    def _spill(self, columns: List[str], rows: List[List[str]]) -> SpilledResult:
+        result_id = uuid.uuid4().hex[:12]
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="agent_results_")
+        directory = self.spill_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{result_id}.csv")
+        header = ",".join(columns)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header + "\n")
+            for row in rows:
+                f.write(",".join(row) + "\n")
+        spilled = SpilledResult(result_id, path, header, len(rows), len(columns), time.time())
+        self._spilled[result_id] = spilled
+        self.stats["spilled"] += 1
+        while len(self._spilled) > self.max_spilled:
+            _, oldest = self._spilled.popitem(last=False)
+            self._remove(oldest)
+        return spilled
+
+    def _summarize(self, spilled: SpilledResult, frame: "ResultFrame", rows, ordered: bool, truncated: bool) -> str:
+        total_pages = (spilled.rows + self.page_rows - 1) // self.page_rows
+        if ordered:
+            shown = rows[:self.page_rows]
+            shown_label = f"rows 1-{len(shown)} (page 1 of {total_pages})"
+        else:
+            step = len(rows) / self.page_rows
+            shown = [rows[int(i * step)] for i in range(self.page_rows)]
+            shown_label = f"an evenly spaced sample of {len(shown)} rows"
+        lines = [
+            f"{RESULT_MARKER}{spilled.result_id}: {spilled.rows} rows x {spilled.columns} columns; "
+            f"showing {shown_label}. Use {PAGE_TOOL_NAME} with result_id \"{spilled.result_id}\" "
+            f"and a page number (1-{total_pages}, {self.page_rows} rows each) for more, "
+            "or refine the query with aggregation or filters.]",
+        ]
+        if truncated:
+            lines.append(
+                f"[The query returned more than {self.max_rows} rows and was cut off; "
+                "counts and statistics cover the first rows only.]"
+            )
+        lines.append("Column summary:")
+        lines.extend(frame.summary_lines())
+        lines.append(spilled.header)
+        lines.extend(",".join(row) for row in shown)
+        return "\n".join(lines)
+
+    def fetch_page(self, result_id: str, page: int = 1) -> str:
+        """Return one page of a spilled result in the usual text format."""
+        spilled = self._spilled.get(result_id)
+        if spilled is None or not os.path.exists(spilled.path):
+            return f"Error executing query: result {result_id} is no longer available; run the query again."
+        total_pages = max((spilled.rows + self.page_rows - 1) // self.page_rows, 1)
+        if page < 1 or page > total_pages:
+            return f"Error executing query: page {page} is out of range (1-{total_pages})."
+        self._spilled.move_to_end(result_id)
+        start = (page - 1) * self.page_rows
+        with open(spilled.path, encoding="utf-8") as f:
+            next(f)
+            lines = [line.rstrip("\n") for line in islice(f, start, start + self.page_rows)]
+        text = "\n".join([
+            f"{RESULT_MARKER}{result_id}: rows {start + 1}-{start + len(lines)} of {spilled.rows} "
+            f"(page {page} of {total_pages})]",
+            spilled.header,
+            *lines,
+        ])
+        self.stats["bytes_to_model"] += len(text.encode("utf-8"))
+        return text
+
+    def create_page_tool(self):
+        """Build the ``fetch_result_page`` tool over this governor's spilled results."""
+        from langchain_core.tools import StructuredTool
+
+        async def fetch_result_page(result_id: str, page: int = 1) -> ToolResult:
+            return self.fetch_page(result_id, page), None
+
+        return StructuredTool.from_function(
+            coroutine=fetch_result_page,
+            name=PAGE_TOOL_NAME,
+            description=(
+                "Fetch one page of a large SQL result that was summarized earlier. "
+                "Pass the result_id from the summary and a 1-based page number."
+            ),
+            response_format="content_and_artifact",
+        )
+
+    def _remove(self, spilled: SpilledResult) -> None:
+        try:
+            os.remove(spilled.path)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Delete every spilled result file."""
+        for spilled in self._spilled.values():
+            self._remove(spilled)
+        self._spilled.clear()
+
+
+def wrap_tools_with_governor(tools: List, governor: ResultGovernor, tool_names: List[str]) -> List:
+    """Return ``tools`` with the named SQL tools governed, plus the page tool."""
+    return wrap_sql_tools(tools, governor, tool_names) + [governor.create_page_tool()]
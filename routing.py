@@ -0,0 +1,205 @@
+"""
+Per-step model routing for the agent graph.
+
+Every step used to go to the same large model, so a one-number lookup
+paid the same latency as a multi-join analysis. ``ModelRouter`` classifies
+each agent step locally, from the question and the turn so far, and picks:
+
+- ``large``: analytical, multi-table, follow-up or long questions, steps
+  after a failed query, and turns that needed more than one round of tools
+- ``small``: writing the SQL for a simple question and phrasing its answer
+- ``template``: a simple question whose single query returned one row is
+  answered straight from the result, without an LLM call
+
+A step the small model got wrong (its SQL failed, or it needed another
+round of queries) escalates the rest of the turn to the large model.
+Calls, latency percentiles, tokens, answers and escalations are counted
+per route.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from config.logging import get_logger
+from memory import split_turns
+from plan_cache import is_follow_up, question_tokens
+from sql_tools import is_error_result, parse_result, result_text
+from tracing import percentile
+
+logger = get_logger('routing')
+
+ROUTES = ("small", "large", "template")
+
+# Questions that need reasoning beyond one lookup
+_ANALYTICAL_RE = re.compile(
+    r"\b(why|compare|comparison|versus|vs|correlat\w*|relationship|trend\w*|impact|driver\w*|explain\w*|"
+    r"predict\w*|recommend\w*|insight\w*|analy[sz]\w*|distribution|segment\w*|over time|join)\b"
+)
+_NOTE_RE = re.compile(r"^\[.*\]$")
+
+
+@dataclass
+class Route:
+    """Where one agent step goes, and why."""
+    name: str
+    reason: str
+    # Templated answer for the ``template`` route
+    answer: Optional[str] = None
+
+
+def classify_question(question: str, has_history: bool = False, max_simple_words: int = 12) -> Optional[str]:
+    """
+    Return why ``question`` needs the large model, or None for a simple question.
+
+    Args:
+        question: The user's question.
+        has_history: Whether the thread has earlier turns the question may refer to.
+        max_simple_words: Longest question, in significant words, treated as simple.
+    """
+    text = question.lower()
+    if has_history and is_follow_up(question):
+        return "follow-up"
+    if _ANALYTICAL_RE.search(text):
+        return "analytical"
+    if "client" in text and "price" in text:
+        return "multi-table"
+    if len(question_tokens(question)) > max_simple_words:
+        return "long question"
+    return None
+
+
+def _format_value(value: str) -> str:
+    if value in ("None", ""):
+        return "NULL"
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if re.fullmatch(r"-?\d+", value):
+        return f"{int(value):,}"
+    return f"{number:,.2f}" if abs(number) >= 1000 else f"{number:.4g}"
+
+
+def template_answer(query: str, text: str, max_columns: int = 4) -> Optional[str]:
+    """
+    Phrase a one-row SQL result as the answer, or None when it needs an LLM.
+
+    The answer states each value, shows the row as a table and the SQL that
+    produced it, followed by any notes the result carried (e.g. rollup freshness).
+    """
+    if is_error_result(text):
+        return None
+    lines = text.splitlines()
+    notes = []
+    while lines and _NOTE_RE.match(lines[-1]):
+        notes.insert(0, lines.pop())
+    columns, rows = parse_result("\n".join(lines))
+    if not columns or len(rows) != 1 or len(columns) > max_columns or len(rows[0]) != len(columns):
+        return None
+    values = [_format_value(value) for value in rows[0]]
+    stated = ", ".join(f"{column} is {value}" for column, value in zip(columns, values))
+    parts = [
+        f"The result: {stated}.",
+        "| " + " | ".join(columns) + " |\n|" + "---|" * len(columns) + "\n| " + " | ".join(values) + " |",
+        f"Query: `{' '.join(query.split())}`",
+        *notes,
+    ]
+    return "\n\n".join(parts)
+
+
+class ModelRouter:
+    """Sends each agent step to the small model, the large model or a templated answer."""
+
+    def __init__(
+            self,
+            small_llm,
+            templates: bool = True,
+            max_simple_words: int = 12,
+            latency_samples: int = 1000
+    ):
+        self.small_llm = small_llm
+        self.templates = templates
+        self.max_simple_words = max_simple_words
+        self.stats: Dict[str, dict] = {
+            route: {"calls": 0, "answers": 0, "seconds": 0.0, "tokens_in": 0, "tokens_out": 0}
+            for route in ROUTES
+        }
+        # Quality: small-model SQL that failed, and steps escalated to the large model
+        self.stats["quality"] = {"small_tool_errors": 0, "escalations": 0}
+        self._latencies = {route: deque(maxlen=latency_samples) for route in ROUTES}
+
+    @classmethod
+    def from_config(cls, config, small_llm) -> "ModelRouter":
+        """Create a router from an ``AgentConfig`` instance and the small model bound to the tools."""
+        return cls(
+            small_llm,
+            templates=config.routing_templates,
+            max_simple_words=config.routing_max_simple_words,
+        )
+
+    def route(self, messages: List[BaseMessage]) -> Route:
+        """Pick the route for the next agent step of the thread's latest turn."""
+        turns = split_turns(messages)
+        if not turns or not isinstance(turns[-1][0], HumanMessage):
+            return Route("large", "no question")
+        turn = turns[-1]
+        question = result_text(turn[0].content)
+        steps = [m for m in turn[1:] if isinstance(m, AIMessage) and m.tool_calls]
+        results = [m for m in turn[1:] if isinstance(m, ToolMessage)]
+        # Only the step right after a small-model step counts as its escalation
+        after_small = bool(steps) and steps[-1].response_metadata.get("route") == "small"
+
+        if results and any(is_error_result(result_text(m.content)) for m in results):
+            if after_small:
+                self._escalate("query failed", small_tool_error=True)
+            return Route("large", "query failed")
+        reason = classify_question(question, has_history=len(turns) > 1, max_simple_words=self.max_simple_words)
+        if reason is not None:
+            return Route("large", reason)
+        if not steps:
+            return Route("small", "simple question")
+        if len(steps) > 1:
+            if after_small:
+                self._escalate("multi-step")
+            return Route("large", "multi-step")
+        if self.templates and len(results) == 1 and len(steps[0].tool_calls) == 1:
+            query = steps[0].tool_calls[0].get("args", {}).get("query", "")
+            answer = template_answer(query, result_text(results[0].content)) if query else None
+            if answer is not None:
+                return Route("template", "one-row result", answer)
+        return Route("small", "final answer")
+
+    def _escalate(self, reason: str, small_tool_error: bool = False) -> None:
+        logger.info(f"Escalating to the large model after a small-model step: {reason}")
+        self.stats["quality"]["escalations"] += 1
+        if small_tool_error:
+            self.stats["quality"]["small_tool_errors"] += 1
+
+    def record(self, route: Route, seconds: float, response: BaseMessage) -> None:
+        """Count one step on ``route`` and tag ``response`` with it for later steps."""
+        stats = self.stats[route.name]
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        self._latencies[route.name].append(seconds)
+        usage = getattr(response, "usage_metadata", None) or {}
+        stats["tokens_in"] += usage.get("input_tokens", 0)
+        stats["tokens_out"] += usage.get("output_tokens", 0)
+        if not getattr(response, "tool_calls", None):
+            stats["answers"] += 1
+        response.response_metadata["route"] = route.name
+
+    def summary(self) -> Dict[str, dict]:
+        """Per-route counters with p50/p95 latency in milliseconds over the recent steps."""
+        summary = {}
+        for route in ROUTES:
+            samples = list(self._latencies[route])
+            summary[route] = dict(self.stats[route], seconds=round(self.stats[route]["seconds"], 3))
+            if samples:
+                summary[route]["p50_ms"] = round(percentile(samples, 0.50) * 1000, 1)
+                summary[route]["p95_ms"] = round(percentile(samples, 0.95) * 1000, 1)
+        summary["quality"] = dict(self.stats["quality"])
+        return summary
@@ -0,0 +1,302 @@
+"""
+Cached schema and table statistics for the system prompt.
+
+The static prompt describes what each column means but not its type,
+range, cardinality or common values, so the model used to spend one or
+two exploratory tool calls per question finding out. ``SchemaCatalog``
+collects that once through ``execute_sql``:
+
+- ``information_schema.COLUMNS`` for column types
+- per-table row counts, distinct counts, null ratios and min/max
+- the most frequent values of low-cardinality columns
+
+and renders it as a compact block appended to the system prompt. The
+catalog is persisted to disk and refreshed incrementally: only tables whose
+``information_schema.TABLES`` signature changed are re-scanned.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.logging import get_logger
+from sql_cache import VERSION_PROBE_QUERY
+from sql_tools import is_error_result, parse_result
+
+logger = get_logger('schema_catalog')
+
+COLUMNS_QUERY = (
+    "SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+    "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION"
+)
+
+# Types whose MIN/MAX is informative; text columns only get distinct counts and top values
+RANGE_TYPES = {
+    "tinyint", "smallint", "mediumint", "int", "integer", "bigint", "decimal", "numeric",
+    "float", "double", "real", "date", "datetime", "timestamp", "time", "year",
+}
+
+RunSQL = Callable[[str], Awaitable[str]]
+
+
+@dataclass
+class ColumnStats:
+    name: str
+    data_type: str
+    distinct: Optional[int] = None
+    null_ratio: Optional[float] = None
+    minimum: Optional[str] = None
+    maximum: Optional[str] = None
+    top_values: List[List] = field(default_factory=list)
+
+
+@dataclass
+class TableStats:
+    name: str
+    version: str
+    rows: Optional[int] = None
+    columns: List[ColumnStats] = field(default_factory=list)
+    refreshed_at: float = 0.0
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _shorten(value: str, limit: int = 40) -> str:
+    return value if len(value) <= limit else value[:limit - 3] + "..."
+
+
+class SchemaCatalog:
+    """Introspected schema plus column statistics, rendered for the system prompt."""
+
+    def __init__(
+            self,
+            run_sql: RunSQL,
+            cache_path: Optional[str] = None,
+            refresh_interval: float = 300.0,
+            top_values: int = 5,
+            max_distinct_for_top: int = 50,
+            prompt_chars: int = 4000
+    ):
+        self.run_sql = run_sql
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.top_values = top_values
+        self.max_distinct_for_top = max_distinct_for_top
+        self.prompt_chars = prompt_chars
+        self.tables: Dict[str, TableStats] = {}
+        self.stats = {"refreshes": 0, "tables_scanned": 0, "queries": 0}
+        self._rendered: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, run_sql: RunSQL, config) -> "SchemaCatalog":
+        """Create a catalog from an ``AgentConfig`` instance."""
+        return cls(
+            run_sql,
+            cache_path=config.schema_cache_path,
+            refresh_interval=config.schema_refresh_interval,
+            top_values=config.schema_top_values,
+            max_distinct_for_top=config.schema_max_distinct_for_top,
+            prompt_chars=config.schema_prompt_chars,
+        )
+
+    async def _query(self, query: str):
+        self.stats["queries"] += 1
+        text = await self.run_sql(query)
+        if is_error_result(text):
+            raise RuntimeError(text)
+        return parse_result(text)
+
+    def load(self) -> None:
+        """Load the persisted catalog, if any."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.tables = {
+                name: TableStats(
+                    name=table["name"], version=table["version"], rows=table["rows"],
+                    refreshed_at=table["refreshed_at"],
+                    columns=[ColumnStats(**column) for column in table["columns"]],
+                )
+                for name, table in data.items()
+            }
+            self._rendered = None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable schema cache {self.cache_path}: {e}")
+
+    def save(self) -> None:
+        """Persist the catalog so restarts only re-scan changed tables."""
+        if not self.cache_path:
+            return
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({name: asdict(table) for name, table in self.tables.items()}, f)
+        except OSError as e:
+            logger.warning(f"Could not write schema cache {self.cache_path}: {e}")
+
+    async def refresh(self, force: bool = False) -> List[str]:
+        """
+        Re-scan tables whose change signature differs from the cached one.
+
+        Args:
+            force: Re-scan every table.
+
+        Returns:
+            The names of the tables that were scanned.
+        """
+        async with self._lock:
+            _, rows = await self._query(VERSION_PROBE_QUERY)
+            versions = {row[0]: ",".join(row[1:]) for row in rows if row}
+            stale = [
+                name for name, version in versions.items()
+                if force or name not in self.tables or self.tables[name].version != version
+            ]
+            removed = [name for name in self.tables if name not in versions]
+            for name in removed:
+                del self.tables[name]
+            self.stats["refreshes"] += 1
+            if not stale and not removed:
+                return []
+
+            _, column_rows = await self._query(COLUMNS_QUERY)
+            types: Dict[str, List[tuple]] = {}
+            for table, column, data_type in (row[:3] for row in column_rows if len(row) >= 3):
+                types.setdefault(table, []).append((column, data_type.lower()))
+
+            for name in stale:
+                started = time.perf_counter()
+                try:
+                    self.tables[name] = await self._scan_table(name, versions[name], types.get(name, []))
+                except Exception as e:
+                    logger.warning(f"Schema statistics for {name} failed: {e}")
+                    continue
+                self.stats["tables_scanned"] += 1
+                logger.info(f"Scanned statistics for {name} in {time.perf_counter() - started:.2f}s")
+
+            self._rendered = None
+            self.save()
+            return stale
+
+    async def _scan_table(self, name: str, version: str, columns: List[tuple]) -> TableStats:
+        table = TableStats(name=name, version=version, refreshed_at=time.time())
+        if not columns:
+            return table
+
+        # One pass over the table for every column's counts and ranges
+        selects = ["COUNT(*) AS row_count"]
+        for index, (column, data_type) in enumerate(columns):
+            quoted = _quote(column)
+            selects.append(f"COUNT(DISTINCT {quoted}) AS d{index}")
+            selects.append(f"SUM({quoted} IS NULL) AS n{index}")
+            if data_type in RANGE_TYPES:
+                selects.append(f"MIN({quoted}) AS lo{index}")
+                selects.append(f"MAX({quoted}) AS hi{index}")
+        header, rows = await self._query(f"SELECT {', '.join(selects)} FROM {_quote(name)}")
+        values = dict(zip(header, rows[0])) if rows else {}
+        table.rows = _to_int(values.get("row_count"))
+
+        for index, (column, data_type) in enumerate(columns):
+            stats = ColumnStats(name=column, data_type=data_type)
+            stats.distinct = _to_int(values.get(f"d{index}"))
+            nulls = _to_int(values.get(f"n{index}"))
+            if table.rows and nulls is not None:
+                stats.null_ratio = round(nulls / table.rows, 4)
+            if data_type in RANGE_TYPES:
+                stats.minimum = values.get(f"lo{index}")
+                stats.maximum = values.get(f"hi{index}")
+            if self.top_values and stats.distinct is not None and 0 < stats.distinct <= self.max_distinct_for_top:
+                quoted = _quote(column)
+                # The value goes last so commas inside it fold into one column
+                _, top = await self._query(
+                    f"SELECT COUNT(*) AS n, {quoted} FROM {_quote(name)} "
+                    f"GROUP BY {quoted} ORDER BY n DESC LIMIT {int(self.top_values)}"
+                )
+                stats.top_values = [[row[1], _to_int(row[0])] for row in top if len(row) == 2]
+            table.columns.append(stats)
+        return table
+
+    def render(self) -> str:
+        """Render the catalog as a compact prompt block (cached until the next refresh)."""
+        if self._rendered is not None:
+            return self._rendered
+        if not self.tables:
+            self._rendered = ""
+            return self._rendered
+
+        lines = [
+            "# Live Schema and Statistics",
+            "Column types, row counts, ranges and most frequent values, collected from the database.",
+        ]
+        for table in sorted(self.tables.values(), key=lambda t: t.name):
+            rows = f"{table.rows} rows" if table.rows is not None else "row count unknown"
+            lines.append(f"\n{table.name} ({rows})")
+            for column in table.columns:
+                parts = [column.data_type]
+                if column.distinct is not None:
+                    parts.append(f"{column.distinct} distinct")
+                if column.null_ratio:
+                    parts.append(f"{column.null_ratio:.1%} null")
+                if column.minimum not in (None, "None") or column.maximum not in (None, "None"):
+                    parts.append(f"range {column.minimum}..{column.maximum}")
+                if column.top_values:
+                    top = ", ".join(f"{_shorten(str(value))} ({count})" for value, count in column.top_values)
+                    parts.append(f"top: {top}")
+                lines.append(f"- {column.name}: " + "; ".join(parts))
+
+        text = "\n".join(lines)
+        if len(text) > self.prompt_chars:
+            text = text[:self.prompt_chars].rsplit("\n", 1)[0] + "\n- ..."
+        self._rendered = text
+        return text
+
+    async def start(self) -> None:
+        """Load the persisted catalog, refresh changed tables and start periodic refreshes."""
+        self.load()
+        try:
+            scanned = await self.refresh()
+            logger.info(
+                f"Schema catalog ready: {len(self.tables)} tables, "
+                f"{len(scanned)} re-scanned, {len(self.render())} prompt chars"
+            )
+        except Exception as e:
+            logger.warning(f"Schema introspection failed, using cached catalog: {e}")
+        if self.refresh_interval and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                scanned = await self.refresh()
+                if scanned:
+                    logger.info(f"Schema catalog refreshed tables: {scanned}")
+            except Exception as e:
+                logger.warning(f"Schema refresh failed: {e}")
+
+    async def close(self) -> None:
+        """Stop periodic refreshes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
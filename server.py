@@ -0,0 +1,315 @@
+"""
+Multi-session JSON-lines front end for the agent.
+
+One process compiles the graph once, keeps one MCP client and serves many
+concurrent conversations, either over TCP or over stdin/stdout. Each line
+is a JSON request:
+
+    {"id": "q1", "thread_id": "analyst-7", "question": "Churn rate by channel_sales?"}
+
+and each answer is written back as one JSON line carrying the same ``id``
+and ``thread_id``. With ``"stream": true`` the server first writes one line
+per token or tool event (``{"type": "token", ...}``) and then the final
+answer. Requests without a ``thread_id`` use one conversation per
+connection. At most ``max_concurrency`` graph runs execute at once, up to
+``max_pending`` more wait for a slot, and anything beyond that is rejected
+immediately with a ``busy`` error so clients can back off.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from contextlib import aclosing
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.agent import agent_config
+from config.logging import setup_logging, get_logger
+from main import invoke_graph_result, load_agent_runtime, stream_graph_response, tool_usage_stats
+
+logger = get_logger('server')
+
+
+class ServerBusyError(Exception):
+    """Raised when the admission queue is full."""
+
+
+class AgentRunError(Exception):
+    """Raised when the graph run for a request fails."""
+
+
+class AgentServer:
+    """Admission control and per-conversation ordering around one compiled graph."""
+
+    def __init__(self, graph, max_concurrency: int = 16, max_pending: int = 64, memory=None):
+        self.graph = graph
+        self.memory = memory
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.stats = {"completed": 0, "rejected": 0, "failed": 0, "cancelled": 0}
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._admitted = 0
+        # thread_id -> [lock, number of requests holding or waiting on it]
+        self._thread_locks: Dict[str, list] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._admitted
+
+    async def submit(
+            self,
+            question: str,
+            thread_id: str,
+            on_event: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> str:
+        """
+        Run one question for a conversation.
+
+        Requests for the same thread_id run in arrival order so checkpoints
+        are never written concurrently; different threads run in parallel.
+        When ``on_event`` is given the graph is streamed and every event
+        from ``stream_graph_response`` is passed to it as it arrives.
+
+        Raises:
+            ServerBusyError: If the running and waiting requests are at capacity.
+            AgentRunError: If the graph run fails or misses the request deadline.
+        """
+        if self._admitted >= self.max_concurrency + self.max_pending:
+            self.stats["rejected"] += 1
+            raise ServerBusyError(
+                f"Server busy: {self._admitted} requests in flight, retry later"
+            )
+
+        from langchain_core.messages import HumanMessage
+        from agent import AgentState
+
+        self._admitted += 1
+        entry = self._thread_locks.setdefault(thread_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._slots:
+                    state = AgentState(messages=[HumanMessage(content=question)])
+                    graph_config = {"configurable": {"thread_id": thread_id}}
+                    if on_event is None:
+                        result = await invoke_graph_result(
+                            input=state, graph=self.graph, config=graph_config
+                        )
+                        if result.error is not None:
+                            raise AgentRunError(result.answer)
+                        response = result.answer
+                    else:
+                        response = ""
+                        # Closing the stream promptly cancels the graph run if on_event fails
+                        async with aclosing(stream_graph_response(
+                                input=state, graph=self.graph, config=graph_config
+                        )) as events:
+                            async for event in events:
+                                if event["type"] == "error":
+                                    raise AgentRunError(event["content"])
+                                if event["type"] == "final":
+                                    response = event["content"]
+                                else:
+                                    await on_event(event)
+            self.stats["completed"] += 1
+            return response
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._admitted -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._thread_locks.pop(thread_id, None)
+
+    async def handle_request(
+            self,
+            payload: dict,
+            default_thread_id: str,
+            send: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> dict:
+        """
+        Turn one decoded request into a response payload.
+
+        Requests with ``"stream": true`` have their progress events passed to
+        ``send`` (tagged with the request id) before the final payload.
+        """
+        request_id = payload.get("id")
+        if payload.get("type") == "ping":
+            return {"id": request_id, "type": "pong", "in_flight": self.in_flight}
+
+        question = payload.get("question")
+        thread_id = str(payload.get("thread_id") or default_thread_id)
+        if payload.get("type") == "memory":
+            usage = self.memory.usage(thread_id) if self.memory is not None else {}
+            return {"id": request_id, "thread_id": thread_id, "type": "memory", "usage": usage}
+        if not isinstance(question, str) or not question.strip():
+            return {"id": request_id, "thread_id": thread_id, "error": "Missing 'question'"}
+
+        on_event = None
+        if payload.get("stream") and send is not None:
+            async def forward_event(event: dict):
+                await send({"id": request_id, "thread_id": thread_id, **event})
+            on_event = forward_event
+
+        logger.info(f"[{thread_id}] User query: {question}")
+        try:
+            response = await self.submit(question, thread_id, on_event=on_event)
+        except ServerBusyError as e:
+            logger.warning(str(e))
+            return {"id": request_id, "thread_id": thread_id, "error": "busy", "detail": str(e)}
+        except Exception as e:
+            logger.error(f"[{thread_id}] Request failed: {e}")
+            return {"id": request_id, "thread_id": thread_id, "error": str(e)}
+        logger.info(f"[{thread_id}] Agent response: {response}")
+        return {"id": request_id, "thread_id": thread_id, "response": response}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve JSON-lines requests from one connection until EOF."""
+        default_thread_id = uuid.uuid4().hex
+        write_lock = asyncio.Lock()
+        tasks: List[asyncio.Task] = []
+        disconnected = False
+
+        async def respond(payload: dict):
+            nonlocal disconnected
+            async with write_lock:
+                try:
+                    writer.write((json.dumps(payload, default=str) + "\n").encode("utf-8"))
+                    # drain() blocks while the client is not reading, pushing back on us
+                    await writer.drain()
+                except (ConnectionResetError, BrokenPipeError):
+                    if not disconnected:
+                        # Nobody is left to read the answers; stop the LLM and tool calls behind them
+                        disconnected = True
+                        current = asyncio.current_task()
+                        pending = [task for task in tasks if task is not current and not task.done()]
+                        logger.warning(f"Client disconnected; cancelling {len(pending)} in-flight requests")
+                        for task in pending:
+                            task.cancel()
+                    raise
+
+        async def process(line: bytes):
+            try:
+                payload = json.loads(line)
+                if not isinstance(payload, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                await respond({"error": f"Invalid request: {e}"})
+                return
+            await respond(await self.handle_request(payload, default_thread_id, send=respond))
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                tasks = [task for task in tasks if not task.done()]
+                tasks.append(asyncio.create_task(process(line)))
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionResetError, BrokenPipeError) as e:
+            logger.warning(f"Connection closed: {e}")
+        finally:
+            writer.close()
+
+
+async def open_stdio_streams():
+    """Wrap stdin/stdout in asyncio streams."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
+
+
+async def serve(
+        stdio: bool = False,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None
+):
+    """
+    Start the agent server.
+
+    Args:
+        stdio: Serve a single JSON-lines stream over stdin/stdout instead of TCP.
+        host: TCP host (default: AGENT_SERVER_HOST).
+        port: TCP port (default: AGENT_SERVER_PORT).
+        max_concurrency: Concurrent graph runs (default: AGENT_MAX_CONCURRENCY).
+        max_pending: Requests allowed to wait for a slot (default: AGENT_MAX_PENDING).
+    """
+    app_logger = setup_logging()
+    runtime = await load_agent_runtime(app_logger)
+    if runtime is None:
+        return
+
+    server = AgentServer(
+        runtime.agent,
+        max_concurrency=max_concurrency or agent_config.max_concurrency,
+        max_pending=agent_config.max_pending if max_pending is None else max_pending,
+        memory=runtime.memory,
+    )
+    logger.info(
+        f"Agent server ready (max_concurrency={server.max_concurrency}, max_pending={server.max_pending})"
+    )
+
+    try:
+        if stdio:
+            reader, writer = await open_stdio_streams()
+            await server.handle_connection(reader, writer)
+        else:
+            tcp_server = await asyncio.start_server(
+                server.handle_connection,
+                host or agent_config.server_host,
+                port or agent_config.server_port,
+            )
+            addresses = ", ".join(str(sock.getsockname()) for sock in tcp_server.sockets)
+            logger.info(f"Listening on {addresses}")
+            async with tcp_server:
+                await tcp_server.serve_forever()
+    finally:
+        logger.info(f"Agent server stopped. Stats: {server.stats}")
+        logger.info(f"Tool usage per answer: {tool_usage_stats}")
+        if runtime.sql_cache is not None:
+            logger.info(f"SQL result cache stats: {runtime.sql_cache.stats.as_dict()}")
+        logger.info(f"Prompt budget stats: {runtime.prompt_assembler.stats}")
+        if runtime.model_router is not None:
+            logger.info(f"Routing stats: {runtime.model_router.summary()}")
+        if runtime.plan_cache is not None:
+            logger.info(f"Plan cache stats: {runtime.plan_cache.stats}")
+        if runtime.preagg is not None:
+            logger.info(f"Rollup stats: {runtime.preagg.stats}")
+        await runtime.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Crstl agent to many concurrent conversations.")
+    parser.add_argument("--stdio", action="store_true", help="serve JSON lines over stdin/stdout")
+    parser.add_argument("--host", help="TCP host to bind")
+    parser.add_argument("--port", type=int, help="TCP port to bind")
+    parser.add_argument("--max-concurrency", type=int, help="concurrent graph runs")
+    parser.add_argument("--max-pending", type=int, help="requests allowed to wait for a slot")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(serve(
+            stdio=args.stdio,
+            host=args.host,
+            port=args.port,
+            max_concurrency=args.max_concurrency,
+            max_pending=args.max_pending,
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,202 @@
+"""
+Result cache placed in front of the MCP execute_sql tool.
+
+Read-only, deterministic queries are keyed by their normalized SQL text so
+repeated dashboard-style questions are answered without a stdio hop to the
+MCP server or a round trip to MySQL. Entries are evicted by size (LRU) and
+age (TTL), and are invalidated whenever a table they read from changes.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from config.logging import get_logger
+from sql_tools import (
+    CallNext, ToolResult, is_deterministic, is_error_result,
+    is_read_query, is_write_query, normalize_sql, parse_result,
+    referenced_tables, result_text, wrap_sql_tools,
+)
+
+logger = get_logger('sql_cache')
+
+# Per-table change signature used to detect writes made outside the agent
+VERSION_PROBE_QUERY = (
+    "SELECT TABLE_NAME, UPDATE_TIME, TABLE_ROWS FROM information_schema.TABLES "
+    "WHERE TABLE_SCHEMA = DATABASE()"
+)
+
+
+@dataclass
+class CacheEntry:
+    result: ToolResult
+    tables: List[str]
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class SQLResultCache:
+    """Size-bounded LRU/TTL cache of execute_sql results keyed by normalized SQL."""
+
+    def __init__(
+            self,
+            max_entries: int = 256,
+            ttl: float = 900.0,
+            version_check_interval: float = 60.0
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._table_versions: Dict[str, str] = {}
+        self._last_version_check: Optional[float] = None
+        self._version_lock = asyncio.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "SQLResultCache":
+        """Create a cache from an ``AgentConfig`` instance."""
+        return cls(
+            max_entries=config.cache_max_entries,
+            ttl=config.cache_ttl,
+            version_check_interval=config.cache_version_check_interval,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[ToolResult]:
+        """Return a cached result and refresh its LRU position, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.stats.hits += 1
+        return entry.result
+
+    def put(self, key: str, result: ToolResult, tables: List[str]) -> None:
+        """Store a result, evicting the least recently used entries when full."""
+        self._entries[key] = CacheEntry(result=result, tables=tables, created_at=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate_tables(self, tables: List[str]) -> int:
+        """Drop every entry that reads from one of ``tables``. Returns the number dropped."""
+        changed = set(tables)
+        stale = [key for key, entry in self._entries.items() if changed & set(entry.tables)]
+        for key in stale:
+            del self._entries[key]
+        self.stats.invalidations += len(stale)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached results for tables {sorted(changed)}")
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def _version_check_due(self) -> bool:
+        if self._last_version_check is None:
+            return True
+        return time.monotonic() - self._last_version_check >= self.version_check_interval
+
+    async def check_versions(self, call_next: CallNext) -> None:
+        """
+        Compare table change signatures against the last probe and invalidate
+        entries for tables that changed. Runs at most once per check interval.
+        """
+        if not self.version_check_interval:
+            return
+        if not self._version_check_due():
+            return
+        async with self._version_lock:
+            if not self._version_check_due():
+                return
+            self._last_version_check = time.monotonic()
+            try:
+                content, _ = await call_next(query=VERSION_PROBE_QUERY)
+            except Exception as e:
+                logger.warning(f"Cache version probe failed: {e}")
+                return
+            _, rows = parse_result(result_text(content))
+            versions = {row[0].lower(): ",".join(row[1:]) for row in rows if row}
+            changed = [
+                table for table, version in versions.items()
+                if table in self._table_versions and self._table_versions[table] != version
+            ]
+            self._table_versions = versions
+            if changed:
+                self.invalidate_tables(changed)
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``."""
+        query = arguments.get("query", "")
+
+        if is_write_query(query):
+            result = await call_next(**arguments)
+            tables = referenced_tables(query)
+            if tables:
+                self.invalidate_tables(tables)
+            else:
+                self.clear()
+            return result
+
+        if not (is_read_query(query) and is_deterministic(query)):
+            self.stats.bypassed += 1
+            return await call_next(**arguments)
+
+        await self.check_versions(call_next)
+
+        key = f"{tool_name}:{normalize_sql(query)}"
+        cached = self.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit for query: {query}")
+            return cached
+
+        result = await call_next(**arguments)
+        if not is_error_result(result_text(result[0])):
+            self.put(key, result, referenced_tables(query))
+        return result
+
+
+def wrap_tools_with_cache(tools: List, cache: SQLResultCache) -> List:
+    """Return ``tools`` with the execute_sql tool served through ``cache``."""
+    return wrap_sql_tools(tools, cache)
@@ -0,0 +1,177 @@
+"""
+Helpers shared by the layers that sit in front of the MCP execute_sql tool.
+
+The MCP adapters return LangChain ``StructuredTool`` objects whose coroutine
+yields a ``(content, artifact)`` tuple. ``wrap_tool`` rebuilds such a tool
+around a middleware so caching, governance and similar concerns can be
+stacked without touching the MCP client itself.
+"""
+
+import re
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+# Name of the SQL tool exposed by mysql_mcp_server
+SQL_TOOL_NAME = "execute_sql"
+
+ToolResult = Tuple[Any, Any]
+CallNext = Callable[..., Awaitable[ToolResult]]
+Middleware = Callable[[str, dict, CallNext], Awaitable[ToolResult]]
+
+READ_KEYWORDS = {"SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"}
+WRITE_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "ALTER", "DROP",
+    "TRUNCATE", "CREATE", "RENAME", "LOAD",
+}
+# Functions whose result changes between two identical executions
+NON_DETERMINISTIC = re.compile(
+    r"\b(NOW|RAND|UUID|SYSDATE|CURDATE|CURTIME|CURRENT_DATE|CURRENT_TIME|"
+    r"CURRENT_TIMESTAMP|UNIX_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|CONNECTION_ID)\b",
+    re.IGNORECASE,
+)
+
+_QUOTED = r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`"
+# Quoted literals are matched first, so comment markers inside them are kept
+_COMMENT_RE = re.compile(rf"({_QUOTED})|--[^\n]*|#[^\n]*|/\*.*?\*/", re.DOTALL)
+_TOKEN_RE = re.compile(rf"{_QUOTED}|[^'\"`]+")
+_TABLE_RE = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE|DESCRIBE|DESC)\s+((?:`[^`]+`|[\w$]+)(?:\.(?:`[^`]+`|[\w$]+))?)",
+    re.IGNORECASE,
+)
+
+
+def strip_comments(query: str) -> str:
+    """Replace ``#``, ``--`` and ``/* */`` comments outside quoted literals with a space."""
+    return _COMMENT_RE.sub(lambda match: match.group(1) or " ", query or "")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize SQL text so that trivially different spellings share one key.
+
+    Comments are stripped, whitespace is collapsed, trailing semicolons are
+    removed and everything outside quoted literals is lower-cased.
+    """
+    text = strip_comments(query)
+    parts = []
+    for token in _TOKEN_RE.findall(text):
+        if token[0] in "'\"`":
+            parts.append(token)
+        else:
+            token = re.sub(r"\s+", " ", token.lower())
+            token = re.sub(r"\s*([(),=<>+*/-])\s*", r"\1", token)
+            parts.append(token)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def first_keyword(query: str) -> str:
+    """Return the leading SQL keyword in upper case."""
+    match = re.match(r"\s*\(?\s*([A-Za-z]+)", strip_comments(query))
+    return match.group(1).upper() if match else ""
+
+
+def is_read_query(query: str) -> bool:
+    """Check whether the query only reads data."""
+    keyword = first_keyword(query)
+    if keyword == "WITH":
+        words = set(re.findall(r"\w+", strip_comments(query).upper()))
+        return not words & WRITE_KEYWORDS
+    return keyword in READ_KEYWORDS
+
+
+def is_write_query(query: str) -> bool:
+    """Check whether the query may modify data or schema."""
+    return first_keyword(query) in WRITE_KEYWORDS
+
+
+def is_deterministic(query: str) -> bool:
+    """Check whether repeated executions of the query return the same rows."""
+    return NON_DETERMINISTIC.search(query or "") is None
+
+
+def referenced_tables(query: str) -> List[str]:
+    """Return the lower-cased table names referenced by the query."""
+    tables = []
+    for match in _TABLE_RE.finditer(strip_comments(query)):
+        name = match.group(1).split(".")[-1].strip("`").lower()
+        if name and name not in tables and name not in {"select", "information_schema"}:
+            tables.append(name)
+    return tables
+
+
+def result_text(content: Any) -> str:
+    """Flatten MCP tool content (string or list of strings/blocks) into text."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, dict):
+                parts.append(str(item.get("text", "")))
+            else:
+                parts.append(str(getattr(item, "text", item)))
+        return "\n".join(parts)
+    return str(content)
+
+
+def is_error_result(text: str) -> bool:
+    """Check whether mysql_mcp_server reported a failed query."""
+    return text.startswith("Error executing query") or text.startswith("Query executed but error")
+
+
+def parse_result(text: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Split mysql_mcp_server result text into a header and rows.
+
+    The server joins values with commas without quoting, so values that
+    contain commas are folded back into the last column.
+    """
+    lines = [line for line in text.splitlines() if line != ""]
+    if not lines or is_error_result(text) or text.startswith("Query executed successfully"):
+        return [], []
+    columns = lines[0].split(",")
+    rows = []
+    for line in lines[1:]:
+        values = line.split(",", len(columns) - 1) if columns else [line]
+        rows.append(values)
+    return columns, rows
+
+
+def wrap_tool(tool, middleware: Middleware):
+    """
+    Rebuild a LangChain tool so every call is routed through a middleware.
+
+    Args:
+        tool: A tool returned by ``MultiServerMCPClient.get_tools``.
+        middleware: Awaitable called as ``middleware(tool_name, arguments, call_next)``
+            where ``call_next(**arguments)`` runs the wrapped tool.
+
+    Returns:
+        A new ``StructuredTool`` with the same name, description and schema.
+    """
+    from langchain_core.tools import StructuredTool
+
+    inner = tool.coroutine
+
+    async def call_tool(**arguments: Any) -> ToolResult:
+        return await middleware(tool.name, arguments, inner)
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        coroutine=call_tool,
+        response_format=tool.response_format,
+        metadata=tool.metadata,
+    )
+
+
+def wrap_sql_tools(
+        tools: Iterable, middleware: Middleware, tool_names: Optional[Iterable[str]] = None
+) -> List:
+    """Wrap the SQL tools in ``tools`` with ``middleware`` and return the new list."""
+    names = set(tool_names or [SQL_TOOL_NAME])
+    return [wrap_tool(tool, middleware) if tool.name in names else tool for tool in tools]
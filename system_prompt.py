@@ -83,9 +83,10 @@ Your responses MUST always include:
 - Handle potential SQL errors gracefully and suggest alternatives
 - Validate data quality and handle missing values appropriately
 - Use appropriate SQL functions (GROUP BY, JOIN, WHERE, ORDER BY) for complex analyses
+- When a question needs several independent queries (for example one on client_data and one on price_data), request them together in a single step so they run in parallel
 
 # Query Best Practices
-- Start with exploratory queries to understand data structure when needed
+- Check the Live Schema and Statistics section (when present) for types, ranges and common values before running exploratory queries
 - Use appropriate filtering and aggregation for meaningful results
 - Consider time-based analysis for consumption and pricing trends
 - Apply proper data validation and error handling
@@ -112,10 +113,38 @@ Your responses MUST always include:
 
 Remember: Your goal is to transform raw database queries into actionable business intelligence through clear explanations and well-structured data presentations. Always provide both the analytical narrative AND the supporting data in DataFrame format."""
 
+# Extra guidance for optional tools, added only when the tool is registered
+TOOL_GUIDELINES = {
+    "query_rollups": (
+        "- Prefer the query_rollups tool for aggregate questions (churn rates, margins, consumption or "
+        "prices by segment or date); it answers from pre-computed rollups instantly and sends other "
+        "queries to the database. When a result carries a rollup refresh note, mention how fresh the data is"
+    ),
+    "query_local_data": (
+        "- Prefer the query_local_data tool for single-table questions about client_data "
+        "(filters, GROUP BY, aggregates); it runs the same SQL in-process and much faster, "
+        "and sends anything it cannot answer to the database itself"
+    ),
+    "fetch_result_page": (
+        "- Large results come back as a summary with a result_id; its column statistics (mean, quartiles, "
+        "most frequent values, shares) are exact over all rows, so quote them instead of recomputing. "
+        "Use fetch_result_page only when the rows themselves are needed, and prefer aggregating in SQL"
+    ),
+}
+
 # For backwards compatibility and easy imports
-def get_system_prompt():
-    """Return the system prompt string."""
-    return SYSTEM_PROMPT
+def get_system_prompt(tool_names=None):
+    """
+    Return the system prompt string.
+
+    Args:
+        tool_names: Names of the registered tools; guidance for optional tools
+            in ``TOOL_GUIDELINES`` is appended for those present.
+    """
+    guidelines = [TOOL_GUIDELINES[name] for name in tool_names or [] if name in TOOL_GUIDELINES]
+    if not guidelines:
+        return SYSTEM_PROMPT
+    return SYSTEM_PROMPT + "\n\n# Additional Tools\n" + "\n".join(guidelines)
 
 if __name__ == "__main__":
     print("System Prompt for Crstl AI Agent")
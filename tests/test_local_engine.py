@@ -0,0 +1,171 @@
+"""
+Differential tests of the local engine against SQLite over the shipped CSV.
+
+``fake_mcp_server.create_database`` loads ``Data/client_data.csv`` into
+SQLite with the same column types the benchmarks use. Each query runs on
+both; where MySQL's case-insensitive collation differs from SQLite's
+binary one, the SQLite reference spells it out with ``COLLATE NOCASE``.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from local_engine import ColumnarStore, LocalSQLEngine, UnsupportedQuery, create_local_sql_tool
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(REPO_DIR, "Data", "client_data.csv")
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from fake_mcp_server import create_database  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    store = ColumnarStore(cache_dir=str(tmp_path_factory.mktemp("columnar")))
+    store.load_csv(CSV_PATH, name="client_data")
+    return LocalSQLEngine(store, version_check_interval=0)
+
+
+@pytest.fixture(scope="module")
+def sqlite():
+    conn = create_database([CSV_PATH])
+    yield conn
+    conn.close()
+
+
+def _normalize(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{float(value):.6g}"
+    return str(value)
+
+
+def _rows(rows, ordered):
+    rows = [tuple(_normalize(value) for value in row) for row in rows]
+    return rows if ordered else sorted(rows, key=repr)
+
+
+AGGREGATES = [
+    "SELECT COUNT(*), SUM(cons_12m), AVG(net_margin), MIN(net_margin), MAX(cons_gas_12m) FROM client_data",
+    "SELECT COUNT(DISTINCT origin_up) FROM client_data",
+    "SELECT has_gas, SUM(net_margin), COUNT(*) FROM client_data WHERE cons_12m > 10000 GROUP BY has_gas",
+    "SELECT num_years_antig, COUNT(*) AS clients FROM client_data GROUP BY num_years_antig "
+    "HAVING COUNT(*) > 100 ORDER BY clients DESC, num_years_antig",
+    "SELECT origin_up, MAX(net_margin) FROM client_data GROUP BY origin_up HAVING NOT (AVG(churn) > 0.1)",
+    "SELECT CASE WHEN churn = 1 THEN 'yes' ELSE 'no' END AS churned, COUNT(*) FROM client_data GROUP BY churned",
+    "SELECT COUNT(*) FROM client_data WHERE num_years_antig BETWEEN 3 AND 5 "
+    "AND origin_up IN ('lxidpiddsbxsbosboudacockeimpuepw', 'kamkkxfxxuwbdslkwifmmcsiusiuosws')",
+    "SELECT COUNT(*) FROM client_data WHERE date_activ >= '2015-01-01' AND channel_sales LIKE 'foo%'",
+    "SELECT id, net_margin FROM client_data ORDER BY net_margin DESC, id LIMIT 5",
+    "SELECT COUNT(*), SUM(net_margin), MAX(cons_12m) FROM client_data WHERE channel_sales = 'nonexistent'",
+]
+
+NULL_HANDLING = [
+    "SELECT COUNT(*) FROM client_data WHERE NOT (CASE WHEN churn = 1 THEN NULL ELSE cons_12m END > 1000)",
+    "SELECT COUNT(*) FROM client_data WHERE NOT (has_gas = 't' AND CASE WHEN churn = 1 THEN NULL ELSE 1 END = 1)",
+    "SELECT COUNT(*) FROM client_data WHERE NOT (CASE WHEN churn = 1 THEN NULL ELSE cons_12m END > 1000 "
+    "OR has_gas = 't')",
+    "SELECT COUNT(*) FROM client_data WHERE (CASE WHEN churn = 1 THEN NULL ELSE 1 END) IS NULL",
+    "SELECT COUNT(*) FROM client_data WHERE cons_12m NOT IN (0, NULL)",
+    "SELECT COUNT(CASE WHEN churn = 1 THEN net_margin END), "
+    "AVG(CASE WHEN churn = 1 THEN NULL ELSE net_margin END) FROM client_data",
+    "SELECT channel_sales, COUNT(*) FROM client_data GROUP BY channel_sales "
+    "HAVING NOT (MAX(CASE WHEN churn = 2 THEN net_margin END) > 0)",
+]
+
+# (local query, SQLite reference with MySQL's case-insensitive collation)
+COLLATION = [
+    ("SELECT COUNT(*) FROM client_data WHERE channel_sales = 'missing'",
+     "SELECT COUNT(*) FROM client_data WHERE channel_sales = 'missing' COLLATE NOCASE"),
+    ("SELECT COUNT(*) FROM client_data WHERE has_gas != 'T'",
+     "SELECT COUNT(*) FROM client_data WHERE has_gas != 'T' COLLATE NOCASE"),
+    ("SELECT COUNT(*) FROM client_data WHERE has_gas IN ('T', 'x')",
+     "SELECT COUNT(*) FROM client_data WHERE has_gas COLLATE NOCASE IN ('T', 'x')"),
+    ("SELECT COUNT(*) FROM client_data WHERE channel_sales < 'Lmkeb'",
+     "SELECT COUNT(*) FROM client_data WHERE channel_sales < 'Lmkeb' COLLATE NOCASE"),
+    ("SELECT DISTINCT channel_sales FROM client_data ORDER BY channel_sales",
+     "SELECT DISTINCT channel_sales FROM client_data ORDER BY channel_sales COLLATE NOCASE"),
+    ("SELECT MIN(channel_sales), MAX(channel_sales) FROM client_data",
+     "SELECT MIN(channel_sales COLLATE NOCASE), MAX(channel_sales COLLATE NOCASE) FROM client_data"),
+    ("SELECT has_gas, MIN(channel_sales) FROM client_data GROUP BY has_gas",
+     "SELECT has_gas, MIN(channel_sales COLLATE NOCASE) FROM client_data GROUP BY has_gas"),
+]
+
+
+def _check(engine, sqlite, query, reference=None):
+    _, local_rows = engine.execute(query)
+    expected = sqlite.execute(reference or query).fetchall()
+    ordered = "ORDER BY" in query.upper()
+    assert _rows(local_rows, ordered) == _rows(expected, ordered)
+
+
+@pytest.mark.parametrize("query", AGGREGATES)
+def test_aggregates_match_sqlite(engine, sqlite, query):
+    _check(engine, sqlite, query)
+
+
+@pytest.mark.parametrize("query", NULL_HANDLING)
+def test_null_handling_matches_sqlite(engine, sqlite, query):
+    _check(engine, sqlite, query)
+
+
+@pytest.mark.parametrize("query, reference", COLLATION)
+def test_text_collation_is_case_insensitive(engine, sqlite, query, reference):
+    _check(engine, sqlite, query, reference)
+
+
+class RecordingFallback:
+    name = "execute_sql"
+
+    def __init__(self):
+        self.queries = []
+
+    async def ainvoke(self, arguments):
+        self.queries.append(arguments["query"])
+        return "fallback\n1"
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT c.id FROM client_data c JOIN price_data p ON c.id = p.id LIMIT 1",
+    "SELECT COUNT(*) FROM client_data WHERE id IN (SELECT id FROM price_data)",
+    "SELECT COUNT(*) FROM price_data",
+])
+def test_unsupported_selects_fall_back(engine, query):
+    with pytest.raises(UnsupportedQuery):
+        engine.execute(query)
+    fallback = RecordingFallback()
+    tool = create_local_sql_tool(engine, fallback_tool=fallback)
+    content, _ = asyncio.run(tool.coroutine(query=query))
+    assert content == "fallback\n1" and fallback.queries == [query]
+
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM client_data",
+    "UPDATE client_data SET churn = 0",
+    "DROP TABLE client_data",
+    "WITH a AS (SELECT 1) DELETE FROM client_data",
+])
+def test_writes_are_rejected_not_forwarded(engine, query):
+    fallback = RecordingFallback()
+    tool = create_local_sql_tool(engine, fallback_tool=fallback)
+    content, _ = asyncio.run(tool.coroutine(query=query))
+    assert content.startswith("Error executing query") and fallback.queries == []
+
+
+def test_written_tables_fall_back_until_restart(tmp_path):
+    store = ColumnarStore(cache_dir=str(tmp_path))
+    store.load_csv(CSV_PATH, name="client_data")
+    engine = LocalSQLEngine(store, version_check_interval=0)
+    fallback = RecordingFallback()
+    tool = create_local_sql_tool(engine, fallback_tool=fallback)
+
+    async def call_next(**arguments):
+        return "", None
+
+    asyncio.run(engine("execute_sql", {"query": "UPDATE client_data SET churn = 0"}, call_next))
+    content, _ = asyncio.run(tool.coroutine(query="SELECT COUNT(*) FROM client_data"))
+    assert content == "fallback\n1" and engine.stale == {"client_data"}
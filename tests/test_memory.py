@@ -0,0 +1,12 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from memory import ConversationMemory
+
+
+def test_usage_is_kept_for_the_most_recent_threads_only():
+    memory = ConversationMemory(max_threads=3)
+    messages = [HumanMessage(content="How many clients?", id="h1"), AIMessage(content="14606", id="a1")]
+    for index in range(10):
+        memory.compact(messages, thread_id=f"thread-{index}")
+    memory.compact(messages, thread_id="thread-7")
+    assert list(memory.usage()) == ["thread-8", "thread-9", "thread-7"]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from plan_cache import PlanCache, exact_words, question_key
+
+COUNT_GAS = "SELECT COUNT(*) FROM client_data WHERE has_gas = 't'"
+
+
+def _cache(*questions):
+    cache = PlanCache()
+    cache._table_versions = {"client_data": "1"}
+    for question in questions:
+        cache.record(question, [["execute_sql", f"{COUNT_GAS} -- {question}"]], f"answer to {question}")
+    return cache
+
+
+def _lookup(cache, question):
+    return asyncio.run(cache.lookup(question))
+
+
+def test_same_question_reuses_the_answer():
+    cache = _cache("How many clients have gas?")
+    hit = _lookup(cache, "how many Clients have gas")
+    assert hit is not None and hit.answer == "answer to How many clients have gas?"
+
+
+def test_reordered_question_replays_the_plan_without_the_answer():
+    cache = _cache("How many clients have gas and churned?")
+    hit = _lookup(cache, "How many clients churned and have gas?")
+    assert hit is not None and hit.answer is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("How many clients have gas and churned?", "How many clients have gas or churned?"),
+    ("Clients activated before 2015 with gas", "Clients activated after 2015 with gas"),
+    ("How many clients with gas", "How many clients without gas"),
+    ("churned clients per channel", "non churned clients per channel"),
+    ("clients with net margin above 100", "clients with net margin below 100"),
+    ("channel with the highest churn", "channel with the lowest churn"),
+    ("clients with gas", "clients not with gas"),
+])
+def test_questions_differing_in_exact_words_never_match(cached, asked):
+    cache = _cache(cached)
+    assert _lookup(cache, asked) is None
+
+
+def test_conjunctions_keep_separate_entries():
+    cache = _cache("How many clients have gas and churned?", "How many clients have gas or churned?")
+    assert len(cache) == 2
+    assert _lookup(cache, "How many clients have gas or churned?").answer == "answer to How many clients have gas or churned?"
+
+
+def test_question_key_keeps_order_and_conjunctions():
+    assert question_key("Show the clients with gas") == "show client with gas"
+    assert question_key("gas and churn") != question_key("churn and gas")
+    assert question_key("gas and churn") != question_key("gas or churn")
+    assert exact_words("clients activated after 2015 and not churned") == {"after", "and", "not"}
+
+
+def test_writes_drop_plans_over_the_written_table():
+    cache = _cache("How many clients have gas?")
+
+    async def call_next(**arguments):
+        return "ok", None
+
+    asyncio.run(cache("execute_sql", {"query": "UPDATE client_data SET churn = 0"}, call_next))
+    assert len(cache) == 0
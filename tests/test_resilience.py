@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, LLMCallGuard, set_deadline
+
+
+class SlowLLM:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return "answer"
+
+
+def _invoke(guard, llm, deadline):
+    async def run():
+        set_deadline(deadline)
+        return await guard.invoke(llm, [])
+    return asyncio.run(run())
+
+
+def test_deadline_timeouts_are_not_retried_or_counted_as_failures():
+    guard = LLMCallGuard(timeout=5, breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(3):
+        llm = SlowLLM(1)
+        with pytest.raises(asyncio.TimeoutError):
+            _invoke(guard, llm, deadline=0.02)
+        assert llm.calls == 1
+    assert guard.breaker.state == "closed"
+    assert guard.stats["deadline_exceeded"] == 3 and guard.stats["failures"] == 0
+
+
+def test_call_timeouts_are_retried_and_open_the_breaker():
+    guard = LLMCallGuard(timeout=0.02, max_attempts=2, base_delay=0.01, breaker=CircuitBreaker(failure_threshold=2))
+    llm = SlowLLM(1)
+    with pytest.raises(asyncio.TimeoutError):
+        _invoke(guard, llm, deadline=10)
+    assert llm.calls == 2
+    assert guard.breaker.state == "open"
@@ -0,0 +1,86 @@
+"""
+Concurrency cap and per-query timeout for SQL tool calls.
+
+``ToolNode`` already runs the tool calls of one AI message concurrently and
+each call borrows its own pooled MCP session, so independent queries in one
+step take about as long as the slowest one. This middleware keeps that
+fan-out bounded and every query time-boxed:
+
+- at most ``max_parallel`` SQL calls are in flight across the process
+- each call is cancelled after ``timeout`` seconds, or when the request
+  deadline passes, and answered with an error result the model can react to
+- SELECTs carry a ``MAX_EXECUTION_TIME`` hint so MySQL stops the query too
+"""
+
+import asyncio
+import re
+import time
+from typing import List
+
+from config.logging import get_logger
+from resilience import bounded_timeout, wait_for
+from sql_tools import CallNext, ToolResult, first_keyword, wrap_sql_tools
+
+logger = get_logger('tool_limits')
+
+_SELECT_RE = re.compile(r"^(\s*)SELECT\b", re.IGNORECASE)
+
+
+def with_execution_time_hint(query: str, timeout: float) -> str:
+    """Add a MySQL ``MAX_EXECUTION_TIME`` optimizer hint to a SELECT statement."""
+    if first_keyword(query) != "SELECT" or "MAX_EXECUTION_TIME" in query.upper():
+        return query
+    milliseconds = max(int(timeout * 1000), 1)
+    return _SELECT_RE.sub(rf"\1SELECT /*+ MAX_EXECUTION_TIME({milliseconds}) */", query, count=1)
+
+
+class ToolCallLimiter:
+    """Middleware bounding concurrent SQL tool calls and their duration."""
+
+    def __init__(self, max_parallel: int = 4, timeout: float = 30.0):
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.stats = {"calls": 0, "timeouts": 0, "waited": 0, "max_in_flight": 0}
+        self._slots = asyncio.Semaphore(max_parallel)
+        self._in_flight = 0
+
+    @classmethod
+    def from_config(cls, config) -> "ToolCallLimiter":
+        """Create a limiter from an ``AgentConfig`` instance."""
+        return cls(max_parallel=config.tool_parallelism, timeout=config.tool_timeout)
+
+    async def __call__(self, tool_name: str, arguments: dict, call_next: CallNext) -> ToolResult:
+        """Middleware entry point used by ``sql_tools.wrap_tool``."""
+        query = arguments.get("query", "")
+        hint_timeout = bounded_timeout(self.timeout)
+        if hint_timeout and query:
+            arguments = {**arguments, "query": with_execution_time_hint(query, hint_timeout)}
+
+        self.stats["calls"] += 1
+        if self._slots.locked():
+            self.stats["waited"] += 1
+        async with self._slots:
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            started = time.perf_counter()
+            timeout = bounded_timeout(self.timeout)
+            try:
+                if timeout is None:
+                    return await call_next(**arguments)
+                return await wait_for(call_next(**arguments), timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.warning(f"{tool_name} timed out after {timeout:.1f}s: {query}")
+                return (
+                    f"Error executing query: timed out after {timeout:.3g} seconds. "
+                    "Narrow the query with filters, aggregation or LIMIT.",
+                    None,
+                )
+            finally:
+                self._in_flight -= 1
+                logger.debug(f"{tool_name} finished in {time.perf_counter() - started:.3f}s")
+
+
+def wrap_tools_with_limits(tools: List, limiter: ToolCallLimiter) -> List:
+    """Return ``tools`` with the execute_sql tool called through ``limiter``."""
+    return wrap_sql_tools(tools, limiter)
@@ -0,0 +1,337 @@
+"""
+Per-request tracing of the agent's hot path.
+
+Spans are timed blocks with attributes, nested through a context variable
+so a span opened inside another (or inside a task or worker thread started
+from it) records it as its parent:
+
+- ``request``: one ``invoke_graph_response`` / ``stream_graph_response`` call
+- ``agent_node``: one LLM call, with its route and tokens in and out
+- ``plan_cache.lookup``: matching the question against cached plans
+- ``tool``: one tool call made by the ``ToolNode``, with the SQL hash, rows
+  and bytes handed to the model
+- ``mcp.acquire`` / ``mcp.call``: waiting for a pooled MCP session and the
+  stdio round trip to the MySQL server, with rows and bytes received
+
+Finished spans are queued and appended by a background writer thread to a
+JSON-lines file (one object per span with OpenTelemetry-style
+``trace_id``/``span_id``/``parent_span_id`` fields), so the event loop
+never waits on disk; ``Tracer.close`` drains the queue.
+``python tracing.py summary`` aggregates them into per-stage percentiles,
+including the time each request spent outside its LLM and tool spans.
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.logging import get_logger
+from sql_tools import normalize_sql, parse_result, result_text
+
+logger = get_logger('tracing')
+
+
+def sql_hash(query: str) -> str:
+    """Short stable hash of the normalized SQL text, to group spans by query."""
+    return hashlib.sha1(normalize_sql(query).encode("utf-8")).hexdigest()[:12]
+
+
+def result_size(content: Any, artifact: Any = None) -> Dict[str, int]:
+    """Rows and bytes of a tool result in the mysql_mcp_server text format."""
+    text = result_text(content)
+    rows = artifact.get("rows") if isinstance(artifact, dict) else None
+    if not isinstance(rows, int):
+        rows = len(parse_result(text)[1])
+    return {"rows": rows, "bytes": len(text.encode("utf-8"))}
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration_ms: float = 0.0
+    status: str = "ok"
+
+    def set(self, **attributes: Any) -> None:
+        """Record attributes on the span; ``None`` values are skipped."""
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time": self.start_time,
+            "end_time": self.start_time + self.duration_ms / 1000,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    """Stand-in yielded while tracing is disabled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+# Queued after the last span to stop the writer thread
+_STOP = object()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans and has a background thread append finished ones to a JSON-lines file."""
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            enabled: bool = False,
+            max_bytes: int = 50 * 1024 * 1024,
+            queue_size: int = 10000
+    ):
+        self.path = path
+        self.enabled = enabled and bool(path)
+        self.max_bytes = max_bytes
+        self.queue_size = queue_size
+        self.stats = {"spans": 0, "write_errors": 0, "dropped": 0}
+        self._file = None
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def configure(self, config) -> None:
+        """Apply the tracing settings of an ``AgentConfig`` instance."""
+        self.close()
+        self.path = config.trace_path
+        self.enabled = config.trace_enabled and bool(config.trace_path)
+        self.max_bytes = config.trace_max_bytes
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Time the enclosed block as a span, child of the current span if any.
+
+        Exceptions mark the span as failed and propagate unchanged.
+        """
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_span_id=parent.span_id if parent is not None else None,
+            start_time=time.time(),
+        )
+        span.set(**attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Exited in another context (e.g. an async generator closed elsewhere)
+                _current_span.set(parent)
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._queue = queue.Queue(self.queue_size)
+                    self._writer = threading.Thread(target=self._write_spans, name="trace-writer", daemon=True)
+                    self._writer.start()
+        try:
+            self._queue.put_nowait(span.as_dict())
+        except queue.Full:
+            # Never block the caller on a slow disk; count what was lost
+            self.stats["dropped"] += 1
+
+    def _write_spans(self) -> None:
+        """Writer thread: append queued spans, flushing once per batch, until ``_STOP``."""
+        records = self._queue
+        stopping = False
+        while not stopping:
+            batch = [records.get()]
+            while True:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [record for record in batch if record is not _STOP]
+            if batch:
+                self._write(batch)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch: List[dict]) -> None:
+        try:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            elif self._file.tell() > self.max_bytes:
+                self._file.close()
+                os.replace(self.path, self.path + ".1")
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+            self._file.flush()
+            self.stats["spans"] += len(batch)
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            if self.stats["write_errors"] == 1:
+                logger.warning(f"Could not write trace spans to {self.path}: {e}")
+
+    def close(self) -> None:
+        """Write the queued spans, stop the writer thread and close the span file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            # Blocks only while the queue is full; the writer is draining it
+            self._queue.put(_STOP)
+        writer.join()
+
+
+# Process-wide tracer, configured by main.load_agent_runtime
+tracer = Tracer()
+atexit.register(tracer.close)
+
+
+async def tracing_middleware(tool_name: str, arguments: dict, call_next) -> Any:
+    """Tool middleware recording one ``tool`` span per call (see ``sql_tools.wrap_tool``)."""
+    query = arguments.get("query")
+    with tracer.span("tool", tool=tool_name, sql_hash=sql_hash(query) if query else None) as span:
+        content, artifact = await call_next(**arguments)
+        span.set(**result_size(content, artifact))
+        return content, artifact
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 for no samples)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def read_spans(paths: List[str]) -> List[dict]:
+    """Read span objects from JSON-lines files, skipping unreadable lines."""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def summarize(spans: List[dict]) -> Dict[str, dict]:
+    """
+    Aggregate spans into per-stage latency percentiles and totals.
+
+    Adds a ``request.overhead`` stage: each request's duration minus its
+    direct child spans (graph bookkeeping, memory compaction, checkpoints).
+    """
+    durations: Dict[str, List[float]] = {}
+    totals: Dict[str, Dict[str, float]] = {}
+    errors: Dict[str, int] = {}
+    children: Dict[str, float] = {}
+    for span in spans:
+        name = span["name"]
+        durations.setdefault(name, []).append(span["duration_ms"])
+        errors[name] = errors.get(name, 0) + (span.get("status") == "error")
+        for key in ("tokens_in", "tokens_out", "rows", "bytes"):
+            value = span.get("attributes", {}).get(key)
+            if isinstance(value, (int, float)):
+                totals.setdefault(name, {})[key] = totals.get(name, {}).get(key, 0) + value
+        if span.get("parent_span_id"):
+            children[span["parent_span_id"]] = children.get(span["parent_span_id"], 0.0) + span["duration_ms"]
+    overhead = [
+        max(span["duration_ms"] - children.get(span["span_id"], 0.0), 0.0)
+        for span in spans if span["name"] == "request"
+    ]
+    if overhead:
+        durations["request.overhead"] = overhead
+
+    summary = {}
+    for name, samples in durations.items():
+        summary[name] = {
+            "count": len(samples),
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2),
+            "max_ms": round(max(samples), 2),
+            "total_ms": round(sum(samples), 2),
+            "errors": errors.get(name, 0),
+            **totals.get(name, {}),
+        }
+    return summary
+
+
+def main(argv=None) -> int:
+    from config.agent import agent_config
+
+    parser = argparse.ArgumentParser(description="Inspect agent trace spans.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary_parser = commands.add_parser("summary", help="per-stage latency percentiles")
+    summary_parser.add_argument("paths", nargs="*", help=f"span files (default {agent_config.trace_path})")
+    summary_parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [path for path in (agent_config.trace_path + ".1", agent_config.trace_path)
+                           if os.path.exists(path)]
+    if not paths:
+        print("No trace files found")
+        return 1
+    summary = summarize(read_spans(paths))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"{'stage':<18} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>6}  totals")
+    for name, stage in sorted(summary.items(), key=lambda item: -item[1]["total_ms"]):
+        totals = ", ".join(
+            f"{key} {int(stage[key])}" for key in ("tokens_in", "tokens_out", "rows", "bytes") if key in stage
+        )
+        print(
+            f"{name:<18} {stage['count']:>6} {stage['p50_ms']:>7.1f}ms {stage['p95_ms']:>7.1f}ms "
+            f"{stage['p99_ms']:>7.1f}ms {stage['max_ms']:>7.1f}ms {stage['errors']:>6}  {totals}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())